@@ -3,9 +3,17 @@
 from dotenv import load_dotenv
 from flask import Flask
 
+import controller.admission
 import controller.apriori_controller
 import controller.collaboFilter_controller
+import controller.recommendation_controller
+import controller.notification_controller
 from model.db import init_app
+from migration.cli import migrate_cli
+from command.retention import retention_cli
+from command.export import export_cli
+from command.batch import batch_cli
+from config import REFRESH_SCHEDULER
 
 from dotenv import load_dotenv
 import os
@@ -24,6 +32,19 @@ init_app(app)
 # 블루프린트 등록
 app.register_blueprint(controller.apriori_controller.apriori_blueprint)
 app.register_blueprint(controller.collaboFilter_controller.review_blueprint)
+app.register_blueprint(controller.recommendation_controller.recommendation_blueprint)
+app.register_blueprint(controller.notification_controller.notification_blueprint)
+app.register_blueprint(controller.admission.admission_blueprint)
+
+# CLI 명령 등록 (flask migrate ..., flask retention ..., flask export ..., flask batch ...)
+app.cli.add_command(migrate_cli)
+app.cli.add_command(retention_cli)
+app.cli.add_command(export_cli)
+app.cli.add_command(batch_cli)
+
+# 연관 분석 자동 갱신 스케줄러 (한 프로세스에서만 켠다)
+if REFRESH_SCHEDULER['enabled']:
+    controller.apriori_controller.refresh_scheduler.start(app)
 
 if __name__ == '__main__':
     app.run(port=8000, debug=True)
@@ -0,0 +1,62 @@
+import json
+import os
+import sys
+
+import click
+from flask.cli import AppGroup
+
+from service.batch_service import CollaboFilterBatch, RuleMiningBatch
+from service.job_checkpoint import JobCheckpoint, JOB_DIR
+from service.rule_mining_service import MAX_RULE_LEN
+from config import RECOMMEND_MODEL, RULE_MINING_PARAMS, BATCH_JOB
+
+# flask batch collabo [--model svd|als] [--shard-size N] [--restart]
+# flask batch rules [--min-support F] [--min-confidence F] [--min-lift F] [--max-len N] [--chunk-size N] [--restart]
+# flask batch status
+# 중단되면 같은 명령을 다시 실행해 마지막으로 완료된 단계/shard 다음부터 이어서 한다.
+batch_cli = AppGroup('batch', help='오프라인 배치 작업 (체크포인트/재개)')
+
+
+def _run(job, restart):
+    try:
+        result = job.run(restart=restart)
+    except ValueError as e:
+        print(f"[batch] {e}")
+        sys.exit(1)
+    print(f"[batch] 완료: {json.dumps(result, ensure_ascii=False)}")
+
+
+@batch_cli.command('collabo')
+@click.option('--model', 'model_kind', type=click.Choice(['svd', 'als']), default=RECOMMEND_MODEL, show_default=True)
+@click.option('--shard-size', type=int, default=BATCH_JOB['shard_size'], show_default=True,
+              help='점수 계산/저장 shard 당 고객 수')
+@click.option('--restart', is_flag=True, help='진행 중인 체크포인트를 버리고 처음부터 실행')
+def collabo_command(model_kind, shard_size, restart):
+    _run(CollaboFilterBatch(model_kind=model_kind, shard_size=shard_size), restart)
+
+
+@batch_cli.command('rules')
+@click.option('--min-support', type=float, default=RULE_MINING_PARAMS['min_support'], show_default=True)
+@click.option('--min-confidence', type=float, default=RULE_MINING_PARAMS['min_confidence'], show_default=True)
+@click.option('--min-lift', type=float, default=RULE_MINING_PARAMS['min_lift'], show_default=True)
+@click.option('--max-len', type=click.IntRange(2, MAX_RULE_LEN), default=RULE_MINING_PARAMS['max_len'], show_default=True)
+@click.option('--chunk-size', type=int, default=BATCH_JOB['rule_chunk_size'], show_default=True,
+              help='규칙 저장 chunk 크기')
+@click.option('--restart', is_flag=True, help='진행 중인 체크포인트를 버리고 처음부터 실행')
+def rules_command(min_support, min_confidence, min_lift, max_len, chunk_size, restart):
+    params = {'min_support': min_support, 'min_confidence': min_confidence, 'min_lift': min_lift, 'max_len': max_len}
+    _run(RuleMiningBatch(params=params, chunk_size=chunk_size), restart)
+
+
+@batch_cli.command('status')
+def status_command():
+    names = sorted(os.listdir(JOB_DIR)) if os.path.isdir(JOB_DIR) else []
+    for name in names:
+        state = JobCheckpoint(name, None).read_state()
+        if state is None:
+            continue
+        status = f"완료 {state['finished_at']}" if state.get('finished_at') else '진행 중 (다시 실행하면 이어서 함)'
+        print(f"{name}: {status}, 시작 {state['started_at']}, 완료 단계 {len(state['stages'])}개")
+        print(f"  params: {json.dumps(state['params'], ensure_ascii=False)}")
+        if state.get('result'):
+            print(f"  result: {json.dumps(state['result'], ensure_ascii=False)}")
@@ -0,0 +1,27 @@
+import sys
+
+import click
+from flask.cli import AppGroup
+
+from service.export_service import ExportService, FORMATS, default_format
+
+# flask export analysis <analysis_id> --output <path> [--format ndjson|csv.gz|parquet]
+export_cli = AppGroup('export', help='분석 결과 내보내기')
+
+
+@export_cli.command('analysis')
+@click.argument('analysis_id', type=int)
+@click.option('--output', 'output_path', default=None, help='출력 파일 경로 (기본: analysis-<id>.<format>)')
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), default=None,
+              help='기본: parquet (pyarrow 가 없으면 csv.gz)')
+def export_analysis_command(analysis_id, output_path, fmt):
+    service = ExportService()
+    kind = service.analysis_kind(analysis_id)
+    if kind is None:
+        print(f"Analysis {analysis_id} not found")
+        sys.exit(1)
+
+    fmt = fmt or default_format()
+    output_path = output_path or f'analysis-{analysis_id}.{fmt}'
+    rows = service.write_file(analysis_id, kind, output_path, fmt)
+    print(f"Exported {rows} rows of analysis {analysis_id} ({kind.name}) to {output_path}")
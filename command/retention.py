@@ -0,0 +1,26 @@
+import click
+from flask.cli import AppGroup
+
+from service.retention_service import RetentionService
+from config import RETENTION
+
+# flask retention run [--keep-personalized N] [--keep-association N] [--batch-size N] [--pause S] [--dry-run]
+retention_cli = AppGroup('retention', help='오래된 분석 정리')
+
+
+@retention_cli.command('run')
+@click.option('--keep-personalized', type=int, default=RETENTION['keep']['PERSONALIZED'], show_default=True)
+@click.option('--keep-association', type=int, default=RETENTION['keep']['ASSOCIATION'], show_default=True,
+              help='상품별로 남길 연관 분석 수')
+@click.option('--batch-size', type=int, default=RETENTION['batch_size'], show_default=True)
+@click.option('--pause', type=float, default=RETENTION['pause_seconds'], show_default=True,
+              help='batch 사이 대기 시간(초)')
+@click.option('--dry-run', is_flag=True, help='삭제 대상만 출력')
+def run_command(keep_personalized, keep_association, batch_size, pause, dry_run):
+    service = RetentionService(
+        keep={'PERSONALIZED': keep_personalized, 'ASSOCIATION': keep_association},
+        batch_size=batch_size,
+        pause_seconds=pause
+    )
+    result = service.run(dry_run=dry_run)
+    print(f"[retention] 분석 {result['analyses']}개, 추천 행 {result['rows']}건 삭제: {result['elapsed']:.2f}초 소요")
@@ -1 +1,139 @@
-from config import *
\ No newline at end of file
+from config import *
+import os
+
+# 학습된 모델, 튜닝 결과 등 산출물을 저장하는 디렉터리
+ARTIFACT_DIR = os.getenv('MODEL_ARTIFACT_DIR', 'artifacts')
+
+# SVD 기본 하이퍼파라미터 (튜닝 결과가 없을 때 사용)
+SVD_DEFAULT_PARAMS = {
+    'n_factors': 50,
+    'lr_all': 0.005,
+    'reg_all': 0.02,
+}
+
+# SVD 하이퍼파라미터 탐색 범위
+SVD_PARAM_GRID = {
+    'n_factors': [20, 50, 100],
+    'n_epochs': [20, 30],
+    'lr_all': [0.002, 0.005, 0.01],
+    'reg_all': [0.02, 0.05, 0.1],
+}
+
+# 학습 리뷰 데이터 범위 (None 이면 전체 이력 사용)
+REVIEW_WINDOW_DAYS = int(os.getenv('REVIEW_WINDOW_DAYS')) if os.getenv('REVIEW_WINDOW_DAYS') else None
+# 시간 감쇠 반감기(일). 오래된 평점일수록 전체 평균 쪽으로 당겨 학습에 주는 영향을 줄인다. None 이면 감쇠 없음
+REVIEW_HALF_LIFE_DAYS = float(os.getenv('REVIEW_HALF_LIFE_DAYS')) if os.getenv('REVIEW_HALF_LIFE_DAYS') else None
+# 리뷰 스트리밍 조회 chunk 크기
+REVIEW_CHUNK_SIZE = int(os.getenv('REVIEW_CHUNK_SIZE', 10000))
+
+# 개인별 추천에 사용할 모델 ('svd': 리뷰 평점 기반, 'als': 구매 이력 기반 implicit ALS)
+RECOMMEND_MODEL = os.getenv('RECOMMEND_MODEL', 'svd')
+
+# implicit ALS 하이퍼파라미터
+ALS_PARAMS = {
+    'factors': 50,
+    'regularization': 0.1,
+    'alpha': 40.0,
+    'iterations': 15,
+}
+
+# 마지막 전체 학습 후 이 시간이 지나면 fold-in 대신 전체 재학습 (drift 제한)
+FULL_RETRAIN_HOURS = float(os.getenv('FULL_RETRAIN_HOURS', 24))
+
+# 개인별 추천 가산점 규칙 (실시간 추천과 HybridRecommenderEvaluator 가 함께 사용)
+# 평점 총 0 ~ 5점, 그외 가중치 총합 1점 총 6점으로 평가 (해당하지 않을 경우 가산점 부여를 안함.)
+# 0.5점 : 고객의 피부 타입과 제품의 피부타입에 따른 점수 (일치 0.5점, 불일치 0.1점)
+# 0.3점 : 제품 리뷰 작성 고객 중 GOLD, BLACK 등급 비율이 25% 초과면 0.3점, 아니면 0.1점
+# 0.2점 : 40세 미만 고객이고 제품 리뷰 작성 고객 중 40세 미만 비율이 60% 초과면 0.2점
+BONUS_RULES = {
+    'skintype': {'match': 0.5, 'mismatch': 0.1},
+    'high_grade': {'min_ratio': 0.25, 'above': 0.3, 'below': 0.1},
+    'young': {'max_age': 40, 'min_ratio': 0.6, 'bonus': 0.2},
+}
+
+# 연관 분석 기본 기준값
+APRIORI_THRESHOLDS = {
+    'min_customer_count': 3,  # 최소 3명 이상의 고객이 구매
+    'min_confidence': 0.05,  # 최소 5% 이상의 신뢰도
+    'min_lift': 1.1,  # 최소 1.1 이상의 리프트
+}
+
+# /apriori 결과 캐시 최대 항목 수 (LRU)
+APRIORI_CACHE_SIZE = int(os.getenv('APRIORI_CACHE_SIZE', 256))
+
+# 전체 카탈로그 연관 규칙(FP-Growth) 마이닝 기준값
+RULE_MINING_PARAMS = {
+    'min_support': float(os.getenv('RULE_MIN_SUPPORT', 0.005)),  # 전체 장바구니 중 최소 0.5% 에 등장하는 조합
+    'min_confidence': 0.1,
+    'min_lift': 1.1,
+    'max_len': 3,  # 조건 상품 최대 2개 -> 추천 상품 1개
+}
+
+# 일자별 구매 집계 파티션: 주문일 이후 이 일수가 지나기 전에는 다시 집계한다 (늦은 환불/취소 반영)
+ORDER_PARTITION_OPEN_DAYS = int(os.getenv('ORDER_PARTITION_OPEN_DAYS', 2))
+
+# 동시 분석 요청 합치기: 'local' (프로세스 내) 또는 'mysql' (GET_LOCK 으로 worker 간에도 합침)
+SINGLE_FLIGHT_BACKEND = os.getenv('SINGLE_FLIGHT_BACKEND', 'local')
+# 다른 worker 의 분석 완료를 기다리는 최대 시간(초)
+SINGLE_FLIGHT_LOCK_TIMEOUT = int(os.getenv('SINGLE_FLIGHT_LOCK_TIMEOUT', 1800))
+
+# 무거운 분석 라우트 동시 실행 제한 (라우트별 동시 실행 수, 대기열 크기, 대기 시간(초))
+ADMISSION_DEFAULTS = {
+    'max_concurrent': int(os.getenv('ADMISSION_MAX_CONCURRENT', 1)),
+    'max_queue': int(os.getenv('ADMISSION_MAX_QUEUE', 2)),
+    'queue_timeout': float(os.getenv('ADMISSION_QUEUE_TIMEOUT', 30)),
+}
+ADMISSION_LIMITS = {
+    'collabo': {},
+    'collaboFilter': {},
+    'collaboFoldIn': {},
+    'collaboTest': {},
+    'collaboTune': {'max_queue': 0},
+    'collaboBenchmark': {'max_queue': 0},
+    'apriori': {'max_concurrent': 4, 'max_queue': 8},
+    'aprioriRules': {'max_queue': 0},
+    'export': {'max_concurrent': 2, 'max_queue': 4},
+}
+
+# 추천 조회 API 캐시 최대 항목 수 (LRU) 와 페이지 크기
+READ_CACHE_SIZE = int(os.getenv('READ_CACHE_SIZE', 1024))
+READ_PAGE_SIZE = {'default': 50, 'max': 500}
+
+# 분석 보관 정책: 종류별로 최근 N 개 분석만 남기고, 오래된 추천 행은 batch_size 개씩 나눠 삭제한다
+RETENTION = {
+    'keep': {
+        'PERSONALIZED': int(os.getenv('RETENTION_KEEP_PERSONALIZED', 5)),
+        'ASSOCIATION': int(os.getenv('RETENTION_KEEP_ASSOCIATION', 3)),  # 상품별 (규칙 마이닝 분석은 따로 최근 N개)
+    },
+    'batch_size': int(os.getenv('RETENTION_BATCH_SIZE', 5000)),
+    'pause_seconds': float(os.getenv('RETENTION_PAUSE_SECONDS', 0.2)),  # batch 사이 대기 (복제 지연/잠금 완화)
+}
+
+# 분석 결과 내보내기 시 한 번에 읽는 행 수 (서버 사이드 커서 chunk)
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 10000))
+
+# 추천 알림 발송: 한 번에 가져가는 추천 수, 같은 추천을 다시 보내기까지의 간격(시간)
+NOTIFICATION = {
+    'batch_size': int(os.getenv('NOTIFICATION_BATCH_SIZE', 500)),
+    'cooldown_hours': float(os.getenv('NOTIFICATION_COOLDOWN_HOURS', 24 * 7)),
+}
+
+# 오프라인 배치 (flask batch ...): 점수 계산/저장 shard 당 고객 수, 규칙 저장 chunk 크기
+BATCH_JOB = {
+    'shard_size': int(os.getenv('BATCH_SHARD_SIZE', 50000)),
+    'rule_chunk_size': int(os.getenv('BATCH_RULE_CHUNK_SIZE', 5000)),
+}
+
+# 상품별 연관 분석 자동 갱신 스케줄러 (REFRESH_SCHEDULER_ENABLED=1 인 프로세스에서만 실행)
+# interval_seconds 마다 마지막 분석 이후 상위 카테고리 신규 주문이 min_new_orders 건 이상인 상품을
+# 신규 주문이 많은 순서로 cpu_budget_seconds 안에서 다시 분석한다. lookback_days 이전 주문은 세지 않는다.
+REFRESH_SCHEDULER = {
+    'enabled': os.getenv('REFRESH_SCHEDULER_ENABLED', '0') == '1',
+    'interval_seconds': float(os.getenv('REFRESH_INTERVAL_SECONDS', 300)),
+    'cpu_budget_seconds': float(os.getenv('REFRESH_CPU_BUDGET_SECONDS', 30)),
+    'min_new_orders': int(os.getenv('REFRESH_MIN_NEW_ORDERS', 20)),
+    'lookback_days': int(os.getenv('REFRESH_LOOKBACK_DAYS', 30)),
+}
+
+# 스트리밍 JSON 응답에서 한 번에 보내는 chunk 크기 (bytes)
+STREAM_CHUNK_BYTES = int(os.getenv('STREAM_CHUNK_BYTES', 64 * 1024))
@@ -0,0 +1,168 @@
+import math
+import threading
+from functools import wraps
+from time import time, monotonic
+
+from flask import Blueprint, jsonify
+
+from config import ADMISSION_DEFAULTS, ADMISSION_LIMITS
+
+admission_blueprint = Blueprint('admission', __name__)
+
+
+# 실행 슬롯을 얻지 못했을 때 발생. 앱 전역 에러 핸들러가 429 + Retry-After 로 응답한다.
+class AdmissionRejected(Exception):
+    def __init__(self, name, retry_after):
+        super().__init__(f"Too many concurrent '{name}' requests. Please retry later.")
+        self.name = name
+        self.retry_after = retry_after
+
+
+# 라우트별 동시 실행 수 제한 + 크기가 제한된 대기열.
+# 실행 슬롯이 없으면 대기열에서 queue_timeout 초까지 기다리고, 대기열도 가득 차면 바로 거절한다.
+class AdmissionController:
+    def __init__(self, name, max_concurrent, max_queue, queue_timeout):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.avg_seconds = None
+        self._cond = threading.Condition()
+
+    # 실행 슬롯을 얻으면 True. 대기열이 가득 찼거나 대기 시간이 지나면 False
+    def acquire(self):
+        with self._cond:
+            if self.active < self.max_concurrent and self.waiting == 0:
+                self.active += 1
+                self.admitted += 1
+                return True
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                return False
+
+            self.waiting += 1
+            deadline = monotonic() + self.queue_timeout
+            try:
+                while self.active >= self.max_concurrent:
+                    remaining = deadline - monotonic()
+                    if remaining <= 0:
+                        self.timed_out += 1
+                        return False
+                    self._cond.wait(remaining)
+            finally:
+                self.waiting -= 1
+            self.active += 1
+            self.admitted += 1
+            return True
+
+    def release(self, elapsed):
+        with self._cond:
+            self.active -= 1
+            # 최근 실행 시간의 지수 이동 평균 (Retry-After 추정용)
+            self.avg_seconds = elapsed if self.avg_seconds is None else 0.8 * self.avg_seconds + 0.2 * elapsed
+            self._cond.notify()
+
+    def _admit(self):
+        if not self.acquire():
+            retry_after = self.retry_after()
+            print(f"[admission] {self.name} 요청 거절 (실행 {self.active}, 대기 {self.waiting}), "
+                  f"Retry-After {retry_after}s")
+            raise AdmissionRejected(self.name, retry_after)
+
+    # 슬롯을 얻어 fn 을 실행한다. 포화 상태면 AdmissionRejected
+    def run(self, fn, *args, **kwargs):
+        self._admit()
+        start_time = time()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.release(time() - start_time)
+
+    # 스트리밍 응답용: 슬롯을 얻고, 응답 전송이 끝나거나 연결이 닫힐 때 반환한다
+    def stream(self, iterable):
+        self._admit()
+        return _AdmittedStream(self, iterable)
+
+    # 대기 중인 요청이 모두 처리될 때까지의 예상 시간(초)
+    def retry_after(self):
+        with self._cond:
+            average = self.avg_seconds or self.queue_timeout
+            return max(1, math.ceil(average * (self.waiting + 1) / self.max_concurrent))
+
+    def stats(self):
+        with self._cond:
+            return {
+                'active': self.active,
+                'waiting': self.waiting,
+                'maxConcurrent': self.max_concurrent,
+                'maxQueue': self.max_queue,
+                'queueTimeout': self.queue_timeout,
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'timedOut': self.timed_out,
+                'avgSeconds': self.avg_seconds,
+            }
+
+
+class _AdmittedStream:
+    def __init__(self, controller, iterable):
+        self.controller = controller
+        self.iterable = iterable
+        self.start_time = time()
+        self.released = False
+
+    def __iter__(self):
+        try:
+            yield from self.iterable
+        finally:
+            self.close()
+
+    # werkzeug 가 응답을 닫을 때 호출한다 (전송 전에 연결이 끊긴 경우 포함)
+    def close(self):
+        if self.released:
+            return
+        self.released = True
+        if hasattr(self.iterable, 'close'):
+            self.iterable.close()
+        self.controller.release(time() - self.start_time)
+
+
+_controllers = {}
+_controllers_lock = threading.Lock()
+
+
+def get_controller(name):
+    with _controllers_lock:
+        if name not in _controllers:
+            limits = {**ADMISSION_DEFAULTS, **ADMISSION_LIMITS.get(name, {})}
+            _controllers[name] = AdmissionController(name, **limits)
+        return _controllers[name]
+
+
+# 무거운 라우트 앞에 붙이는 데코레이터. 포화 상태면 429 + Retry-After 로 바로 응답한다.
+def admission(name):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            return get_controller(name).run(view, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@admission_blueprint.app_errorhandler(AdmissionRejected)
+def handle_admission_rejected(e):
+    response = jsonify({"message": str(e)})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 429
+
+
+# 라우트별 실행/대기/거절 현황
+@admission_blueprint.route('/admission/stats')
+def admission_stats():
+    names = set(ADMISSION_LIMITS) | set(_controllers)
+    return jsonify({name: get_controller(name).stats() for name in sorted(names)}), 200
@@ -1,8 +1,21 @@
+from datetime import date
+
 from flask import Blueprint, request, jsonify
-from service.apriori_service import RecommendationService  # RecommendationService 임포트
+from service.apriori_service import RecommendationService, analysis_flight_key, analysis_params  # RecommendationService 임포트
+from service.rule_mining_service import RuleMiningService
+from service.single_flight import analysis_flight
+from service.refresh_scheduler import RefreshScheduler
+from controller.admission import admission, get_controller, AdmissionRejected
+
+# 규칙 조회 시 한 번에 받을 수 있는 구매 상품 수 (부분 집합 키 수 제한)
+MAX_LOOKUP_GOODS = 50
 
 apriori_blueprint = Blueprint('apriori', __name__)
 
+# 상품별 연관 분석 자동 갱신 (HTTP 요청과 같은 'apriori' 실행 슬롯을 사용하고, 슬롯이 가득 차면 그 주기를 쉰다)
+refresh_scheduler = RefreshScheduler(run=lambda fn, *args: get_controller('apriori').run(fn, *args),
+                                     busy_errors=(AdmissionRejected,))
+
 # 조합 분석하기
 @apriori_blueprint.route('/apriori', methods=['POST'])
 def run_apriori():
@@ -11,6 +24,25 @@ def run_apriori():
     analysis_kind = data.get('analysisKind', 'ASSOCIATION')
     analysis_title = data.get('analysisTitle', 'Product Association Analysis')
     analysis_description = data.get('analysisDescription', 'Analyzing product associations for recommendations.')
+    # 선택 기준값 (없으면 기본값)
+    try:
+        thresholds = {key: cast(data[param]) for key, param, cast in (('min_customer_count', 'minCustomerCount', int),
+                                                                       ('min_confidence', 'minConfidence', float),
+                                                                       ('min_lift', 'minLift', float)) if param in data}
+    except (TypeError, ValueError):
+        return jsonify({"message": "Invalid threshold parameter."}), 400
+
+    # 선택 분석 기간 (windowDays 일, endDate 까지. endDate 가 없으면 오늘까지의 이동 기간)
+    window_days = end_date = None
+    if 'windowDays' in data:
+        try:
+            window_days = int(data['windowDays'])
+            end_date = date.fromisoformat(data['endDate']) if data.get('endDate') else None
+        except (TypeError, ValueError):
+            return jsonify({"message": "Invalid window parameter."}), 400
+        if window_days < 1:
+            return jsonify({"message": "windowDays must be at least 1."}), 400
+    params = analysis_params(thresholds, window_days, end_date)
 
     print(f"Received request with goods_code: {target_goods_code_a}")  # 로그 추가
 
@@ -19,8 +51,15 @@ def run_apriori():
 
     try:
         service = RecommendationService()
-        analysis_id = service.recommend_all_combinations(target_goods_code_a, analysis_kind, analysis_title,
-                                                         analysis_description)
+        # 같은 조건의 동시 요청은 하나의 분석으로 합친다
+        flight_key = analysis_flight_key(target_goods_code_a, analysis_kind, analysis_title, params)
+        (analysis_id, recommendations, cached), coalesced = analysis_flight.do(
+            flight_key,
+            lambda: get_controller('apriori').run(service.recommend_with_cache, target_goods_code_a,
+                                                  analysis_kind, analysis_title, analysis_description, params),
+            lambda after_analysis_id: service.find_recent_analysis(target_goods_code_a, analysis_kind,
+                                                                   analysis_title, after_analysis_id, params)
+        )
 
         print(f"Returned analysis_id: {analysis_id}")  # 로그 추가
 
@@ -30,11 +69,67 @@ def run_apriori():
             }), 400
 
         return jsonify({
-            "analysis_id": analysis_id
+            "analysis_id": analysis_id,
+            "cached": cached,
+            "coalesced": coalesced,
+            "recommendations": recommendations
         }), 200
 
+    except AdmissionRejected:
+        raise
     except Exception as e:
         print(f"Error in run_apriori: {str(e)}")  # 로그 추가
         return jsonify({
             "message": str(e)
-        }), 500
\ No newline at end of file
+        }), 500
+
+# 전체 카탈로그 연관 규칙 마이닝 (FP-Growth, 조건 상품 여러 개)
+@apriori_blueprint.route('/aprioriRules', methods=['POST'])
+@admission('aprioriRules')
+def run_rule_mining():
+    data = request.get_json(silent=True) or {}
+    try:
+        params = {key: cast(data[param]) for key, param, cast in (('min_support', 'minSupport', float),
+                                                                   ('min_confidence', 'minConfidence', float),
+                                                                   ('min_lift', 'minLift', float),
+                                                                   ('max_len', 'maxLen', int)) if param in data}
+    except (TypeError, ValueError):
+        return jsonify({"message": "Invalid rule mining parameter."}), 400
+    try:
+        service = RuleMiningService(params)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    try:
+        analysis_id, rule_count = service.run()
+        if analysis_id is None:
+            return jsonify({"message": "No association rules found with the given thresholds."}), 400
+        return jsonify({"analysis_id": analysis_id, "rule_count": rule_count}), 200
+    except Exception as e:
+        print(f"Error in run_rule_mining: {str(e)}")
+        return jsonify({"message": str(e)}), 500
+
+
+# 구매 상품 목록으로 추천 상품 조회 (예: /aprioriRules?goodsCodes=A,B)
+@apriori_blueprint.route('/aprioriRules', methods=['GET'])
+def lookup_rules():
+    goods_codes = [code for code in request.args.get('goodsCodes', '').split(',') if code]
+    if not goods_codes:
+        return jsonify({"message": "Missing required parameter: goodsCodes."}), 400
+    if len(goods_codes) > MAX_LOOKUP_GOODS:
+        return jsonify({"message": f"goodsCodes must contain at most {MAX_LOOKUP_GOODS} codes."}), 400
+
+    try:
+        n = int(request.args.get('n', 10))
+        analysis_id = request.args.get('analysisId', type=int)
+    except ValueError:
+        return jsonify({"message": "Invalid parameter: n."}), 400
+
+    analysis_id, recommendations = RuleMiningService().lookup(goods_codes, n, analysis_id)
+    return jsonify({"analysis_id": analysis_id, "recommendations": recommendations}), 200
+
+
+# 연관 분석 자동 갱신 상태 (최근 주기의 대기 상품 수, 신규 주문이 많은 상위 상품)
+@apriori_blueprint.route('/aprioriRefresh')
+def refresh_status():
+    return jsonify(refresh_scheduler.stats()), 200
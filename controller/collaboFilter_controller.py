@@ -1,6 +1,12 @@
 from time import time
 from flask import Blueprint, jsonify, request
-from service.collaboFilter_service import CollaboFilterService
+from service.collaboFilter_service import CollaboFilterService, ANALYSIS_TITLE, ANALYSIS_DESCRIPTION
+from service.tuning_service import SVDTuningService
+from service.single_flight import analysis_flight
+from controller.admission import admission, get_controller
+from controller.streaming import stream_response
+from service.json_stream import iter_json_array
+from config import RECOMMEND_MODEL
 from evaluation.HybridRecommenderEvaluator import HybridRecommenderEvaluator
 import pandas as pd
 from sklearn.metrics import mean_squared_error, mean_absolute_error
@@ -9,13 +15,10 @@ import numpy as np
 
 review_blueprint = Blueprint('review', __name__)
 
+# 최근 리뷰 2000건 [고객, 나이, 등급, 상품, 상품명, 상품 피부 타입, 평점] 배열을 JSON 으로 스트리밍
 @review_blueprint.route('/collabo')
 def recommendCollabo():
-    service = CollaboFilterService()
-    data = service.load_review_data()
-    recommend = service.runningRecommend()
-    results = [tuple(row) for row in data]
-    return jsonify(results), 200
+    return stream_response(iter_json_array(CollaboFilterService().iter_review_rows()), admission='collabo')
 
 # 개인별 추천하기 
 @review_blueprint.route('/collaboFilter', methods=['POST'])
@@ -23,30 +26,39 @@ def run_collaboFilter():
     total_start_time = time()
     service = CollaboFilterService()
 
+    # 추천 모델 선택 ('svd' 또는 'als', 기본값은 설정값)
+    data = request.get_json(silent=True) or {}
+    model_kind = data.get('model', RECOMMEND_MODEL)
+    if model_kind not in ('svd', 'als'):
+        return jsonify({"message": "model must be 'svd' or 'als'."}), 400
+
     print("=====================")
-    print("협업 필터링 추천 프로세스 시작")
-
-    # 추천 실행
-    recommend_start_time = time()
-    print("추천 알고리즘 실행 시작")
-    recommend = service.runningRecommend()
-    recommend_time = time() - recommend_start_time
-    print(f"추천 알고리즘 실행 완료: {recommend_time:.2f}초 소요")
-
-    # 분석 생성
-    analysis_start_time = time()
-    print("분석 정보 생성 시작")
-    analysis_id = service.create_analysis("PERSONALIZED", "전 고객 개별 협업 필터링 추천 분석", "설명")
-    analysis_time = time() - analysis_start_time
-    print(f"분석 정보 생성 완료: {analysis_time:.2f}초 소요")
-
-
-     # 추천 결과 저장
-    save_start_time = time()
-    print("추천 결과 저장 시작")
-    service.save_recommendation(recommend, analysis_id)
-    save_time = time() - save_start_time
-    print(f"추천 결과 저장 완료: {save_time:.2f}초 소요")
+    print(f"협업 필터링 추천 프로세스 시작 (모델: {model_kind})")
+
+    # 같은 모델의 동시 요청은 하나의 실행으로 합치고 모두 같은 analysis_id 를 받는다
+    def run_pipeline():
+        # 추천 실행
+        recommend_start_time = time()
+        print("추천 알고리즘 실행 시작")
+        recommend = service.runningRecommend(model_kind)
+        recommend_time = time() - recommend_start_time
+        print(f"추천 알고리즘 실행 완료: {recommend_time:.2f}초 소요")
+
+        # 분석 생성 및 추천 결과 저장 (분석 행과 결과를 한 트랜잭션으로 커밋)
+        save_start_time = time()
+        print("분석 정보 생성 및 추천 결과 저장 시작")
+        analysis_id = service.save_analysis("PERSONALIZED", ANALYSIS_TITLE, ANALYSIS_DESCRIPTION, recommend)
+        save_time = time() - save_start_time
+        print(f"추천 결과 저장 완료: {save_time:.2f}초 소요")
+        return analysis_id
+
+    analysis_id, coalesced = analysis_flight.do(
+        ('collaboFilter', model_kind),
+        lambda: get_controller('collaboFilter').run(run_pipeline),
+        lambda after_analysis_id: service.find_recent_analysis(ANALYSIS_TITLE, after_analysis_id)
+    )
+    if coalesced:
+        print(f"진행 중이던 추천 결과 공유: analysis_id {analysis_id}")
 
     # 전체 실행 시간 계산
     total_time = time() - total_start_time
@@ -55,10 +67,83 @@ def run_collaboFilter():
 
     return jsonify({
         "status" : analysis_id is not None,
-        "analysisId" : analysis_id
+        "analysisId" : analysis_id,
+        "coalesced" : coalesced
     })
 
+# 새 리뷰/구매를 전체 재학습 없이 저장된 모델에 반영
+@review_blueprint.route('/collaboFoldIn', methods=['POST'])
+@admission('collaboFoldIn')
+def fold_in_collaboFilter():
+    fold_in_start_time = time()
+    try:
+        result = CollaboFilterService().fold_in()
+        result['elapsed'] = time() - fold_in_start_time
+        print(f"모델 갱신 완료 ({result['mode']}): {result['elapsed']:.2f}초 소요")
+        return jsonify(result), 200
+    except Exception as e:
+        print(f"\n오류 발생: {str(e)}")
+        return jsonify({"message": str(e)}), 500
+
+# 저장된 모델로 한 고객의 추천 목록 조회
+@review_blueprint.route('/collaboRecommend/<customer_code>')
+def recommend_customer(customer_code):
+    recommendations = CollaboFilterService().recommend_customer(customer_code)
+    if recommendations is None:
+        return jsonify({"message": "Trained model or customer not found."}), 404
+
+    return jsonify({
+        "customerCode": customer_code,
+        "recommendations": [{"goodsCode": goods_code, "score": score} for goods_code, score in recommendations]
+    }), 200
+
+# SVD / ALS 학습 시간 비교
+@review_blueprint.route('/collaboBenchmark')
+@admission('collaboBenchmark')
+def benchmark_collaboFilter():
+    try:
+        result = CollaboFilterService().benchmark_training()
+        print(f"SVD 학습: {result['svd']['seconds']:.2f}초 (평점 {result['svd']['ratings']}건)")
+        print(f"ALS 학습: {result['als']['seconds']:.2f}초 (구매 쌍 {result['als']['interactions']}건)")
+        return jsonify(result), 200
+    except Exception as e:
+        print(f"\n오류 발생: {str(e)}")
+        return jsonify({"message": str(e)}), 500
+
+# SVD 하이퍼파라미터 튜닝 (교차검증, 병렬 실행)
+@review_blueprint.route('/collaboTune', methods=['POST'])
+@admission('collaboTune')
+def tune_collaboFilter():
+    data = request.get_json(silent=True) or {}
+    search = data.get('search', 'grid')
+    if search not in ('grid', 'random'):
+        return jsonify({"message": "search must be 'grid' or 'random'."}), 400
+
+    try:
+        print("\n=== SVD 하이퍼파라미터 튜닝 시작 ===\n")
+        tuner = SVDTuningService(n_splits=int(data.get('nSplits', 5)))
+        result = tuner.run(
+            search=search,
+            n_iter=int(data.get('nIter', 10)),
+            n_jobs=int(data.get('nJobs', -1)),
+            worker_counts=data.get('workerCounts')
+        )
+        print("\n=== 튜닝 완료 ===")
+
+        return jsonify({
+            "bestParams": result['best']['params'],
+            "rmse": result['best']['rmse'],
+            "mae": result['best']['mae'],
+            "candidates": result['n_candidates'],
+            "elapsed": result['elapsed'],
+            "scaling": result.get('scaling')
+        }), 200
+    except Exception as e:
+        print(f"\n오류 발생: {str(e)}")
+        return jsonify({"message": str(e)}), 500
+
 @review_blueprint.route('/collaboTest')
+@admission('collaboTest')
 def testing():
     try:
         # 추천 서비스 인스턴스 생성
@@ -0,0 +1,50 @@
+from flask import Blueprint, jsonify, request
+
+from model.enums import AnalysisKind
+from service.notification_service import NotificationService
+from config import NOTIFICATION
+
+notification_blueprint = Blueprint('notification', __name__)
+
+MAX_BATCH_SIZE = 5000
+
+
+def _kind(data):
+    kind = data.get('kind', AnalysisKind.PERSONALIZED.name)
+    if kind not in AnalysisKind.__members__:
+        raise ValueError(f"kind must be one of {list(AnalysisKind.__members__)}.")
+    return AnalysisKind[kind]
+
+
+# 발송 worker 가 발송할 추천 batch 를 가져간다
+# body: {kind, batchSize, cooldownHours, analysisId} (모두 선택)
+@notification_blueprint.route('/notifications/claim', methods=['POST'])
+def claim_notifications():
+    data = request.get_json(silent=True) or {}
+    try:
+        kind = _kind(data)
+        batch_size = int(data.get('batchSize', NOTIFICATION['batch_size']))
+        cooldown_hours = float(data.get('cooldownHours', NOTIFICATION['cooldown_hours']))
+        analysis_id = data.get('analysisId')
+        if not 0 < batch_size <= MAX_BATCH_SIZE or cooldown_hours < 0:
+            raise ValueError(f"batchSize must be in 1..{MAX_BATCH_SIZE} and cooldownHours >= 0.")
+    except (TypeError, ValueError) as e:
+        return jsonify({"message": str(e) or "Invalid parameter."}), 400
+
+    service = NotificationService(batch_size=batch_size, cooldown_hours=cooldown_hours)
+    return jsonify(service.claim(kind, analysis_id))
+
+
+# 발송에 실패한 항목을 돌려놓는다
+# body: {kind, ids, claimedAt} (claimedAt: claim 응답의 값)
+@notification_blueprint.route('/notifications/release', methods=['POST'])
+def release_notifications():
+    data = request.get_json(silent=True) or {}
+    try:
+        kind = _kind(data)
+        ids = [int(notification_id) for notification_id in data.get('ids', [])]
+        released = NotificationService().release(kind, ids, data['claimedAt'])
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"message": f"Invalid parameter: {e}"}), 400
+
+    return jsonify({"released": released})
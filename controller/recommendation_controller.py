@@ -0,0 +1,93 @@
+from flask import Blueprint, Response, jsonify, request
+
+from model.enums import AnalysisKind
+from controller.streaming import stream_response
+from service.recommendation_read_service import RecommendationReadService
+from service.export_service import ExportService
+from service.json_stream import dumps
+from config import READ_PAGE_SIZE
+
+recommendation_blueprint = Blueprint('recommendation', __name__)
+
+
+# 조회 파라미터 (after: 이전 페이지의 nextCursor, limit: 페이지 크기, analysisId: 특정 분석)
+def _page_args():
+    after = int(request.args.get('after', 0))
+    limit = min(int(request.args.get('limit', READ_PAGE_SIZE['default'])), READ_PAGE_SIZE['max'])
+    analysis_id = request.args.get('analysisId', type=int)
+    if after < 0 or limit < 1:
+        raise ValueError
+    return analysis_id, after, limit
+
+
+# 데이터 버전으로 ETag 를 만들고, If-None-Match 가 같으면 조회 없이 304 로 응답한다
+def _conditional(service, load):
+    version = service.version()
+    etag = service.etag(version, request.path, tuple(sorted(request.args.items())))
+    if etag in request.if_none_match:
+        response = jsonify({})
+        response.set_etag(etag)
+        return response.make_conditional(request)
+
+    response = Response(dumps(load(version)), mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+# 분석 종류별 최근 분석 (?kind=PERSONALIZED|ASSOCIATION)
+@recommendation_blueprint.route('/analyses/latest')
+def latest_analyses():
+    kind = request.args.get('kind')
+    if kind and kind not in AnalysisKind.__members__:
+        return jsonify({"message": f"kind must be one of {list(AnalysisKind.__members__)}."}), 400
+
+    service = RecommendationReadService()
+    return _conditional(service, lambda version: service.latest_analyses(version, kind))
+
+
+# 고객별 개인 추천 (기본: 최근 PERSONALIZED 분석)
+@recommendation_blueprint.route('/recommendations/customers/<customer_code>')
+def customer_recommendations(customer_code):
+    try:
+        analysis_id, after, limit = _page_args()
+    except ValueError:
+        return jsonify({"message": "Invalid paging parameter."}), 400
+
+    service = RecommendationReadService()
+    return _conditional(service, lambda version: service.customer_recommendations(
+        version, customer_code, analysis_id, after, limit))
+
+
+# 상품별 연관 추천 (기본: 상품이 포함된 최근 연관 분석)
+@recommendation_blueprint.route('/recommendations/goods/<goods_code>')
+def goods_associations(goods_code):
+    try:
+        analysis_id, after, limit = _page_args()
+    except ValueError:
+        return jsonify({"message": "Invalid paging parameter."}), 400
+
+    service = RecommendationReadService()
+    return _conditional(service, lambda version: service.goods_associations(
+        version, goods_code, analysis_id, after, limit))
+
+
+# 분석 결과 전체를 스트리밍 (chunked 응답, gzip 지원)
+# ?format=ndjson (기본, 한 줄에 추천 한 건) | json ({analysisId, kind, items: [...]})
+# 전송이 끝날 때까지 'export' 실행 슬롯을 잡는다
+@recommendation_blueprint.route('/analyses/<int:analysis_id>/export')
+def export_analysis(analysis_id):
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in ('ndjson', 'json'):
+        return jsonify({"message": "format must be 'ndjson' or 'json'."}), 400
+
+    service = ExportService()
+    kind = service.analysis_kind(analysis_id)
+    if kind is None:
+        return jsonify({"message": f"Analysis {analysis_id} not found."}), 404
+
+    if fmt == 'json':
+        return stream_response(service.iter_json(analysis_id, kind), admission='export',
+                               filename=f'analysis-{analysis_id}.json')
+    return stream_response(service.iter_ndjson(analysis_id, kind), mimetype='application/x-ndjson',
+                           admission='export', filename=f'analysis-{analysis_id}.ndjson')
@@ -0,0 +1,27 @@
+from flask import Response, request, stream_with_context
+
+from controller.admission import get_controller, AdmissionRejected
+from service.json_stream import gzip_chunks
+
+
+# bytes chunk generator 를 chunked 응답으로 보낸다.
+# 클라이언트가 gzip 을 받으면 압축하고, admission 을 주면 전송이 끝날 때까지 해당 실행 슬롯을 잡는다.
+def stream_response(chunks, mimetype='application/json', admission=None, filename=None):
+    wrapped = stream_with_context(chunks)
+    use_gzip = request.accept_encodings['gzip'] > 0
+    body = gzip_chunks(wrapped) if use_gzip else wrapped
+    if admission:
+        try:
+            body = get_controller(admission).stream(body)
+        except AdmissionRejected:
+            # stream_with_context 가 잡아 둔 요청 컨텍스트를 정리한다
+            wrapped.close()
+            raise
+
+    response = Response(body, mimetype=mimetype)
+    response.vary.add('Accept-Encoding')
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    if filename:
+        response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
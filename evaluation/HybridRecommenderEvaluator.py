@@ -4,6 +4,7 @@ import numpy as np
 from collections import defaultdict
 from surprise.model_selection import cross_validate
 import pandas as pd
+from service.bonus_rules import compute_bonus
 
 class HybridRecommenderEvaluator:
     def __init__(self, collabo_filter_service):
@@ -62,31 +63,20 @@ class HybridRecommenderEvaluator:
             )
             
             if product_info:
-                weighted_pred = base_pred
-                
-                # 피부타입 매칭 평가
-                if row['customer_skintype'] == product_info['goods_skintype']:
-                    weighted_pred += 0.5
-                    skin_match_count += 1
-                else:
-                    weighted_pred += 0.1
-                
-                # 고객 등급 평가
+                # 피부타입 / 고객 등급 / 연령대 가산점 (실시간 추천과 같은 BONUS_RULES 사용)
                 total_reviews = product_info['total']
-                if total_reviews > 0:
-                    high_grade_ratio = product_info['high_grade_count'] / total_reviews
-                    if high_grade_ratio > 0.25:
-                        weighted_pred += 0.3
-                        grade_match_count += 1
-                    else:
-                        weighted_pred += 0.1
-                
-                # 연령대 매칭 평가
-                if row['customer_age'] < 40:
-                    young_ratio = product_info['young_count'] / total_reviews
-                    if young_ratio > 0.6:
-                        weighted_pred += 0.2
-                        age_match_count += 1
+                bonus, matches = compute_bonus(
+                    row['customer_skintype'],
+                    row['customer_age'],
+                    product_info['goods_skintype'],
+                    product_info['high_grade_count'] / total_reviews if total_reviews else 0,
+                    product_info['young_count'] / total_reviews if total_reviews else 0
+                )
+                weighted_pred = base_pred + bonus
+
+                skin_match_count += matches['skintype']
+                grade_match_count += matches['high_grade']
+                age_match_count += matches['young']
                 
                 # 오차 계산
                 weighted_errors.append(abs(weighted_pred - row['review_score']))
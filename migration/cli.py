@@ -0,0 +1,43 @@
+import sys
+
+import click
+from flask.cli import AppGroup
+
+from migration.runner import upgrade, pending_migrations, check_plans
+
+# flask migrate upgrade | status | check-plans
+migrate_cli = AppGroup('migrate', help='스키마 마이그레이션')
+
+
+@migrate_cli.command('upgrade')
+@click.option('--target', type=int, default=None, help='이 번호까지만 적용')
+def upgrade_command(target):
+    done = upgrade(target)
+    print(f"{len(done)} migration(s) applied" if done else "Schema is up to date")
+
+
+@migrate_cli.command('status')
+def status_command():
+    pending = pending_migrations()
+    for version, name in pending:
+        print(f"pending {version:04d}: {name}")
+    print(f"{len(pending)} pending migration(s)")
+
+
+# 주요 조회가 인덱스를 쓰는지 확인. 빠진 인덱스가 있으면 exit code 1 (배포 전 확인용)
+@migrate_cli.command('check-plans')
+def check_plans_command():
+    pending = pending_migrations()
+    if pending:
+        print(f"{len(pending)} pending migration(s). Run 'flask migrate upgrade' first.")
+        sys.exit(1)
+
+    failed = 0
+    for name, status, plan in check_plans():
+        print(f"[{status:>8}] {name}")
+        for line in plan:
+            print(f"           {line}")
+        failed += status == 'missing'
+    if failed:
+        print(f"{failed} query plan(s) are missing their index")
+        sys.exit(1)
@@ -0,0 +1,71 @@
+from datetime import datetime
+
+from sqlalchemy import MetaData, Table, Column, Integer, String, DateTime, select, insert
+
+from model.db import db
+from migration.versions import MIGRATIONS, HOT_QUERIES
+
+# 적용된 마이그레이션 기록
+schema_migration = Table(
+    'schema_migration', MetaData(),
+    Column('version', Integer, primary_key=True, autoincrement=False),
+    Column('name', String(128), nullable=False),
+    Column('applied_at', DateTime, nullable=False)
+)
+
+
+def applied_versions():
+    with db.engine.begin() as connection:
+        schema_migration.create(connection, checkfirst=True)
+        return set(connection.execute(select(schema_migration.c.version)).scalars())
+
+
+# 적용되지 않은 마이그레이션 (version, 이름)
+def pending_migrations():
+    applied = applied_versions()
+    return [(version, name) for version, name, _ in MIGRATIONS if version not in applied]
+
+
+# 적용되지 않은 마이그레이션을 번호 순서대로 적용한다 (target 이 있으면 해당 번호까지)
+# 마이그레이션마다 별도 트랜잭션으로 적용하고 바로 기록한다 (MySQL DDL 은 자동 커밋)
+def upgrade(target=None):
+    applied = applied_versions()
+    done = []
+    for version, name, migrate in sorted(MIGRATIONS, key=lambda migration: migration[0]):
+        if version in applied or (target is not None and version > target):
+            continue
+        print(f"Applying migration {version:04d}: {name}")
+        with db.engine.begin() as connection:
+            migrate(connection)
+            connection.execute(insert(schema_migration).values(version=version, name=name,
+                                                               applied_at=datetime.utcnow()))
+        done.append((version, name))
+    return done
+
+
+def _explain(connection, sql):
+    if connection.dialect.name == 'sqlite':
+        details = [row[-1] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}')]
+        return details, details, []
+    rows = connection.exec_driver_sql(f'EXPLAIN {sql}').mappings().all()
+    plan = [f"{row['table']}: type={row['type']} key={row['key']} possible_keys={row['possible_keys']}"
+            for row in rows]
+    return plan, [row['key'] or '' for row in rows], [row['possible_keys'] or '' for row in rows]
+
+
+# 주요 조회의 실행 계획에 기대한 인덱스가 쓰이는지 확인한다.
+# MySQL/MariaDB 는 데이터가 적으면 인덱스 대신 전체 스캔을 고르기도 하므로 possible_keys 에만 있어도
+# 통과로 보되 따로 표시한다. 반환값: [(조회 이름, 결과 'used'|'possible'|'missing', 실행 계획)]
+def check_plans():
+    results = []
+    with db.engine.connect() as connection:
+        for name, sql, index in HOT_QUERIES:
+            plan, used_keys, possible_keys = _explain(connection, sql)
+            if any(index in key.split(',') or f'INDEX {index}' in key for key in used_keys):
+                status = 'used'
+            elif any(index in keys.split(',') for keys in possible_keys):
+                status = 'possible'
+            else:
+                status = 'missing'
+            results.append((name, status, plan))
+    return results
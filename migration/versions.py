@@ -0,0 +1,161 @@
+from sqlalchemy import Index, MetaData, Table, update, func
+from sqlalchemy.schema import CreateColumn
+
+from model.analysis import Analysis, OrderInfo, Review, AssociationRecommendation, PersonalizedRecommendation
+from model.analysis import AssociationRule
+
+
+# 모델에 선언된 테이블을 만든다 (이미 있으면 건너뜀)
+def create_tables(*models):
+    def upgrade(connection):
+        for model in models:
+            model.__table__.create(connection, checkfirst=True)
+    return upgrade
+
+
+# 모델에서 빠졌지만 이전 마이그레이션이 만드는 인덱스 (이름 -> 컬럼)
+RETIRED_INDEXES = {
+    'ix_association_recommendation_analysis': ('analysis_id',),  # 4번에서 지움
+}
+
+
+# DB 에 있는 테이블 정의를 읽는다 (모델과 다른 컬럼/인덱스를 다룰 때)
+def _reflect(connection, model):
+    return Table(model.__tablename__, MetaData(), autoload_with=connection)
+
+
+# 모델 __table_args__ 에 선언된 인덱스를 이름으로 골라 만든다 (이미 있으면 건너뜀)
+# 모델에서 빠진 인덱스는 RETIRED_INDEXES 의 컬럼으로 만든다
+def create_indexes(model, *names):
+    def upgrade(connection):
+        indexes = {index.name: index for index in model.__table__.indexes}
+        for name in names:
+            if name in indexes:
+                indexes[name].create(connection, checkfirst=True)
+            else:
+                table = _reflect(connection, model)
+                Index(name, *(table.c[column] for column in RETIRED_INDEXES[name])).create(connection, checkfirst=True)
+    return upgrade
+
+
+def drop_index(model, name):
+    def upgrade(connection):
+        indexes = {index.name: index for index in _reflect(connection, model).indexes}
+        if name in indexes:
+            indexes[name].drop(connection)
+    return upgrade
+
+
+# 모델에 선언된 컬럼을 기존 테이블에 추가한다 (이미 있으면 건너뜀)
+def add_columns(model, *names):
+    def upgrade(connection):
+        existing = {column.name for column in _reflect(connection, model).columns}
+        for name in names:
+            if name not in existing:
+                column = CreateColumn(model.__table__.c[name]).compile(dialect=connection.dialect)
+                connection.exec_driver_sql(f'ALTER TABLE {model.__tablename__} ADD COLUMN {column}')
+    return upgrade
+
+
+# 기존 분석은 모두 저장이 끝난 것으로 본다 (완료 시각 = 생성 시각)
+def complete_existing_analyses(connection):
+    table = _reflect(connection, Analysis)
+    connection.execute(update(table).where(table.c.completed_date.is_(None))
+                       .values(completed_date=func.coalesce(table.c.created_date, func.now())))
+
+
+def run_all(*steps):
+    def upgrade(connection):
+        for step in steps:
+            step(connection)
+    return upgrade
+
+
+# 번호 순서대로 한 번씩 적용되는 마이그레이션 (version, 이름, upgrade 함수)
+# 적용된 마이그레이션은 수정하지 말고 새 번호로 추가한다.
+MIGRATIONS = [
+    (1, 'create association_rule', create_tables(AssociationRule)),
+    (2, 'add hot query indexes', run_all(
+        create_indexes(Analysis, 'ix_analysis_kind'),
+        create_indexes(OrderInfo, 'ix_order_info_status_goods', 'ix_order_info_customer_goods',
+                       'ix_order_info_status_created', 'ix_order_info_created'),
+        create_indexes(Review, 'ix_review_created_date', 'ix_review_goods_customer', 'ix_review_customer_goods'),
+        create_indexes(PersonalizedRecommendation, 'ix_personalized_recommendation_analysis_customer'),
+        create_indexes(AssociationRecommendation, 'ix_association_recommendation_goods_analysis'),
+        create_indexes(AssociationRule, 'ix_association_rule_antecedent'),
+    )),
+    (3, 'add association_recommendation analysis index',
+     create_indexes(AssociationRecommendation, 'ix_association_recommendation_analysis')),
+    (4, 'add notification due indexes', run_all(
+        create_indexes(PersonalizedRecommendation, 'ix_personalized_recommendation_noti'),
+        create_indexes(AssociationRecommendation, 'ix_association_recommendation_noti'),
+        # (analysis_id, last_noti_sent_date) 인덱스가 analysis_id 조회도 맡으므로 3번 인덱스는 지운다
+        drop_index(AssociationRecommendation, 'ix_association_recommendation_analysis'),
+    )),
+    (5, 'add analysis completed_date', run_all(
+        add_columns(Analysis, 'completed_date'),
+        complete_existing_analyses,
+    )),
+    (6, 'add analysis params', add_columns(Analysis, 'analysis_params')),
+]
+
+
+# 인덱스가 필요한 주요 조회와 사용해야 하는 인덱스 (check-plans 에서 실행 계획으로 확인)
+HOT_QUERIES = [
+    ('apriori purchases by status + goods',
+     "SELECT customer_code, goods_code, order_count FROM order_info "
+     "WHERE order_status = 'PURCHASED' AND goods_code IN ('G000', 'G001')",
+     'ix_order_info_status_goods'),
+    ('net purchase counts by customer',
+     "SELECT customer_code, goods_code, order_status, order_count FROM order_info "
+     "WHERE customer_code IN ('C0000', 'C0001')",
+     'ix_order_info_customer_goods'),
+    ('purchases by created date',
+     "SELECT customer_code, goods_code, created_date FROM order_info "
+     "WHERE order_status = 'PURCHASED' AND created_date >= '2024-01-01' AND created_date < '2024-01-02'",
+     'ix_order_info_status_created'),
+    ('latest reviews',
+     "SELECT review_id, customer_code, goods_code, review_score FROM review "
+     "ORDER BY created_date DESC LIMIT 2000",
+     'ix_review_created_date'),
+    ('reviews by goods (statis join)',
+     "SELECT r.goods_code, c.customer_grade, r.review_score FROM review r "
+     "JOIN customer c ON c.customer_code = r.customer_code WHERE r.goods_code IN ('G000', 'G001')",
+     'ix_review_goods_customer'),
+    ('reviews by customer (fold-in)',
+     "SELECT customer_code, goods_code, review_score, created_date FROM review "
+     "WHERE customer_code IN ('C0000', 'C0001')",
+     'ix_review_customer_goods'),
+    ('personalized recommendations by analysis + customer',
+     "SELECT personalized_recommendation_id, goods_code, recommendation_score FROM personalized_recommendation "
+     "WHERE analysis_id = 1 AND customer_code = 'C0000' AND personalized_recommendation_id > 0 "
+     "ORDER BY personalized_recommendation_id LIMIT 51",
+     'ix_personalized_recommendation_analysis_customer'),
+    ('associations by analysis + goods',
+     "SELECT association_recommendation_id, associated_goods_code, support, confidence, lift "
+     "FROM association_recommendation WHERE analysis_id = 1 AND goods_code = 'G000' "
+     "AND association_recommendation_id > 0 ORDER BY association_recommendation_id LIMIT 51",
+     'ix_association_recommendation_goods_analysis'),
+    ('association export by analysis',
+     "SELECT goods_code, associated_goods_code, support, confidence, lift FROM association_recommendation "
+     "WHERE analysis_id = 1",
+     'ix_association_recommendation_noti'),
+    ('personalized export by analysis',
+     "SELECT customer_code, goods_code, recommendation_score FROM personalized_recommendation "
+     "WHERE analysis_id = 1 ORDER BY customer_code",
+     'ix_personalized_recommendation_analysis_customer'),
+    ('due personalized notifications',
+     "SELECT personalized_recommendation_id, customer_code, goods_code FROM personalized_recommendation "
+     "WHERE analysis_id = 1 AND (last_noti_sent_date IS NULL OR last_noti_sent_date < '2024-01-01') LIMIT 500",
+     'ix_personalized_recommendation_noti'),
+    ('latest association analysis for goods',
+     "SELECT MAX(analysis_id) FROM association_recommendation WHERE goods_code = 'G000'",
+     'ix_association_recommendation_goods_analysis'),
+    ('latest analysis by kind',
+     "SELECT MAX(analysis_id) FROM analysis WHERE analysis_kind = 'PERSONALIZED' AND completed_date IS NOT NULL",
+     'ix_analysis_kind'),
+    ('association rules by antecedent',
+     "SELECT consequent_goods_code, support, confidence, lift FROM association_rule "
+     "WHERE analysis_id = 1 AND antecedent_key IN ('G000', 'G000,G001')",
+     'ix_association_rule_antecedent'),
+]
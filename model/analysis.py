@@ -10,12 +10,19 @@ from model.enums import AnalysisKind, CustomerGender, CustomerGrade, OrderState
 # 분석 entity
 class Analysis(db.Model):
     __tablename__ = 'analysis'
+    __table_args__ = (
+        db.Index('ix_analysis_kind', 'analysis_kind', 'analysis_id'),
+    )
 
     analysis_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     analysis_kind = db.Column(SqlAlchemyEnum(AnalysisKind), nullable=False)
     analysis_title = db.Column(db.String(128))
     analysis_description = db.Column(db.String(256))
     created_date = db.Column(db.DateTime, default=datetime.utcnow)  # 기본값 설정
+    # 결과 저장이 끝난 시각 (저장 중이면 NULL). 최근 분석을 고르는 조회는 완료된 분석만 본다.
+    completed_date = db.Column(db.DateTime, nullable=True)
+    # 분석 조건 JSON (상품별 연관 분석의 기준값/기간). 자동 갱신이 같은 조건으로 다시 분석할 때 사용한다.
+    analysis_params = db.Column(db.String(255), nullable=True)
 
 # 고객 entity
 class Customer(db.Model):
@@ -36,6 +43,13 @@ class Customer(db.Model):
 # 주문 entity
 class OrderInfo(db.Model):
     __tablename__ = 'order_info'
+    # 연관 분석(상태 + 상품 IN), 고객별 순 구매 수량 집계, 기간 조회용 covering 인덱스
+    __table_args__ = (
+        db.Index('ix_order_info_status_goods', 'order_status', 'goods_code', 'customer_code', 'order_count'),
+        db.Index('ix_order_info_customer_goods', 'customer_code', 'goods_code', 'order_status', 'order_count'),
+        db.Index('ix_order_info_status_created', 'order_status', 'created_date', 'customer_code', 'goods_code'),
+        db.Index('ix_order_info_created', 'created_date', 'customer_code', 'goods_code'),
+    )
 
     order_id = db.Column(db.Integer, primary_key=True)
     customer_code = db.Column(db.String(20), db.ForeignKey('customer.customer_code'), nullable=False)
@@ -60,6 +74,12 @@ class Goods(db.Model):
 # association_recommendation 엔티티
 class AssociationRecommendation(db.Model):
     __tablename__ = 'association_recommendation'
+    # 보조 인덱스에는 PK 가 포함되므로 (상품, 분석) 인덱스로 PK keyset 페이지와 최근 분석 조회를 함께 처리한다
+    # (분석) 인덱스는 분석 단위 내보내기/삭제용
+    __table_args__ = (
+        db.Index('ix_association_recommendation_goods_analysis', 'goods_code', 'analysis_id'),
+        db.Index('ix_association_recommendation_noti', 'analysis_id', 'last_noti_sent_date'),
+    )
 
     association_recommendation_id = db.Column(db.Integer, primary_key=True)
     goods_code = db.Column(db.String(20), db.ForeignKey('goods.goods_code'), nullable=False)
@@ -86,6 +106,12 @@ class SubCategory(db.Model):
 
 class Review(db.Model):
     __tablename__ = 'review'
+    # 최신순 조회, 고객/상품 조인 및 고객별/상품별 평점 스트리밍용 covering 인덱스
+    __table_args__ = (
+        db.Index('ix_review_created_date', 'created_date'),
+        db.Index('ix_review_goods_customer', 'goods_code', 'customer_code', 'review_score', 'created_date'),
+        db.Index('ix_review_customer_goods', 'customer_code', 'goods_code', 'review_score', 'created_date'),
+    )
 
     review_id = db.Column(db.Integer, primary_key=True)
     customer_code = db.Column(db.String(20), db.ForeignKey('customer.customer_code'), nullable=False)
@@ -97,9 +123,30 @@ class Review(db.Model):
     # personalized_recommendation 엔티티
 class PersonalizedRecommendation(db.Model):
     __tablename__ = 'personalized_recommendation'
+    __table_args__ = (
+        db.Index('ix_personalized_recommendation_analysis_customer', 'analysis_id', 'customer_code'),
+        db.Index('ix_personalized_recommendation_noti', 'analysis_id', 'last_noti_sent_date'),
+    )
     personalized_recommendation_id = db.Column(db.Integer, primary_key=True, autoincrement=True)  # autoincrement 추가
     customer_code = db.Column(db.String(20), db.ForeignKey('customer.customer_code'), nullable=False)
     goods_code = db.Column(db.String(20), db.ForeignKey('goods.goods_code'),nullable=False)
     analysis_id = db.Column(db.Integer, db.ForeignKey('analysis.analysis_id'), nullable=False)
     recommendation_score = db.Column(db.Float, nullable=False)
-    last_noti_sent_date = db.Column(db.DateTime, nullable=True)
\ No newline at end of file
+    last_noti_sent_date = db.Column(db.DateTime, nullable=True)
+
+# association_rule 엔티티 (전체 카탈로그 FP-Growth 연관 규칙)
+# antecedent_key : 조건 상품 코드들을 정렬해 ','로 이은 값. "A, B 구매 -> C 추천" 조회는 이 키로 찾는다.
+class AssociationRule(db.Model):
+    __tablename__ = 'association_rule'
+    __table_args__ = (
+        db.Index('ix_association_rule_antecedent', 'analysis_id', 'antecedent_key'),
+    )
+
+    association_rule_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    analysis_id = db.Column(db.Integer, db.ForeignKey('analysis.analysis_id'), nullable=False)
+    antecedent_key = db.Column(db.String(255), nullable=False)
+    antecedent_size = db.Column(db.Integer, nullable=False)
+    consequent_goods_code = db.Column(db.String(20), db.ForeignKey('goods.goods_code'), nullable=False)
+    support = db.Column(db.Float, nullable=False)
+    confidence = db.Column(db.Float, nullable=False)
+    lift = db.Column(db.Float, nullable=False)
@@ -8,7 +8,8 @@ db = SQLAlchemy()
 
 def init_app(app):
     """Flask 앱 초기화 및 SQLAlchemy 설정."""
-    app.config['SQLALCHEMY_DATABASE_URI'] = (
+    # DATABASE_URL 이 있으면 우선 사용 (로컬 대체 DB 등)
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL') or (
         f"mysql+pymysql://{os.getenv('MARIADB_USER')}:{os.getenv('MARIADB_PASSWORD')}"
         f"@{os.getenv('MARIADB_HOST')}:{os.getenv('MARIADB_PORT')}/{os.getenv('MARIADB_DATABASE')}"
     )
@@ -0,0 +1,89 @@
+from datetime import datetime
+
+from sqlalchemy import select, delete, update, func, exists
+
+from model.analysis import Analysis, PersonalizedRecommendation, AssociationRecommendation, AssociationRule
+from model.db import db
+
+# 분석 ID 로 지워야 하는 하위 테이블 (모델, PK 컬럼)
+CHILD_TABLES = (
+    (PersonalizedRecommendation, PersonalizedRecommendation.personalized_recommendation_id),
+    (AssociationRecommendation, AssociationRecommendation.association_recommendation_id),
+    (AssociationRule, AssociationRule.association_rule_id),
+)
+
+
+# 저장이 끝난 가장 최근 연관 규칙 분석 ID 조회
+def latest_completed_rule_analysis():
+    return select(func.max(AssociationRule.analysis_id)).join(
+        Analysis, Analysis.analysis_id == AssociationRule.analysis_id
+    ).where(Analysis.completed_date.isnot(None))
+
+
+class AnalysisRepository:
+    def __init__(self):
+        self.db = db
+
+    # 분석 종류별 완료된 최근 keep 개를 제외한 분석 ID (오래된 순). 저장 중인 분석은 지우지 않는다.
+    def expired_analysis_ids(self, kind, keep):
+        query = select(Analysis.analysis_id).where(
+            Analysis.analysis_kind == kind,
+            Analysis.completed_date.isnot(None)
+        ).order_by(Analysis.analysis_id.desc()).offset(keep)
+        return sorted(self.db.session.execute(query).scalars())
+
+    # 연관 분석 중 상품별 완료된 최근 keep 개에 들지 않는 분석 ID (오래된 순).
+    # 상품별 분석(/apriori)은 (goods_code, analysis_id) 인덱스로 상품마다 순위를 매기고,
+    # 추천 행이 없는 분석(전체 카탈로그 규칙 마이닝)은 따로 최근 keep 개를 남긴다.
+    def expired_association_analysis_ids(self, keep):
+        completed = select(Analysis.analysis_id).where(
+            Analysis.analysis_kind == 'ASSOCIATION',
+            Analysis.completed_date.isnot(None)
+        )
+        pairs = select(AssociationRecommendation.goods_code, AssociationRecommendation.analysis_id).where(
+            AssociationRecommendation.analysis_id.in_(completed)
+        ).distinct().subquery()
+        ranked = select(
+            pairs.c.analysis_id,
+            func.row_number().over(partition_by=pairs.c.goods_code, order_by=pairs.c.analysis_id.desc()).label('rank')
+        ).subquery()
+        kept = select(ranked.c.analysis_id).where(ranked.c.rank <= keep)
+        has_rows = exists().where(AssociationRecommendation.analysis_id == Analysis.analysis_id)
+
+        per_goods = completed.where(has_rows, Analysis.analysis_id.not_in(kept))
+        catalog = completed.where(~has_rows).order_by(Analysis.analysis_id.desc()).offset(keep)
+        return sorted([*self.db.session.execute(per_goods).scalars(), *self.db.session.execute(catalog).scalars()])
+
+    # 가장 최근 연관 규칙 분석 (규칙 조회가 사용하므로 보관 개수와 관계없이 남긴다)
+    def latest_rule_analysis_id(self):
+        return self.db.session.execute(latest_completed_rule_analysis()).scalar()
+
+    # 나눠 저장한 분석의 저장이 끝났음을 기록한다 (이미 완료된 분석은 그대로 둔다)
+    def mark_completed(self, analysis_id):
+        self.db.session.execute(update(Analysis).where(
+            Analysis.analysis_id == analysis_id,
+            Analysis.completed_date.is_(None)
+        ).values(completed_date=datetime.utcnow()).execution_options(synchronize_session=False))
+        self.db.session.commit()
+
+    # analysis_id 인덱스로 하위 행 PK 를 batch_size 개 조회해 삭제한다. 반환값: 삭제한 행 수
+    def delete_child_batch(self, model, pk_column, analysis_id, batch_size):
+        ids = self.db.session.execute(
+            select(pk_column).where(model.analysis_id == analysis_id).limit(batch_size)
+        ).scalars().all()
+        if ids:
+            self.db.session.execute(delete(model).where(pk_column.in_(ids))
+                                    .execution_options(synchronize_session=False))
+        self.db.session.commit()
+        return len(ids)
+
+    def delete_analysis_row(self, analysis_id):
+        self.db.session.execute(delete(Analysis).where(Analysis.analysis_id == analysis_id)
+                                .execution_options(synchronize_session=False))
+        self.db.session.commit()
+
+    # 분석의 하위 행 수
+    def count_children(self, model, analysis_id):
+        return self.db.session.execute(
+            select(func.count()).select_from(model).where(model.analysis_id == analysis_id)
+        ).scalar()
@@ -1 +1,45 @@
+from sqlalchemy import select, insert
 
+from model.analysis import AssociationRule, Goods, SubCategory
+from model.db import db
+from repository.analysis_repository import latest_completed_rule_analysis
+
+
+class AprioriRepository:
+    def __init__(self):
+        self.db = db
+
+    # 규칙 테이블이 없으면 생성한다
+    def ensure_rule_table(self):
+        AssociationRule.__table__.create(self.db.engine, checkfirst=True)
+
+    # 규칙 목록(dict)을 batch_size 개씩 bulk insert 한다
+    def save_rules(self, rules, batch_size=5000):
+        batch = []
+        for rule in rules:
+            batch.append(rule)
+            if len(batch) >= batch_size:
+                self.db.session.execute(insert(AssociationRule), batch)
+                batch = []
+        if batch:
+            self.db.session.execute(insert(AssociationRule), batch)
+        self.db.session.commit()
+
+    # 가장 최근 규칙 마이닝 분석 ID
+    def latest_rule_analysis_id(self):
+        return self.db.session.execute(latest_completed_rule_analysis()).scalar()
+
+    # 조건 상품 키 목록에 해당하는 규칙 조회 (antecedent_key 인덱스 조회)
+    def find_rules(self, analysis_id, antecedent_keys):
+        query = select(AssociationRule).where(
+            AssociationRule.analysis_id == analysis_id,
+            AssociationRule.antecedent_key.in_(list(antecedent_keys))
+        )
+        return self.db.session.execute(query).scalars().all()
+
+    # 상품 코드 -> 상위 카테고리 코드
+    def goods_top_categories(self):
+        query = select(Goods.goods_code, SubCategory.top_category_code).join(
+            SubCategory, SubCategory.sub_category_code == Goods.sub_category_code
+        )
+        return dict(self.db.session.execute(query).all())
@@ -0,0 +1,67 @@
+from sqlalchemy import select, update, or_, func
+
+from model.analysis import Analysis, PersonalizedRecommendation, AssociationRecommendation
+from model.db import db
+from model.enums import AnalysisKind
+
+# 분석 종류별 (모델, PK 컬럼, 발송에 필요한 컬럼)
+NOTIFICATION_TABLES = {
+    AnalysisKind.PERSONALIZED: (
+        PersonalizedRecommendation,
+        PersonalizedRecommendation.personalized_recommendation_id,
+        (PersonalizedRecommendation.customer_code, PersonalizedRecommendation.goods_code,
+         PersonalizedRecommendation.recommendation_score)
+    ),
+    AnalysisKind.ASSOCIATION: (
+        AssociationRecommendation,
+        AssociationRecommendation.association_recommendation_id,
+        (AssociationRecommendation.goods_code, AssociationRecommendation.associated_goods_code,
+         AssociationRecommendation.lift)
+    ),
+}
+
+
+class NotificationRepository:
+    def __init__(self):
+        self.db = db
+
+    # 저장이 끝난 가장 최근 분석 ID (배치가 저장 중인 분석의 일부만 발송하지 않는다)
+    def latest_analysis_id(self, kind):
+        return self.db.session.execute(
+            select(func.max(Analysis.analysis_id)).where(
+                Analysis.analysis_kind == kind, Analysis.completed_date.isnot(None))
+        ).scalar()
+
+    # 발송 대상(미발송 또는 due_before 이전 발송) 추천을 batch_size 개 잠그고 발송 시각을 한 번에 기록한다.
+    # SKIP LOCKED 로 다른 worker 가 잠근 행은 건너뛰므로 여러 worker 가 같은 행을 가져가지 않는다.
+    def claim(self, kind, analysis_id, due_before, batch_size, now):
+        model, pk_column, columns = NOTIFICATION_TABLES[kind]
+        try:
+            rows = self.db.session.execute(
+                select(pk_column, *columns).where(
+                    model.analysis_id == analysis_id,
+                    or_(model.last_noti_sent_date.is_(None), model.last_noti_sent_date < due_before)
+                ).limit(batch_size).with_for_update(skip_locked=True)
+            ).all()
+            if rows:
+                self.db.session.execute(
+                    update(model).where(pk_column.in_([row[0] for row in rows]))
+                    .values(last_noti_sent_date=now)
+                    .execution_options(synchronize_session=False)
+                )
+            self.db.session.commit()
+            return rows
+        except Exception:
+            self.db.session.rollback()
+            raise
+
+    # 발송에 실패한 추천을 다시 대상으로 돌린다 (이번 claim 으로 기록한 행만)
+    def release(self, kind, ids, claimed_at):
+        model, pk_column, _ = NOTIFICATION_TABLES[kind]
+        result = self.db.session.execute(
+            update(model).where(pk_column.in_(ids), model.last_noti_sent_date == claimed_at)
+            .values(last_noti_sent_date=None)
+            .execution_options(synchronize_session=False)
+        )
+        self.db.session.commit()
+        return result.rowcount
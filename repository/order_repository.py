@@ -0,0 +1,78 @@
+from sqlalchemy import select, func, case
+
+from model.analysis import OrderInfo
+from model.db import db
+from model.enums import OrderState
+
+
+class OrderRepository:
+    def __init__(self):
+        self.db = db
+
+    def _stream(self, query, chunk_size):
+        result = self.db.session.execute(query.execution_options(yield_per=chunk_size))
+        for partition in result.partitions():
+            yield partition
+
+    # (고객, 상품)별 순 구매 수량을 chunk 단위로 스트리밍 조회한다.
+    # PURCHASED 수량에서 REFUNDED / CANCELLED 수량을 뺀 값이며 집계는 DB 에서 수행한다.
+    # customer_codes / goods_codes 를 주면 해당 고객 또는 상품만 조회한다 (IN 목록은 1000개씩).
+    def stream_net_purchase_counts(self, chunk_size=10000, customer_codes=None, goods_codes=None):
+        net_count = func.sum(
+            case(
+                (OrderInfo.order_status == OrderState.PURCHASED, OrderInfo.order_count),
+                else_=-OrderInfo.order_count
+            )
+        ).label('net_count')
+
+        query = select(
+            OrderInfo.customer_code,
+            OrderInfo.goods_code,
+            net_count
+        ).group_by(OrderInfo.customer_code, OrderInfo.goods_code)
+
+        if customer_codes is None and goods_codes is None:
+            yield from self._stream(query, chunk_size)
+            return
+
+        column, codes = (OrderInfo.customer_code, customer_codes) if customer_codes is not None \
+            else (OrderInfo.goods_code, goods_codes)
+        codes = list(codes)
+        for start in range(0, len(codes), 1000):
+            yield from self._stream(query.where(column.in_(codes[start:start + 1000])), chunk_size)
+
+    # since 이후 주문이 발생한 (고객, 상품) 쌍
+    def stream_changed_pairs(self, since, chunk_size=10000):
+        query = select(
+            OrderInfo.customer_code,
+            OrderInfo.goods_code
+        ).where(OrderInfo.created_date >= since).distinct()
+        yield from self._stream(query, chunk_size)
+
+    # [start, end) 기간의 구매(PURCHASED) 주문 (고객, 상품, 주문일시)를 주문일시 순으로 스트리밍 조회한다
+    def stream_purchases_between(self, start, end, chunk_size=10000):
+        query = select(
+            OrderInfo.customer_code,
+            OrderInfo.goods_code,
+            OrderInfo.created_date
+        ).where(
+            OrderInfo.order_status == OrderState.PURCHASED,
+            OrderInfo.created_date >= start,
+            OrderInfo.created_date < end
+        ).order_by(OrderInfo.created_date)
+        yield from self._stream(query, chunk_size)
+
+    def max_order_id(self):
+        return self.db.session.execute(select(func.max(OrderInfo.order_id))).scalar() or 0
+
+    # 주문 (주문 ID, 상품, 주문일시) 스트리밍 조회.
+    # since 가 있으면 since 이후 주문일시 (created_date 인덱스), 없으면 after_order_id 이후 주문 (PK 범위)
+    def stream_order_times(self, after_order_id=0, until_order_id=None, since=None, chunk_size=10000):
+        query = select(OrderInfo.order_id, OrderInfo.goods_code, OrderInfo.created_date)
+        if since is not None:
+            query = query.where(OrderInfo.created_date >= since)
+        else:
+            query = query.where(OrderInfo.order_id > after_order_id)
+        if until_order_id is not None:
+            query = query.where(OrderInfo.order_id <= until_order_id)
+        yield from self._stream(query, chunk_size)
@@ -0,0 +1,124 @@
+from sqlalchemy import select, func
+
+from model.analysis import Analysis, PersonalizedRecommendation, AssociationRecommendation
+from model.db import db
+from model.enums import AnalysisKind
+
+
+class RecommendationRepository:
+    def __init__(self):
+        self.db = db
+
+    # 저장된 분석/추천 데이터의 버전 (각 테이블의 최대 PK, 마지막 분석 완료 시각).
+    # 어느 worker 에서든 새 행이 쓰이거나 분석이 완료되면 바뀐다.
+    def version(self):
+        return tuple(self.db.session.execute(select(
+            select(func.max(Analysis.analysis_id)).scalar_subquery(),
+            select(func.max(Analysis.completed_date)).scalar_subquery(),
+            select(func.max(PersonalizedRecommendation.personalized_recommendation_id)).scalar_subquery(),
+            select(func.max(AssociationRecommendation.association_recommendation_id)).scalar_subquery()
+        )).one())
+
+    # 분석 종류별 가장 최근 분석
+    def latest_analyses(self, kinds):
+        latest_ids = select(func.max(Analysis.analysis_id)).where(
+            Analysis.analysis_kind.in_(kinds),
+            Analysis.completed_date.isnot(None)
+        ).group_by(Analysis.analysis_kind)
+        query = select(
+            Analysis.analysis_id,
+            Analysis.analysis_kind,
+            Analysis.analysis_title,
+            Analysis.analysis_description,
+            Analysis.created_date
+        ).where(Analysis.analysis_id.in_(latest_ids))
+        return self.db.session.execute(query).all()
+
+    # 저장이 끝난 가장 최근 분석 ID
+    def latest_analysis_id(self, kind):
+        return self.db.session.execute(
+            select(func.max(Analysis.analysis_id)).where(
+                Analysis.analysis_kind == kind, Analysis.completed_date.isnot(None))
+        ).scalar()
+
+    # 상품이 포함된 가장 최근 연관 분석 ID
+    def latest_association_analysis_id(self, goods_code):
+        return self.db.session.execute(
+            select(func.max(AssociationRecommendation.analysis_id)).where(
+                AssociationRecommendation.goods_code == goods_code)
+        ).scalar()
+
+    # 상품별 가장 최근 연관 분석 (상품, 분석 ID, 종류, 제목, 설명, 조건, 생성일시)
+    # (goods_code, analysis_id) 인덱스로 상품별 최대 analysis_id 를 구한다
+    def last_association_analyses(self):
+        latest = select(
+            AssociationRecommendation.goods_code,
+            func.max(AssociationRecommendation.analysis_id).label('analysis_id')
+        ).group_by(AssociationRecommendation.goods_code).subquery()
+        query = select(
+            latest.c.goods_code,
+            Analysis.analysis_id,
+            Analysis.analysis_kind,
+            Analysis.analysis_title,
+            Analysis.analysis_description,
+            Analysis.analysis_params,
+            Analysis.created_date
+        ).join(Analysis, Analysis.analysis_id == latest.c.analysis_id)
+        return self.db.session.execute(query).all()
+
+    # 고객의 개인별 추천 (PK keyset 페이지, limit + 1 개 조회)
+    def personalized_page(self, customer_code, analysis_id, after, limit):
+        query = select(
+            PersonalizedRecommendation.personalized_recommendation_id,
+            PersonalizedRecommendation.goods_code,
+            PersonalizedRecommendation.recommendation_score
+        ).where(
+            PersonalizedRecommendation.analysis_id == analysis_id,
+            PersonalizedRecommendation.customer_code == customer_code,
+            PersonalizedRecommendation.personalized_recommendation_id > after
+        ).order_by(PersonalizedRecommendation.personalized_recommendation_id).limit(limit + 1)
+        return self.db.session.execute(query).all()
+
+    # 상품의 연관 추천 (PK keyset 페이지, limit + 1 개 조회)
+    def association_page(self, goods_code, analysis_id, after, limit):
+        query = select(
+            AssociationRecommendation.association_recommendation_id,
+            AssociationRecommendation.associated_goods_code,
+            AssociationRecommendation.support,
+            AssociationRecommendation.confidence,
+            AssociationRecommendation.lift
+        ).where(
+            AssociationRecommendation.analysis_id == analysis_id,
+            AssociationRecommendation.goods_code == goods_code,
+            AssociationRecommendation.association_recommendation_id > after
+        ).order_by(AssociationRecommendation.association_recommendation_id).limit(limit + 1)
+        return self.db.session.execute(query).all()
+
+    def analysis_kind(self, analysis_id):
+        return self.db.session.execute(
+            select(Analysis.analysis_kind).where(Analysis.analysis_id == analysis_id)
+        ).scalar()
+
+    # 분석의 추천 행 전체를 chunk 단위로 스트리밍한다 (yield_per: 서버 사이드 커서)
+    # 개인별 추천은 (analysis_id, customer_code) 인덱스 순서대로 고객별로 모아서 읽는다.
+    def stream_analysis_rows(self, analysis_id, kind, chunk_size=10000):
+        if kind == AnalysisKind.PERSONALIZED:
+            query = select(
+                PersonalizedRecommendation.customer_code,
+                PersonalizedRecommendation.goods_code,
+                PersonalizedRecommendation.recommendation_score
+            ).where(
+                PersonalizedRecommendation.analysis_id == analysis_id
+            ).order_by(PersonalizedRecommendation.customer_code)
+        else:
+            query = select(
+                AssociationRecommendation.goods_code,
+                AssociationRecommendation.associated_goods_code,
+                AssociationRecommendation.support,
+                AssociationRecommendation.confidence,
+                AssociationRecommendation.lift
+            ).where(AssociationRecommendation.analysis_id == analysis_id)
+
+        result = self.db.session.execute(query.execution_options(yield_per=chunk_size))
+        for partition in result.partitions():
+            yield partition
@@ -0,0 +1,58 @@
+from sqlalchemy import select
+
+from model.analysis import Review, Customer, Goods
+from model.db import db
+
+
+class ReviewRepository:
+    def __init__(self):
+        self.db = db
+
+    def _ratings_query(self):
+        return select(
+            Review.customer_code,
+            Review.goods_code,
+            Review.review_score,
+            Review.created_date
+        )
+
+    def _stream(self, query, chunk_size):
+        result = self.db.session.execute(query.execution_options(yield_per=chunk_size))
+        for partition in result.partitions():
+            yield partition
+
+    # 리뷰 (고객, 상품, 평점, 작성일)을 chunk 단위로 스트리밍 조회한다.
+    # yield_per 를 지정하면 서버 사이드 커서를 사용하므로 전체 결과를 메모리에 올리지 않는다.
+    def stream_ratings(self, since=None, chunk_size=10000):
+        query = self._ratings_query()
+        if since is not None:
+            query = query.where(Review.created_date >= since)
+        yield from self._stream(query, chunk_size)
+
+    # 특정 고객들 또는 상품들의 리뷰 전체 이력 조회 (IN 목록은 1000개씩 나눠 조회)
+    def stream_ratings_for(self, customer_codes=None, goods_codes=None, chunk_size=10000):
+        column, codes = (Review.customer_code, customer_codes) if customer_codes is not None \
+            else (Review.goods_code, goods_codes)
+        codes = list(codes)
+        for start in range(0, len(codes), 1000):
+            query = self._ratings_query().where(column.in_(codes[start:start + 1000]))
+            yield from self._stream(query, chunk_size)
+
+    # 최근 리뷰 limit 건과 고객/상품 정보
+    # (고객, 나이, 등급, 상품, 상품명, 상품 피부 타입, 평점)을 chunk 단위로 스트리밍 조회한다
+    def stream_latest_reviews(self, limit=2000, chunk_size=10000):
+        latest_reviews = select(Review).order_by(Review.created_date.desc()).limit(limit).subquery()
+        query = select(
+            Customer.customer_code,
+            Customer.customer_age,
+            Customer.customer_grade,
+            latest_reviews.c.goods_code,
+            Goods.goods_name,
+            Goods.goods_skintype,
+            latest_reviews.c.review_score
+        ).join(
+            Goods, Goods.goods_code == latest_reviews.c.goods_code
+        ).join(
+            Customer, Customer.customer_code == latest_reviews.c.customer_code
+        )
+        yield from self._stream(query, chunk_size)
@@ -0,0 +1,104 @@
+import numpy as np
+from joblib import Parallel, delayed
+
+from service.factor_model import FactorModel
+
+
+# 한 블록(고객 또는 상품 묶음)의 factor 를 최소제곱으로 한 번에 푼다.
+# confidence : 행 = 풀 대상, 열 = 고정된 쪽. 값은 (c - 1) = alpha * 구매 수량
+#   x_u = (Y^T Y + Y^T (C_u - I) Y + reg * I)^-1 Y^T C_u p_u
+def _solve_block(confidence, fixed, gram, rows, regularization):
+    n_factors = fixed.shape[1]
+    A = np.repeat((gram + regularization * np.eye(n_factors))[np.newaxis], len(rows), axis=0)
+    b = np.zeros((len(rows), n_factors))
+
+    for n, row in enumerate(rows):
+        start, end = confidence.indptr[row], confidence.indptr[row + 1]
+        if start == end:
+            continue
+        conf = confidence.data[start:end]
+        Y = fixed[confidence.indices[start:end]]
+        A[n] += (Y.T * conf) @ Y
+        b[n] = Y.T @ (conf + 1.0)
+
+    return np.linalg.solve(A, b[..., np.newaxis])[..., 0]
+
+
+# 구매 수량 행렬을 confidence (c - 1 = alpha * 수량) 행렬로 변환한다. 0 이하 수량은 무시한다.
+def to_confidence(counts, alpha):
+    confidence = counts.tocsr().astype(np.float64)
+    confidence.data = np.where(confidence.data > 0, confidence.data * alpha, 0)
+    confidence.eliminate_zeros()
+    return confidence
+
+
+# 반대편 factor 를 고정하고 counts 의 행(이력이 있는 행만)에 대한 factor 를 푼다.
+# 전체 재학습 없이 새 고객/상품을 기존 모델에 반영할 때 사용한다.
+def fold_in_rows(counts, fixed, regularization, alpha, rows):
+    confidence = to_confidence(counts, alpha)
+    gram = fixed.T @ fixed
+    return _solve_block(confidence, fixed, gram, rows, regularization)
+
+
+# 구매 이력(implicit feedback) 기반 ALS (Hu, Koren, Volinsky 2008)
+# 고객/상품 factor 를 번갈아 고정하고 블록 단위 최소제곱을 여러 코어에서 병렬로 푼다.
+class ImplicitALS:
+    def __init__(self, factors=50, regularization=0.1, alpha=40.0, iterations=15, n_jobs=-1, random_state=42):
+        self.factors = factors
+        self.regularization = regularization
+        self.alpha = alpha
+        self.iterations = iterations
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.user_factors = None
+        self.item_factors = None
+        self.trained_goods = None
+        self.trained_customers = None
+
+    def _solve(self, confidence, fixed, parallel):
+        gram = fixed.T @ fixed
+        active = np.flatnonzero(np.diff(confidence.indptr))
+        blocks = [block for block in np.array_split(active, max(1, len(active) // 256)) if len(block)]
+
+        solved = np.zeros((confidence.shape[0], fixed.shape[1]))
+        results = parallel(delayed(_solve_block)(confidence, fixed, gram, block, self.regularization)
+                           for block in blocks)
+        for block, result in zip(blocks, results):
+            solved[block] = result
+        return solved
+
+    # counts : 고객 x 상품 csr 행렬 (순 구매 수량, 0 이하는 무시)
+    def fit(self, counts):
+        confidence = to_confidence(counts, self.alpha)
+        self.trained_goods = confidence.getnnz(axis=0) > 0
+        self.trained_customers = confidence.getnnz(axis=1) > 0
+        confidence_t = confidence.T.tocsr()
+
+        rng = np.random.default_rng(self.random_state)
+        n_customers, n_goods = confidence.shape
+        self.user_factors = np.zeros((n_customers, self.factors))
+        self.item_factors = rng.normal(scale=0.01, size=(n_goods, self.factors))
+
+        # 스레드 백엔드: numpy 의 행렬 연산은 GIL 을 풀기 때문에 factor 행렬을 복사하지 않고 공유한다
+        with Parallel(n_jobs=self.n_jobs, prefer='threads') as parallel:
+            for _ in range(self.iterations):
+                self.user_factors = self._solve(confidence, self.item_factors, parallel)
+                self.item_factors = self._solve(confidence_t, self.user_factors, parallel)
+        return self
+
+    # 선호도(0~1)를 평점 범위로 변환해 FactorModel 로 넘긴다: est = clip(1 + 4 * x_u . y_i)
+    def to_factor_model(self, rating_scale=(1, 5)):
+        low, high = rating_scale
+        n_customers, n_goods = len(self.user_factors), len(self.item_factors)
+        return FactorModel(
+            global_mean=low,
+            bu=np.zeros(n_customers, dtype=np.float32),
+            bi=np.zeros(n_goods, dtype=np.float32),
+            pu=(self.user_factors * (high - low)).astype(np.float32),
+            qi=self.item_factors.astype(np.float32),
+            rating_scale=rating_scale,
+            kind='als',
+            trained_goods=self.trained_goods,
+            trained_customers=self.trained_customers,
+            meta={'alpha': self.alpha, 'regularization': self.regularization}
+        )
@@ -0,0 +1,45 @@
+import threading
+from collections import OrderedDict
+
+from config import APRIORI_CACHE_SIZE
+
+
+# 크기가 제한된 LRU 캐시 (프로세스 내, 스레드 안전)
+class LRUCache:
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# /apriori 결과 캐시: (상품 코드, 분석 종류, 기준값, 상위 카테고리 주문 watermark) -> 분석 결과
+apriori_cache = LRUCache(APRIORI_CACHE_SIZE)
@@ -1,22 +1,66 @@
+import json
+from datetime import date, datetime, timedelta
+
+import numpy as np
 import pandas as pd
 from flask import current_app
+from scipy import sparse
+from sqlalchemy import func, case
 from mlxtend.frequent_patterns import apriori, association_rules
 
 from model.analysis import OrderInfo, AssociationRecommendation, Analysis, Goods, SubCategory, TopCategory
 from model.db import db
+from model.enums import OrderState
+from service.id_encoder import customer_encoder, goods_encoder
+from service.analysis_cache import apriori_cache
+from service.order_partitions import order_window
+from config import APRIORI_THRESHOLDS
+
+
+# 연관 분석 조건 (기준값 + 기간). 분석 행에 JSON 으로 기록하고, 자동 갱신은 같은 조건으로 다시 분석한다.
+# window_days 만 있으면 오늘까지의 이동 기간, end_date 도 있으면 고정 기간
+def analysis_params(thresholds=None, window_days=None, end_date=None):
+    return {**APRIORI_THRESHOLDS, **(thresholds or {}), 'window_days': window_days,
+            'end_date': end_date.isoformat() if window_days and end_date else None}
+
+
+def params_thresholds(params):
+    return {key: params[key] for key in APRIORI_THRESHOLDS}
+
+
+# 조건의 분석 기간 (시작일, 종료일). 기간 조건이 없으면 None
+def params_window(params, today=None):
+    if not params.get('window_days'):
+        return None
+    end_date = date.fromisoformat(params['end_date']) if params.get('end_date') else (today or date.today())
+    return end_date - timedelta(days=params['window_days'] - 1), end_date
+
+
+def dump_params(params):
+    return json.dumps(params, sort_keys=True)
+
+
+# 같은 조건의 연관 분석을 하나의 실행으로 합치는 single-flight 키 (HTTP 요청, 갱신 스케줄러 공통)
+def analysis_flight_key(goods_code, analysis_kind, analysis_title, params=None):
+    params = params or analysis_params()
+    return ('apriori', goods_code, analysis_kind, analysis_title, tuple(sorted(params_thresholds(params).items())),
+            params_window(params))
 
 
 class RecommendationService:
     def __init__(self):
         self.db = db
+        self.recommendations = []
 
-    def create_analysis(self, analysis_kind, analysis_title, analysis_description):
+    # completed=False 이면 저장 중 상태로 만든다 (나눠 저장한 뒤 AnalysisRepository.mark_completed 로 완료)
+    def create_analysis(self, analysis_kind, analysis_title, analysis_description, completed=True):
         with current_app.app_context():
             try:
                 new_analysis = Analysis(
                     analysis_kind=analysis_kind,
                     analysis_title=analysis_title,
-                    analysis_description=analysis_description
+                    analysis_description=analysis_description,
+                    completed_date=datetime.utcnow() if completed else None
                 )
                 db.session.add(new_analysis)
                 db.session.commit()
@@ -42,6 +86,21 @@ class RecommendationService:
                 print(f"An error occurred while deleting analysis: {e}")
                 return False
 
+    # 주문 (고객 코드, 상품 코드) 목록을 고객 x 상품 구매 여부 희소 행렬로 변환한다.
+    # 행은 주문에 등장한 고객 순서, 열은 상품 IdEncoder 인덱스
+    def build_baskets(self, customer_codes, goods_codes):
+        customer_idx = customer_encoder().encode(customer_codes)
+        goods_idx = goods_encoder().encode(goods_codes)
+
+        customers, rows = np.unique(customer_idx, return_inverse=True)
+        baskets = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (rows, goods_idx)),
+            shape=(len(customers), len(goods_encoder()))
+        )
+        # 같은 상품을 여러 번 구매해도 한 번으로 센다
+        baskets.data[:] = 1
+        return customers, baskets
+
     def get_top_category_by_goods_code(self, goods_code):
         with current_app.app_context():
             goods = Goods.query.filter_by(goods_code=goods_code).first()
@@ -56,23 +115,101 @@ class RecommendationService:
                     return top_category.top_category_code if top_category else None
             return None
 
-    def recommend_all_combinations(self, target_goods_code_a, analysis_kind, analysis_title, analysis_description):
+    # 상위 카테고리의 주문 데이터 watermark (주문 수, 최대 주문 ID, 구매 상태 주문 수, 카테고리 상품 수)
+    # 주문이 추가/삭제되거나 상태가 바뀌거나 카테고리 상품이 바뀌면 값이 달라진다.
+    def get_order_watermark(self, top_category_code):
+        order_stats = db.session.query(
+            func.count(OrderInfo.order_id),
+            func.max(OrderInfo.order_id),
+            func.sum(case((OrderInfo.order_status == OrderState.PURCHASED, 1), else_=0))
+        ).join(
+            Goods, Goods.goods_code == OrderInfo.goods_code
+        ).join(
+            SubCategory, SubCategory.sub_category_code == Goods.sub_category_code
+        ).filter(SubCategory.top_category_code == top_category_code).one()
+
+        goods_count = db.session.query(func.count(Goods.goods_code)).join(
+            SubCategory, SubCategory.sub_category_code == Goods.sub_category_code
+        ).filter(SubCategory.top_category_code == top_category_code).scalar()
+
+        return tuple(int(value or 0) for value in order_stats) + (int(goods_count or 0),)
+
+    # 캐시를 거쳐 연관 분석을 실행한다.
+    # 같은 (상품, 분석 종류, 제목, 설명, 기준값)에 대해 상위 카테고리 주문 데이터가 바뀌지 않았으면
+    # 이전 analysis_id 와 추천 결과를 그대로 돌려준다. 반환값: (analysis_id, 추천 목록, 캐시 사용 여부)
+    # params : analysis_params 조건 (기간이 있으면 해당 기간 구매만 분석한다)
+    def recommend_with_cache(self, target_goods_code_a, analysis_kind, analysis_title, analysis_description,
+                             params=None):
+        params = params or analysis_params()
+        thresholds = params_thresholds(params)
+        window = params_window(params)
+        top_category_code = self.get_top_category_by_goods_code(target_goods_code_a)
+
+        cache_key = None
+        if top_category_code:
+            cache_key = (target_goods_code_a, str(analysis_kind), analysis_title, analysis_description,
+                         tuple(sorted(thresholds.items())), window, top_category_code,
+                         self.get_order_watermark(top_category_code))
+            cached = apriori_cache.get(cache_key)
+            # 분석이 삭제되었으면 캐시를 버리고 다시 계산한다
+            if cached and db.session.get(Analysis, cached['analysis_id']) is not None:
+                print(f"Cache hit for goods_code {target_goods_code_a}: analysis_id {cached['analysis_id']}")
+                return cached['analysis_id'], cached['recommendations'], True
+            if cached:
+                apriori_cache.discard(cache_key)
+
+        analysis_id = self.recommend_all_combinations(target_goods_code_a, analysis_kind, analysis_title,
+                                                      analysis_description, window=window, params=params,
+                                                      **thresholds)
+        if analysis_id is not None and cache_key is not None:
+            apriori_cache.put(cache_key, {'analysis_id': analysis_id, 'recommendations': self.recommendations})
+        return analysis_id, self.recommendations, False
+
+    # after_analysis_id 이후 다른 worker 가 같은 조건(params)으로 만든 분석 결과 (없으면 None)
+    # single-flight 에서 다른 worker 의 실행을 기다린 요청이 사용한다
+    def find_recent_analysis(self, target_goods_code_a, analysis_kind, analysis_title, after_analysis_id,
+                             params=None):
+        analysis_id = db.session.query(func.max(Analysis.analysis_id)).join(
+            AssociationRecommendation, AssociationRecommendation.analysis_id == Analysis.analysis_id
+        ).filter(
+            Analysis.analysis_id > after_analysis_id,
+            Analysis.completed_date.isnot(None),
+            Analysis.analysis_kind == analysis_kind,
+            Analysis.analysis_title == analysis_title,
+            Analysis.analysis_params == dump_params(params or analysis_params()),
+            AssociationRecommendation.goods_code == target_goods_code_a
+        ).scalar()
+        if analysis_id is None:
+            return None
+
+        rows = AssociationRecommendation.query.filter_by(analysis_id=analysis_id).all()
+        recommendations = sorted(({
+            'goodsCode': row.goods_code,
+            'associatedGoodsCode': row.associated_goods_code,
+            'support': float(row.support),
+            'confidence': float(row.confidence),
+            'lift': float(row.lift)
+        } for row in rows), key=lambda rec: (rec['lift'], rec['confidence'], rec['support']), reverse=True)
+        return analysis_id, recommendations, False
+
+    def recommend_all_combinations(self, target_goods_code_a, analysis_kind, analysis_title, analysis_description,
+                                   min_customer_count=APRIORI_THRESHOLDS['min_customer_count'],
+                                   min_confidence=APRIORI_THRESHOLDS['min_confidence'],
+                                   min_lift=APRIORI_THRESHOLDS['min_lift'], window=None, params=None):
+        # 분석 행에 기록할 조건 (직접 호출하면 주어진 기준값과 고정 기간)
+        if params is None:
+            params = analysis_params({'min_customer_count': min_customer_count, 'min_confidence': min_confidence,
+                                      'min_lift': min_lift},
+                                     (window[1] - window[0]).days + 1 if window else None,
+                                     window[1] if window else None)
         with current_app.app_context():
-            analysis_id = None
             try:
-                # 1. 분석 생성
-                print("\nStep 1: Creating analysis")
-                analysis_id = self.create_analysis(analysis_kind, analysis_title, analysis_description)
-                if analysis_id is None:
-                    print("Failed to create analysis")
-                    return None
-
+                # 분석 행은 결과를 계산한 뒤 추천 행과 함께 만든다 (9단계)
                 # 2. 타겟 상품의 카테고리 정보 가져오기
                 print("\nStep 2: Getting target product category information")
                 target_goods = Goods.query.filter_by(goods_code=target_goods_code_a).first()
                 if not target_goods:
                     print(f"Target goods {target_goods_code_a} not found")
-                    self.delete_analysis(analysis_id)  # 실패 시 analysis 삭제
                     return None
 
                 print(f"Found target goods: {target_goods.goods_code}")
@@ -82,14 +219,12 @@ class RecommendationService:
                     sub_category_code=target_goods.sub_category_code).first()
                 if not target_sub_category:
                     print("Target sub category not found")
-                    self.delete_analysis(analysis_id)  # 실패 시 analysis 삭제
                     return None
 
                 target_top_category = TopCategory.query.filter_by(
                     top_category_code=target_sub_category.top_category_code).first()
                 if not target_top_category:
                     print("Target top category not found")
-                    self.delete_analysis(analysis_id)  # 실패 시 analysis 삭제
                     return None
 
                 print(f"Target goods hierarchy:")
@@ -111,50 +246,65 @@ class RecommendationService:
 
                 if not same_category_goods:
                     print("No products found in same category")
-                    self.delete_analysis(analysis_id)  # 실패 시 analysis 삭제
                     return None
 
                 print(f"Found {len(same_category_goods)} products in same top category")
                 print(f"Sample of found products: {same_category_goods[:5]}")
 
-                # 4. 고객별 구매 데이터 가져오기
-                print("\nStep 4: Getting purchase data")
-                orders = OrderInfo.query.filter(
-                    OrderInfo.order_status == 'PURCHASED',
-                    OrderInfo.goods_code.in_([target_goods_code_a] + same_category_goods)
-                ).all()
+                candidate_idx = goods_encoder().encode([target_goods_code_a] + same_category_goods)
+                if window:
+                    # 4-6. 기간 내 일자별 집계 파티션 합산 (원본 주문을 다시 읽지 않는다)
+                    # 장바구니 단위는 (고객, 일자), 전체 장바구니 수는 타겟 상위 카테고리 기준
+                    print(f"\nStep 4: Summing daily order partitions ({window[0]} ~ {window[1]})")
+                    added, dropped, item_counts, co_occurrences, total_customers = order_window.counts_for_window(
+                        *window, candidate_idx[0], target_top_category.top_category_code, len(goods_encoder()))
+                    print(f"Partitions added: {added}, dropped: {dropped}")
+                    target_customers = int(item_counts[candidate_idx[0]])
+                else:
+                    # 4. 고객별 구매 데이터 가져오기
+                    print("\nStep 4: Getting purchase data")
+                    orders = db.session.query(
+                        OrderInfo.customer_code,
+                        OrderInfo.goods_code,
+                        OrderInfo.order_count
+                    ).filter(
+                        OrderInfo.order_status == 'PURCHASED',
+                        OrderInfo.goods_code.in_([target_goods_code_a] + same_category_goods)
+                    ).all()
+
+                    if not orders:
+                        print("No purchase data found")
+                        return None
+
+                    print(f"Total orders retrieved: {len(orders)}")
+                    print("Sample of first few orders:")
+                    for order in orders[:5]:
+                        print(f"- Customer: {order.customer_code}, Goods: {order.goods_code}, Count: {order.order_count}")
+
+                    # 5. 고객별 구매 상품 집합 생성 (고객 x 상품 인덱스 희소 행렬)
+                    print("\nStep 5: Creating customer purchase sets")
+                    customers, baskets = self.build_baskets(
+                        [order.customer_code for order in orders],
+                        [order.goods_code for order in orders]
+                    )
 
-                if not orders:
-                    print("No purchase data found")
-                    self.delete_analysis(analysis_id)  # 실패 시 analysis 삭제
-                    return None
+                    total_customers = len(customers)
+                    print(f"Total unique customers: {total_customers}")
+                    print("Sample of customer purchase sets:")
+                    for row in range(min(5, total_customers)):
+                        purchases = set(goods_encoder().decode(baskets.indices[baskets.indptr[row]:baskets.indptr[row + 1]]))
+                        print(f"- Customer {customer_encoder().decode([customers[row]])[0]}: {purchases}")
+
+                    # 6. 타겟 상품의 구매 고객 수 계산
+                    target_column = baskets[:, candidate_idx[0]].toarray().ravel()
+                    target_customers = int(target_column.sum())
 
-                print(f"Total orders retrieved: {len(orders)}")
-                print("Sample of first few orders:")
-                for order in orders[:5]:
-                    print(f"- Customer: {order.customer_code}, Goods: {order.goods_code}, Count: {order.order_count}")
-
-                # 5. 고객별 구매 상품 집합 생성
-                print("\nStep 5: Creating customer purchase sets")
-                customer_sets = {}
-                for order in orders:
-                    if order.customer_code not in customer_sets:
-                        customer_sets[order.customer_code] = set()
-                    customer_sets[order.customer_code].add(order.goods_code)
-
-                total_customers = len(customer_sets)
-                print(f"Total unique customers: {total_customers}")
-                print("Sample of customer purchase sets:")
-                for customer_code, purchases in list(customer_sets.items())[:5]:
-                    print(f"- Customer {customer_code}: {purchases}")
-
-                # 6. 타겟 상품의 구매 고객 수 계산
-                target_customers = sum(1 for goods_set in customer_sets.values()
-                                       if target_goods_code_a in goods_set)
+                    # 두 상품을 모두 구매한 고객 수, 각 상품의 구매 고객 수를 한 번에 계산
+                    co_occurrences = np.asarray(baskets.T @ target_column).ravel()
+                    item_counts = np.asarray(baskets.sum(axis=0)).ravel()
 
                 if target_customers == 0:
                     print("No customers found for target product")
-                    self.delete_analysis(analysis_id)  # 실패 시 analysis 삭제
                     return None
 
                 print(f"\nTarget item statistics:")
@@ -166,20 +316,12 @@ class RecommendationService:
                 print("\nStep 7: Performing association analysis")
                 potential_recommendations = []
 
-                # 완화된 조건들
-                min_customer_count = 3  # 최소 3명 이상의 고객이 구매
-                min_confidence = 0.05  # 최소 5% 이상의 신뢰도
-                min_lift = 1.1  # 최소 1.1 이상의 리프트
+                # 완화된 조건들 (min_customer_count, min_confidence, min_lift : 기본값은 APRIORI_THRESHOLDS)
 
-                for item in same_category_goods:
+                for item, item_idx in zip(same_category_goods, candidate_idx[1:]):
                     try:
-                        # 두 상품을 모두 구매한 고객 수 계산
-                        co_occurrence = sum(1 for goods_set in customer_sets.values()
-                                            if target_goods_code_a in goods_set and item in goods_set)
-
-                        # 각 상품의 구매 고객 수 계산
-                        item_customers = sum(1 for goods_set in customer_sets.values()
-                                             if item in goods_set)
+                        co_occurrence = int(co_occurrences[item_idx])
+                        item_customers = int(item_counts[item_idx])
 
                         if item_customers > 0:  # 0으로 나누기 방지
                             # 지표 계산
@@ -217,12 +359,10 @@ class RecommendationService:
 
                 if not potential_recommendations:
                     print("No recommendations found that meet the criteria")
-                    self.delete_analysis(analysis_id)  # 실패 시 analysis 삭제
                     return None
 
                 # 8. 점수화 및 정렬
                 print("\nStep 8: Scoring and sorting recommendations")
-                recommendations = []
                 sorted_recommendations = sorted(
                     potential_recommendations,
                     key=lambda x: (x['lift'], x['confidence'], x['support']),
@@ -238,31 +378,44 @@ class RecommendationService:
                     print(f"- Lift: {rec['lift']:.4f}")
                     print(f"- Co-occurrence: {rec['co_occurrence']}")
 
-                    recommendation = AssociationRecommendation(
+                print(f"\nTotal recommendations generated: {len(sorted_recommendations)}")
+                self.recommendations = [{
+                    'goodsCode': target_goods_code_a,
+                    'associatedGoodsCode': rec['item'],
+                    'support': float(rec['support']),
+                    'confidence': float(rec['confidence']),
+                    'lift': float(rec['lift'])
+                } for rec in sorted_recommendations]
+
+                # 9. 분석 생성 및 저장 (분석 행과 추천 행을 한 트랜잭션으로 커밋)
+                # 분석 행이 결과와 함께 생기므로, 실행 도중 기다리기 시작한 다른 worker 가 본
+                # 최대 analysis_id 보다 항상 크다 (single-flight recheck 가 이 분석을 찾는다)
+                try:
+                    analysis = Analysis(
+                        analysis_kind=analysis_kind,
+                        analysis_title=analysis_title,
+                        analysis_description=analysis_description,
+                        analysis_params=dump_params(params),
+                        completed_date=datetime.utcnow()
+                    )
+                    db.session.add(analysis)
+                    db.session.flush()
+                    db.session.add_all([AssociationRecommendation(
                         goods_code=target_goods_code_a,
                         associated_goods_code=rec['item'],
-                        analysis_id=analysis_id,
+                        analysis_id=analysis.analysis_id,
                         support=float(rec['support']),
                         confidence=float(rec['confidence']),
                         lift=float(rec['lift'])
-                    )
-                    recommendations.append(recommendation)
-
-                print(f"\nTotal recommendations generated: {len(recommendations)}")
-
-                try:
-                    db.session.add_all(recommendations)
+                    ) for rec in sorted_recommendations])
                     db.session.commit()
-                    print(f"Successfully saved all recommendations to database")
-                    return analysis_id
+                    print(f"Successfully saved analysis {analysis.analysis_id} with all recommendations to database")
+                    return analysis.analysis_id
                 except Exception as e:
                     print(f"Error saving recommendations: {str(e)}")
                     db.session.rollback()
-                    self.delete_analysis(analysis_id)  # DB 저장 실패 시에도 analysis 삭제
                     raise
 
             except Exception as e:
                 print(f"An error occurred: {str(e)}")
-                if analysis_id:
-                    self.delete_analysis(analysis_id)  # 전체 예외 발생 시에도 analysis 삭제
                 return None
\ No newline at end of file
@@ -0,0 +1,221 @@
+from math import ceil
+from time import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from model.analysis import PersonalizedRecommendation, AssociationRule
+from repository.analysis_repository import AnalysisRepository
+from service.apriori_service import RecommendationService
+from service.collaboFilter_service import CollaboFilterService, ANALYSIS_TITLE, ANALYSIS_DESCRIPTION
+from service.id_encoder import get_encoder
+from service.job_checkpoint import JobCheckpoint
+from service.model_store import save_model, load_model
+from service.rule_mining_service import RuleMiningService
+from service.rule_mining_service import ANALYSIS_TITLE as RULE_ANALYSIS_TITLE
+from service.rule_mining_service import ANALYSIS_DESCRIPTION as RULE_ANALYSIS_DESCRIPTION
+from config import RECOMMEND_MODEL, BATCH_JOB
+
+
+# 저장 단계 재개 전 정리.
+# chunk 는 하나의 트랜잭션으로 커밋되므로, 커밋 직후 완료 기록 전에 중단되었다면
+# 저장된 행 수가 (완료 chunk 행 수 + 다음 chunk 행 수) 와 같다. 그 경우 다음 chunk 를 완료로 기록한다.
+def reconcile_saved_chunks(checkpoint, model, analysis_id, chunk_rows, prefix='save'):
+    done = [index for index in range(len(chunk_rows)) if checkpoint.done(f'{prefix}:{index}')]
+    if len(done) == len(chunk_rows):
+        return
+
+    written = sum(chunk_rows[index] for index in done)
+    saved = AnalysisRepository().count_children(model, analysis_id)
+    if saved == written:
+        return
+    following = len(done)
+    if saved == written + chunk_rows[following]:
+        print(f"[batch] {prefix}:{following} 은 이미 커밋되어 있어 완료로 기록합니다")
+        checkpoint.complete(f'{prefix}:{following}', rows=chunk_rows[following])
+        return
+    raise RuntimeError(f"analysis_id {analysis_id} 의 저장된 행 수({saved})가 체크포인트({written})와 맞지 않습니다. "
+                       f"--restart 로 다시 실행하세요.")
+
+
+# 전 고객 개인별 추천 오프라인 배치.
+# 단계: train (모델 학습) -> customers (고객 목록 고정) -> score:<n> (고객 shard 별 점수 계산)
+#       -> analysis (분석 생성) -> save:<n> (shard 별 저장)
+# 중단 후 다시 실행하면 완료된 단계/shard 는 건너뛰고 이어서 한다.
+class CollaboFilterBatch:
+    def __init__(self, model_kind=RECOMMEND_MODEL, shard_size=BATCH_JOB['shard_size']):
+        self.model_kind = model_kind
+        self.shard_size = shard_size
+        self.service = CollaboFilterService()
+        self.checkpoint = JobCheckpoint('collaboFilter', {'model': model_kind, 'shard_size': shard_size})
+
+    def run(self, restart=False):
+        start_time = time()
+        checkpoint = self.checkpoint
+        if checkpoint.start(restart):
+            print(f"[batch] 이전 실행 이어서 진행 (완료 단계 {len(checkpoint.state['stages'])}개)")
+
+        goods_idx, statis = self.train()
+        codes, ages, skintypes = self.customers()
+
+        n_shards = ceil(len(codes) / self.shard_size)
+        shard_rows = []
+        for shard in range(n_shards):
+            block = slice(shard * self.shard_size, (shard + 1) * self.shard_size)
+            shard_rows.append(len(codes[block]))
+            if checkpoint.done(f'score:{shard}'):
+                continue
+            shard_start = time()
+            recommends = self.service.score_customers(codes[block].tolist(), ages[block], skintypes[block],
+                                                      goods_idx, statis)
+            checkpoint.save_json(f'scores-{shard:05d}.json', recommends)
+            checkpoint.complete(f'score:{shard}', customers=len(recommends))
+            print(f"[batch] 점수 계산 shard {shard + 1}/{n_shards}: {time() - shard_start:.2f}초 소요")
+
+        analysis_id = self.analysis()
+
+        reconcile_saved_chunks(checkpoint, PersonalizedRecommendation, analysis_id, shard_rows)
+        for shard in range(n_shards):
+            if checkpoint.done(f'save:{shard}'):
+                continue
+            shard_start = time()
+            self.service.save_recommendation(checkpoint.load_json(f'scores-{shard:05d}.json'), analysis_id)
+            checkpoint.complete(f'save:{shard}', rows=shard_rows[shard])
+            print(f"[batch] 저장 shard {shard + 1}/{n_shards}: {time() - shard_start:.2f}초 소요")
+
+        # 모든 shard 가 저장된 뒤에야 최근 분석으로 보인다
+        AnalysisRepository().mark_completed(analysis_id)
+        result = {'analysis_id': analysis_id, 'customers': len(codes), 'elapsed': time() - start_time}
+        checkpoint.finish(**result)
+        return result
+
+    # 학습된 모델은 체크포인트 디렉터리에도 저장한다 (서비스용 모델 파일은 fold-in 으로 바뀔 수 있음)
+    def train(self):
+        checkpoint = self.checkpoint
+        if checkpoint.done('train'):
+            print("[batch] 학습된 모델 재사용")
+            self.service.factors, statis = load_model(checkpoint.path('model.bin'))
+            return self.service.factors.candidates, statis
+
+        train_start = time()
+        goods_idx, statis = self.service.retrain(self.model_kind)
+        save_model(self.service.factors, statis, checkpoint.path('model.bin'))
+        checkpoint.complete('train', seconds=time() - train_start)
+        print(f"[batch] 모델 학습 ({self.model_kind}): {time() - train_start:.2f}초 소요")
+        return goods_idx, statis
+
+    # 고객 목록을 코드 순으로 고정해 저장한다. 재개 시 새 고객이 생겨도 shard 경계가 바뀌지 않는다.
+    def customers(self):
+        checkpoint = self.checkpoint
+        if not checkpoint.done('customers'):
+            customers = sorted(self.service.load_customer_data(), key=lambda customer: customer['customer_code'])
+            checkpoint.save_arrays(
+                'customers.npz',
+                codes=np.array([customer['customer_code'] for customer in customers], dtype=str),
+                ages=np.array([customer['customer_age'] for customer in customers], dtype=np.int32),
+                skintypes=get_encoder('skintype').encode(customer['customer_skintype'] for customer in customers)
+            )
+            checkpoint.complete('customers', count=len(customers))
+
+        arrays = checkpoint.load_arrays('customers.npz')
+        return arrays['codes'], arrays['ages'], arrays['skintypes']
+
+    # 분석은 저장 중 상태로 만들고 마지막 shard 저장 후 완료로 기록한다
+    def analysis(self):
+        if not self.checkpoint.done('analysis'):
+            analysis_id = self.service.create_analysis('PERSONALIZED', ANALYSIS_TITLE, ANALYSIS_DESCRIPTION,
+                                                       completed=False)
+            if analysis_id is None:
+                raise RuntimeError("분석 정보 생성에 실패했습니다")
+            self.checkpoint.complete('analysis', analysis_id=analysis_id)
+        return self.checkpoint.info('analysis')['analysis_id']
+
+
+# 규칙 DataFrame <-> 체크포인트 배열 (조건 상품은 -1 로 채운 고정 길이 행)
+def rules_to_arrays(rules, max_antecedents):
+    antecedents = np.full((len(rules), max_antecedents), -1, dtype=np.int32)
+    for row, items in enumerate(rules['antecedents']):
+        antecedents[row, :len(items)] = sorted(items)
+    return {
+        'antecedents': antecedents,
+        'consequents': np.array([next(iter(items)) for items in rules['consequents']], dtype=np.int32),
+        'support': rules['support'].to_numpy(dtype=np.float64),
+        'confidence': rules['confidence'].to_numpy(dtype=np.float64),
+        'lift': rules['lift'].to_numpy(dtype=np.float64),
+    }
+
+
+def arrays_to_rules(arrays):
+    return pd.DataFrame({
+        'antecedents': [tuple(int(idx) for idx in row if idx >= 0) for row in arrays['antecedents']],
+        'consequents': [(int(idx),) for idx in arrays['consequents']],
+        'support': arrays['support'],
+        'confidence': arrays['confidence'],
+        'lift': arrays['lift'],
+    })
+
+
+# 카탈로그 전체 연관 규칙 마이닝 오프라인 배치.
+# 단계: baskets (장바구니 행렬) -> mine (FP-Growth 규칙) -> analysis (분석 생성) -> save:<n> (규칙 chunk 별 저장)
+class RuleMiningBatch:
+    def __init__(self, params=None, chunk_size=BATCH_JOB['rule_chunk_size']):
+        self.chunk_size = chunk_size
+        self.service = RuleMiningService(params)
+        self.checkpoint = JobCheckpoint('ruleMining', {**self.service.params, 'chunk_size': chunk_size})
+
+    def run(self, restart=False):
+        start_time = time()
+        checkpoint = self.checkpoint
+        if checkpoint.start(restart):
+            print(f"[batch] 이전 실행 이어서 진행 (완료 단계 {len(checkpoint.state['stages'])}개)")
+
+        if not checkpoint.done('baskets'):
+            _, baskets = self.service.load_baskets()
+            checkpoint.save_arrays('baskets.npz', data=baskets.data, indices=baskets.indices, indptr=baskets.indptr,
+                                   shape=np.array(baskets.shape))
+            checkpoint.complete('baskets', baskets=baskets.shape[0], nonzeros=int(baskets.nnz))
+            print(f"[batch] 장바구니 {baskets.shape[0]}개 (구매 {baskets.nnz}건)")
+
+        if not checkpoint.done('mine'):
+            arrays = checkpoint.load_arrays('baskets.npz')
+            baskets = sparse.csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']),
+                                        shape=tuple(arrays['shape']))
+            rules = self.service.mine(baskets)
+            checkpoint.save_arrays('rules.npz', **rules_to_arrays(rules, self.service.params['max_len'] - 1))
+            checkpoint.complete('mine', rules=len(rules))
+            print(f"[batch] 규칙 {len(rules)}개")
+
+        n_rules = checkpoint.info('mine')['rules']
+        if n_rules == 0:
+            result = {'analysis_id': None, 'rules': 0, 'elapsed': time() - start_time}
+            checkpoint.finish(**result)
+            return result
+
+        if not checkpoint.done('analysis'):
+            analysis_id = RecommendationService().create_analysis('ASSOCIATION', RULE_ANALYSIS_TITLE,
+                                                                  RULE_ANALYSIS_DESCRIPTION, completed=False)
+            if analysis_id is None:
+                raise RuntimeError("분석 정보 생성에 실패했습니다")
+            checkpoint.complete('analysis', analysis_id=analysis_id)
+        analysis_id = checkpoint.info('analysis')['analysis_id']
+
+        rules = arrays_to_rules(checkpoint.load_arrays('rules.npz'))
+        starts = range(0, n_rules, self.chunk_size)
+        chunk_rows = [min(self.chunk_size, n_rules - start) for start in starts]
+        self.service.apriori_repository.ensure_rule_table()
+        reconcile_saved_chunks(checkpoint, AssociationRule, analysis_id, chunk_rows)
+        for chunk, start in enumerate(starts):
+            if checkpoint.done(f'save:{chunk}'):
+                continue
+            self.service.apriori_repository.save_rules(
+                self.service.to_rows(rules.iloc[start:start + self.chunk_size], analysis_id),
+                batch_size=self.chunk_size
+            )
+            checkpoint.complete(f'save:{chunk}', rows=chunk_rows[chunk])
+            print(f"[batch] 규칙 저장 chunk {chunk + 1}/{len(chunk_rows)}")
+
+        AnalysisRepository().mark_completed(analysis_id)
+        result = {'analysis_id': analysis_id, 'rules': n_rules, 'elapsed': time() - start_time}
+        checkpoint.finish(**result)
+        return result
@@ -0,0 +1,50 @@
+import numpy as np
+
+from config import BONUS_RULES
+
+
+# 고객 나이가 young 규칙 대상(40세 미만)인지
+def is_young(customer_age, rules=BONUS_RULES):
+    return customer_age < rules['young']['max_age']
+
+
+# 상품 하나에 대한 가산점과 규칙별 충족 여부 (평가/단건 계산용)
+def compute_bonus(customer_skintype, customer_age, goods_skintype, high_grade_ratio, young_ratio, rules=BONUS_RULES):
+    matches = {
+        'skintype': customer_skintype == goods_skintype,
+        'high_grade': high_grade_ratio > rules['high_grade']['min_ratio'],
+        'young': is_young(customer_age, rules) and young_ratio > rules['young']['min_ratio'],
+    }
+
+    bonus = rules['skintype']['match'] if matches['skintype'] else rules['skintype']['mismatch']
+    bonus += rules['high_grade']['above'] if matches['high_grade'] else rules['high_grade']['below']
+    if matches['young']:
+        bonus += rules['young']['bonus']
+    return bonus, matches
+
+
+# 구간(피부 타입 x 40세 미만 여부)별 상품 가산점 행렬 [n_skintypes + 1, 2, n_goods]
+# 마지막 피부 타입 행은 어느 상품과도 일치하지 않는 (알 수 없는) 피부 타입용이다.
+def build_bonus_matrix(statis, n_skintypes, rules=BONUS_RULES):
+    goods_skintype = statis['goods_skintype']
+
+    grade_bonus = np.where(statis['high_grade_ratio'] > rules['high_grade']['min_ratio'],
+                           rules['high_grade']['above'], rules['high_grade']['below'])
+    young_bonus = np.where(statis['young_ratio'] > rules['young']['min_ratio'], rules['young']['bonus'], 0.0)
+
+    skintypes = np.arange(n_skintypes + 1)[:, np.newaxis]
+    skin_bonus = np.where(goods_skintype[np.newaxis, :] == skintypes,
+                          rules['skintype']['match'], rules['skintype']['mismatch'])
+    skin_bonus[n_skintypes] = rules['skintype']['mismatch']
+
+    bonus = np.empty((n_skintypes + 1, 2, len(goods_skintype)))
+    bonus[:, 0] = skin_bonus + grade_bonus
+    bonus[:, 1] = skin_bonus + grade_bonus + young_bonus
+    return bonus
+
+
+# 고객 구간의 가산점 벡터 (상품 인덱스 기준)
+def segment_bonus(bonus, customer_skintype, customer_age, rules=BONUS_RULES):
+    n_skintypes = len(bonus) - 1
+    skintype = customer_skintype if 0 <= customer_skintype < n_skintypes else n_skintypes
+    return bonus[skintype, 1 if is_young(customer_age, rules) else 0]
@@ -1,4 +1,8 @@
+import numpy as np
 import pandas as pd
+from datetime import datetime, timedelta
+from time import time
+from scipy import sparse
 from flask import current_app, jsonify
 from surprise import Dataset, Reader, SVD
 from surprise.model_selection import train_test_split
@@ -8,89 +12,293 @@ from model.analysis import PersonalizedRecommendation
 from model.db import db  # SQLAlchemy 객체 가져오기
 from collections import defaultdict  
 from sqlalchemy import cast, String, func, case  # 추가
+from service.tuning_service import load_best_params
+from repository.review_repository import ReviewRepository
+from repository.order_repository import OrderRepository
+from service.id_encoder import customer_encoder, goods_encoder, get_encoder
+from service.factor_model import FactorModel
+from service.als_model import ImplicitALS, fold_in_rows
+from service.model_store import save_model, load_model, get_model
+from config import REVIEW_WINDOW_DAYS, REVIEW_HALF_LIFE_DAYS, REVIEW_CHUNK_SIZE, RECOMMEND_MODEL, ALS_PARAMS
+from config import FULL_RETRAIN_HOURS, BONUS_RULES
+from service.bonus_rules import build_bonus_matrix, segment_bonus, is_young
+
+# 점수 계산 시 한 번에 처리하는 고객 수 (고객 x 후보 상품 행렬 크기 제한)
+SCORING_BLOCK_SIZE = 1024
+
+# 전 고객 개인별 추천 분석 (HTTP 요청, 오프라인 배치 공통)
+ANALYSIS_TITLE = "전 고객 개별 협업 필터링 추천 분석"
+ANALYSIS_DESCRIPTION = "설명"
 
 class CollaboFilterService:
     def __init__(self):
         self.db = db
         self.model = None
+        self.factors = None
 
     def predict(self, user_id, product_id, review_score):
         prediction = self.model.predict(user_id, product_id, review_score)
         return prediction
 
     #데이터 로드 함수
-    def load_data(self, ratings_df):
+    def load_data(self, ratings_df, columns=('customer_code', 'goods_code', 'review_score')):
         reader = Reader(rating_scale=(1, 5))
 
         # DataFrame를 Surprise 라이브러리가 사용할 수 있는 형태로 전환
-        data = Dataset.load_from_df(ratings_df[['customer_code', 'goods_code', 'review_score']], reader)
+        data = Dataset.load_from_df(ratings_df[list(columns)], reader)
         return data
 
     # 모델 학습 함수
     def train_model(self, data):
         trainset = data.build_full_trainset() # 전체 데이터 셋을 학습용으로 변환
-        model = SVD(n_factors=50, lr_all=0.005, reg_all=0.02) # SVD 알고리즘 사용, 100개의 잠재 요인
+        model = SVD(**load_best_params()) # SVD 알고리즘 사용, 튜닝된 파라미터가 없으면 기본값(50개의 잠재 요인)
         model.fit(trainset) # 모델 학습
         return model
 
+    # 구매 이력 기반 implicit ALS 학습
+    def train_als_model(self, purchases):
+        return ImplicitALS(**ALS_PARAMS).fit(purchases).to_factor_model()
+
+    # 추천 모델 학습 후 FactorModel 로 변환, 추천 후보 상품 인덱스를 반환한다.
+    # model_kind : 'svd' (리뷰 평점) 또는 'als' (구매 이력)
+    def fit_factors(self, model_kind=RECOMMEND_MODEL):
+        # 학습 데이터 조회 시작 시각. 이후 들어온 리뷰/주문은 fold-in 대상이 된다.
+        started_at = datetime.utcnow().isoformat()
+
+        if model_kind == 'als':
+            purchases = self.load_purchase_matrix()
+            self.factors = self.train_als_model(purchases)
+            self.factors.meta.update(trained_at=started_at, watermark=started_at)
+            # 추천 후보 상품 (순 구매 이력이 있는 상품)
+            return self.factors.candidates
+
+        if model_kind != 'svd':
+            raise ValueError(f'지원하지 않는 추천 모델입니다: {model_kind}')
+
+        # 리뷰 데이터 조회 (전체 이력 스트리밍)
+        training = self.load_training_arrays()
+        loaded_data = self.load_data(self.to_ratings_df(training), columns=('customer_idx', 'goods_idx', 'review_score'))
+
+        self.model = self.train_model(loaded_data)
+        self.factors = FactorModel.from_surprise(self.model, len(customer_encoder()), len(goods_encoder()))
+        self.factors.meta.update(trained_at=started_at, watermark=started_at,
+                                 regularization=load_best_params()['reg_all'])
+        # 추천 후보 상품 (리뷰가 있는 상품, 중복 제거)
+        return self.factors.candidates
+
+    # 전체 재학습 후 모델과 상품 통계를 저장한다. 추천 후보 상품 인덱스를 반환한다.
+    def retrain(self, model_kind=RECOMMEND_MODEL):
+        goods_idx = self.fit_factors(model_kind)
+        statis = self.build_cold_start_table(self.load_statis_table(), goods_idx)
+        save_model(self.factors, statis)
+        return goods_idx, statis
+
+    # 새 리뷰/구매를 전체 재학습 없이 저장된 모델에 반영 (fold-in)
+    # 상대편 factor 를 고정하고 변경된 고객(과 처음 등장한 상품)의 factor 만 최소제곱으로 다시 푼다.
+    # 마지막 전체 학습 후 FULL_RETRAIN_HOURS 가 지났거나 저장된 모델이 없으면 전체 재학습으로 drift 를 제한한다.
+    def fold_in(self, model_kind=RECOMMEND_MODEL):
+        factors, statis = load_model()
+        now = datetime.utcnow()
+        if factors is None or now - datetime.fromisoformat(factors.meta['trained_at']) > timedelta(hours=FULL_RETRAIN_HOURS):
+            print("전체 재학습 실행 (저장된 모델 없음 또는 재학습 주기 경과)")
+            self.retrain(factors.kind if factors is not None else model_kind)
+            return {'mode': 'full', 'customers': self.factors.n_customers, 'goods': len(self.factors.candidates)}
+
+        since = datetime.fromisoformat(factors.meta['watermark'])
+        if factors.kind == 'als':
+            customers, goods = self._fold_in_purchases(factors, since)
+        else:
+            customers, goods = self._fold_in_reviews(factors, since)
+
+        # 새로 추가된 상품은 통계가 없으므로 기본값(가산점 최소)으로 채운다
+        n_goods = factors.n_goods
+        for name in ('goods_skintype', 'high_grade_count', 'young_count', 'old_count', 'total',
+                     'high_grade_ratio', 'young_ratio'):
+            values = statis[name]
+            if len(values) < n_goods:
+                fill = -1 if name == 'goods_skintype' else 0
+                statis[name] = np.concatenate([values, np.full(n_goods - len(values), fill, dtype=values.dtype)])
+
+        # 신규 상품이 가산점 행렬, 구간별 목록에 들어갈 수 있으므로 다시 계산한다
+        self.factors = factors
+        statis['bonus'] = build_bonus_matrix(statis, len(get_encoder('skintype')))
+        statis = self.build_cold_start_table(statis, factors.candidates)
+
+        factors.meta.update(watermark=now.isoformat(), folded_at=now.isoformat())
+        save_model(factors, statis)
+
+        print(f"fold-in 완료: 고객 {len(customers)}명, 신규 상품 {len(goods)}개 반영")
+        return {'mode': 'fold_in', 'customers': len(customers), 'goods': len(goods)}
+
+    # SVD 모델 fold-in: since 이후 리뷰를 작성한 고객의 리뷰 전체로 고객 factor 를 다시 푼다.
+    def _fold_in_reviews(self, factors, since):
+        repository = ReviewRepository()
+        new_rows = [row for rows in repository.stream_ratings(since) for row in rows]
+        if not new_rows:
+            return [], []
+
+        customer_codes = {row[0] for row in new_rows}
+        goods_codes = list({row[1] for row in new_rows})
+        goods_idx = goods_encoder().encode(goods_codes)
+        customer_encoder().encode(customer_codes)
+        factors.grow(len(customer_encoder()), len(goods_encoder()))
+        regularization = factors.meta.get('regularization', load_best_params()['reg_all'])
+
+        # 1. 처음 등장한 상품: 고객 factor 를 고정하고 상품 리뷰 전체로 상품 factor 를 푼다
+        new_goods = [code for code, idx in zip(goods_codes, goods_idx) if not factors.trained_goods[idx]]
+        if new_goods:
+            ratings = self.collect_ratings(repository.stream_ratings_for(goods_codes=new_goods))
+            factors.fold_in_goods(ratings['customer_idx'], ratings['goods_idx'], ratings['review_score'], regularization)
+
+        # 2. 리뷰가 추가된 고객: 상품 factor 를 고정하고 고객 factor 를 푼다 (학습된 상품의 리뷰만 사용)
+        ratings = self.collect_ratings(repository.stream_ratings_for(customer_codes=customer_codes))
+        factors.grow(len(customer_encoder()), len(goods_encoder()))
+        trained = factors.trained_goods[ratings['goods_idx']]
+        customers = factors.fold_in_customers(ratings['customer_idx'][trained], ratings['goods_idx'][trained],
+                                              ratings['review_score'][trained], regularization)
+        return customers, new_goods
+
+    # ALS 모델 fold-in: since 이후 주문이 있는 고객의 구매 이력 전체로 고객 factor 를 다시 푼다.
+    def _fold_in_purchases(self, factors, since):
+        changed = [row for rows in OrderRepository().stream_changed_pairs(since) for row in rows]
+        if not changed:
+            return [], []
+
+        customer_codes = {row[0] for row in changed}
+        goods_codes = list({row[1] for row in changed})
+        goods_idx = goods_encoder().encode(goods_codes)
+        customer_encoder().encode(customer_codes)
+        factors.grow(len(customer_encoder()), len(goods_encoder()))
+        alpha = factors.meta['alpha']
+        regularization = factors.meta['regularization']
+        low, high = factors.rating_scale
+
+        def fit_shape(matrix):
+            matrix = matrix.tocsr()
+            matrix.resize((factors.n_customers, factors.n_goods))
+            return matrix
+
+        # 1. 처음 등장한 상품: 고객 factor 를 고정하고 상품 factor 를 푼다
+        new_goods = [code for code, idx in zip(goods_codes, goods_idx) if not factors.trained_goods[idx]]
+        if new_goods:
+            purchases = fit_shape(self.load_purchase_matrix(goods_codes=new_goods)).T.tocsr()
+            rows = np.flatnonzero(np.diff(purchases.indptr))
+            factors.qi[rows] = fold_in_rows(purchases, factors.pu / (high - low), regularization, alpha, rows)
+            factors.trained_goods[rows] = True
+
+        # 2. 주문이 추가된 고객: 상품 factor 를 고정하고 고객 factor 를 푼다
+        purchases = fit_shape(self.load_purchase_matrix(customer_codes=customer_codes))
+        rows = np.array(sorted(customer_encoder().encode(customer_codes)))
+        factors.pu[rows] = fold_in_rows(purchases, factors.qi, regularization, alpha, rows) * (high - low)
+        factors.trained_customers[rows] = purchases.getnnz(axis=1)[rows] > 0
+        return rows, new_goods
+
+    # 저장된 모델로 한 고객의 추천 목록을 바로 계산한다 (전체 배치 없이)
+    def recommend_customer(self, customer_code, n_recommendations=3):
+        factors, statis = get_model()
+        if factors is None:
+            return None
+
+        customer = self.db.session.query(
+            Customer.customer_age,
+            Customer.customer_skintype
+        ).filter(Customer.customer_code == customer_code).first()
+        if customer is None:
+            return None
+
+        self.factors = factors
+        customer_idx = self.model_ids('customer').encode_one(customer_code, add=False)
+        customer_skintype = get_encoder('skintype').encode_one(customer.customer_skintype)
+
+        # 상호작용 이력이 없는 고객은 미리 계산된 구간별 목록 사용
+        if not factors.is_trained_customer(customer_idx):
+            return self.get_cold_start_recommendations(statis, customer_skintype, customer.customer_age)
+
+        return self.get_recommendations(customer_idx, customer.customer_age, customer_skintype,
+                                        factors.candidates, statis, n_recommendations)
+
+    # 모델 파일에 저장된 ID 맵 스냅샷 (메모리 맵, 프로세스 간 공유). 학습 직후이거나 이전 형식 모델이면 IdEncoder
+    def model_ids(self, name):
+        return self.factors.ids.get(name) or get_encoder(name)
+
+    # SVD / ALS 학습 시간 비교 (데이터 로딩 시간 제외)
+    def benchmark_training(self):
+        training = self.load_training_arrays()
+        loaded_data = self.load_data(self.to_ratings_df(training), columns=('customer_idx', 'goods_idx', 'review_score'))
+        purchases = self.load_purchase_matrix()
+
+        start_time = time()
+        self.train_model(loaded_data)
+        svd_time = time() - start_time
+
+        start_time = time()
+        self.train_als_model(purchases)
+        als_time = time() - start_time
+
+        return {
+            'svd': {'seconds': svd_time, 'ratings': int(len(training['review_score']))},
+            'als': {'seconds': als_time, 'interactions': int(purchases.nnz)},
+        }
+
     # 추천 생성 함수
-    def get_recommendations(model, customer_code, customer_age, customer_skintype, goods_ids, review_scores, buyandreviewData, n_recommendations=3):
-        product_predictions = defaultdict(list)
-        # 각 제품에 대해 예상 평점 계산
-        # 평점 총 0 ~ 5점, 그외 가중치 총합 1점 총 6점으로 평가 (해당하지 않을 경우 가산점 부여를 안함.)
-        # 1점의 가산점 구성 
-        # 0.5점 : 고객의 피부 타입과 제품의 피부타입에 따른 점수 
-        # (피부 타입 100% 일치 0.5점 가산점 부여, 불일치 20% 0.1점 부여)
-        # 0.3점 : 제품의 리뷰를 작성한 고객의 등급에 따른 제품에 대한 가산점 부여
-        # (GOLD, BLACK등급의 고객이 많이 작성한 제품일 경우 0.2 점 가산점 부여) 아닌 경우 그린,핑크, 베이비 일때 0.1 점 부여)
-        # 0.2 점 : 연령에 따른 점수 (제품의 리뷰를 보았을때 40대 미만의 고객이 리뷰를 많이 남긴 제품일 경우 0.2점 부여)
-        # 도합 만점 6점.
-        # goods_code 기준으로 딕셔너리 변환
-        result_dict = {item['goods_code']: item for item in buyandreviewData}
-
-        for product_id, review_score in zip(goods_ids, review_scores):
-            # 기본 예측
-            predicted_rating = model.predict(customer_code, product_id, review_score).est
-
-            # 후 가중치 계산
-            final_score = predicted_rating
-
-            # 상품코드 기준으로 딕셔너리 생성
-            reviewdata_info = result_dict.get(product_id, {})
-
-            # 고객 피부 타입에 따른 가산점 부여
-            if customer_skintype == reviewdata_info.get('goods_skintype', 0):
-                final_score += 0.5
-            else:
-                final_score += 0.1
-
-            # 고등급 고객의 리뷰 비율 25% 이상일 경우 가산점 부여
-            high_grade_count = reviewdata_info.get('high_grade_count', 0)
-            total_reviews = reviewdata_info.get('total', 0)
-
-            if (high_grade_count / total_reviews) > 0.25:
-                final_score += 0.3
-            else:
-                final_score += 0.1
-
-            # 제품의 리뷰 남긴 고객의 나이대가 고객이 속한 나이대의 비율 60% 이상 (40세 미만, 40세 이상 구별)
-            young_count = reviewdata_info.get('young_count', 0)
-            old_count = reviewdata_info.get('old_count', 0)
-
-            if customer_age < 40 :
-                if (young_count / total_reviews) > 0.6 :
-                    final_score += 0.2
-
-            # 계산 후 배열에 추가
-            product_predictions[product_id].append(round(final_score, 3))
-
-        average_predictions = [
-            (product_id, sum(ratings)/len(ratings))
-            for product_id, ratings in product_predictions.items()
-        ]
+    # customer_idx, goods_idx 는 IdEncoder 인덱스, statis 는 load_statis_table 결과 (상품 인덱스 기준 배열)
+    def get_recommendations(self, customer_idx, customer_age, customer_skintype, goods_idx, statis, n_recommendations=3):
+        top_goods, top_scores = self.rank_goods(customer_idx, customer_age, customer_skintype, goods_idx, statis,
+                                                n_recommendations)
+        goods_codes = self.model_ids('goods').decode(top_goods)
+        return [(goods_code, float(score)) for goods_code, score in zip(goods_codes, top_scores)]
+
+    # 후보 상품 점수 계산 후 상위 n개의 (상품 인덱스, 점수) 반환
+    def rank_goods(self, customer_idx, customer_age, customer_skintype, goods_idx, statis, n_recommendations=3):
+        top_goods, top_scores = self.rank_segment(np.array([customer_idx]), customer_age, customer_skintype,
+                                                  goods_idx, statis, n_recommendations)
+        return top_goods[0], top_scores[0]
+
+    # 같은 구간(피부 타입, 40세 미만 여부) 고객들의 점수를 한 번에 계산한다.
+    # 예측 평점 행렬에 구간 가산점 벡터(BONUS_RULES)를 broadcast 로 더한 뒤 고객별 상위 n개를 고른다.
+    def rank_segment(self, customer_idx, customer_age, customer_skintype, goods_idx, statis, n_recommendations=3):
+        # 기본 예측
+        final_score = self.factors.predict_users(customer_idx, goods_idx).astype(np.float64)
+
+        # 피부 타입, 고등급 리뷰 비율, 연령대 가산점
+        final_score += segment_bonus(statis['bonus'], customer_skintype, customer_age)[goods_idx]
+
+        final_score = np.round(final_score, 3)
+
         # 예상 평점이 높은 순으로 정렬
-        recommendations = sorted(average_predictions, key=lambda x: x[1], reverse=True)[:n_recommendations]
-        return recommendations
+        top = np.argsort(-final_score, axis=1, kind='stable')[:, :n_recommendations]
+        return goods_idx[top], np.take_along_axis(final_score, top, axis=1)
+
+    # 상호작용 이력이 없는 고객용 (피부 타입, 40세 미만 여부) 구간별 추천 목록을 미리 계산한다.
+    # 이런 고객의 예측 평점은 global_mean + bi 로 고객과 무관하므로 가산점 구간별로 한 번만 계산하면 된다.
+    def build_cold_start_table(self, statis, goods_idx, n_recommendations=3):
+        n_skintypes = len(get_encoder('skintype'))
+        table_goods = np.full((n_skintypes, 2, n_recommendations), -1, dtype=np.int32)
+        table_scores = np.zeros((n_skintypes, 2, n_recommendations))
+
+        young_age = BONUS_RULES['young']['max_age']
+        for skintype in range(n_skintypes):
+            for young, age in ((0, young_age), (1, young_age - 1)):
+                top_goods, top_scores = self.rank_goods(-1, age, skintype, goods_idx, statis, n_recommendations)
+                table_goods[skintype, young, :len(top_goods)] = top_goods
+                table_scores[skintype, young, :len(top_scores)] = top_scores
+
+        statis['cold_start_goods'] = table_goods
+        statis['cold_start_scores'] = table_scores
+        return statis
+
+    # 미리 계산된 구간별 목록에서 바로 조회한다 (O(1))
+    def get_cold_start_recommendations(self, statis, customer_skintype, customer_age):
+        table_goods = statis['cold_start_goods']
+        if not 0 <= customer_skintype < len(table_goods):
+            # 목록 계산 이후 처음 등장한 피부 타입
+            return self.get_recommendations(-1, customer_age, customer_skintype, self.factors.candidates, statis)
+        young = 1 if is_young(customer_age) else 0
+        top_goods = table_goods[customer_skintype, young]
+        top_scores = statis['cold_start_scores'][customer_skintype, young]
+        valid = top_goods >= 0
+        goods_codes = self.model_ids('goods').decode(top_goods[valid])
+        return [(goods_code, float(score)) for goods_code, score in zip(goods_codes, top_scores[valid])]
     
     #고객별이므로 요청된 고객의 id 값으로 고객의 나이, 스킨 타입, 고객 등급을 조회한다.
     def load_customer_data(self):
@@ -183,13 +391,13 @@ class CollaboFilterService:
                 ).label('age_60s_plus_count'),
                 func.count(
                     case(
-                        (Customer.customer_age < 40, 1),
+                        (Customer.customer_age < BONUS_RULES['young']['max_age'], 1),
                         else_=None
                     )
                 ).label('young_count'),
                 func.count(
                     case(
-                        (Customer.customer_age >= 40, 1),
+                        (Customer.customer_age >= BONUS_RULES['young']['max_age'], 1),
                         else_=None
                     )
                 ).label('old_count'),
@@ -220,10 +428,30 @@ class CollaboFilterService:
         except Exception as e:
             return f'load_statis_data DB 정보를 불러오는데 실패했습니다. 에러코드 : {e}'
 
+    # 리뷰 통계 데이터를 상품 인덱스 기준의 배열로 변환
+    def load_statis_table(self, statis=None):
+        statis = self.load_statis_data() if statis is None else statis
+
+        goods_idx = goods_encoder().encode(row['goods_code'] for row in statis)
+        skintypes = get_encoder('skintype').encode(row['goods_skintype'] for row in statis)
+        n_goods = len(goods_encoder())
+
+        table = {'goods_skintype': np.full(n_goods, -1, dtype=np.int32)}
+        table['goods_skintype'][goods_idx] = skintypes
+        for column in ('high_grade_count', 'young_count', 'old_count', 'total'):
+            table[column] = np.zeros(n_goods, dtype=np.int32)
+            table[column][goods_idx] = [row[column] for row in statis]
+
+        total = table['total']
+        table['high_grade_ratio'] = np.divide(table['high_grade_count'], total, out=np.zeros(n_goods), where=total > 0)
+        table['young_ratio'] = np.divide(table['young_count'], total, out=np.zeros(n_goods), where=total > 0)
+        table['bonus'] = build_bonus_matrix(table, len(get_encoder('skintype')))
+        return table
+
     # DB - 리뷰데이터 조회
     def load_review_data(self):
         try:
-            # Review 테이블에서 최신순으로 1만개만 조회하는 서브쿼리 생성
+            # Review 테이블에서 최신순으로 2000개만 조회하는 서브쿼리 생성 (학습에는 load_training_arrays 사용)
             latest_reviews = self.db.session.query(Review).order_by(Review.created_date.desc()).limit(2000).subquery()
 
             data = self.db.session.query(
@@ -259,6 +487,107 @@ class CollaboFilterService:
         except Exception as e:
             return f'DB 정보를 불러오는데 실패했습니다. 에러코드 : {e}'
         
+    # 최근 리뷰 행 [고객, 나이, 등급, 상품, 상품명, 상품 피부 타입, 평점]을 하나씩 생성한다 (스트리밍 응답용)
+    def iter_review_rows(self, limit=2000):
+        for partition in ReviewRepository().stream_latest_reviews(limit):
+            for row in partition:
+                yield list(row)
+
+    # DB - 학습용 리뷰 전체 이력을 chunk 단위로 읽어 압축된 배열로 변환
+    # window_days : 최근 N일 리뷰만 사용 (None 이면 전체 이력)
+    # half_life_days : 시간 감쇠 반감기 (None 이면 감쇠 없음, collect_ratings 참고)
+    def load_training_arrays(self, window_days=REVIEW_WINDOW_DAYS, half_life_days=REVIEW_HALF_LIFE_DAYS,
+                             chunk_size=REVIEW_CHUNK_SIZE):
+        since = datetime.utcnow() - timedelta(days=window_days) if window_days else None
+
+        training = self.collect_ratings(ReviewRepository().stream_ratings(since, chunk_size), half_life_days)
+
+        print("\n=== 학습 데이터 로딩 결과 ===")
+        print(f"총 로드된 리뷰 수: {training['n_reviews']}, 학습 평점 수: {len(training['review_score'])}")
+        if half_life_days:
+            print(f"시간 감쇠 반감기 {half_life_days}일: 평균 가중치 {training['weight'].mean():.3f}")
+        print(f"고객 수: {len(np.unique(training['customer_idx']))}, 상품 수: {len(np.unique(training['goods_idx']))}")
+        return training
+
+    # 리뷰 chunk 들을 인덱스 배열로 변환하고 같은 (고객, 상품) 쌍은 가중 평균 평점 하나로 합친다.
+    # half_life_days 가 있으면 리뷰마다 0.5 ** (가장 최근 리뷰로부터 경과일 / 반감기) 가중치를 주고,
+    # Surprise SVD 는 평점별 가중치를 받지 않으므로 쌍의 가중치(1 이하)만큼 평점을 전체 가중 평균 쪽으로 당긴다.
+    #   평점 = 평균 + 가중치 * (쌍 평점 - 평균)
+    # 오래된 평점은 평균과의 차이가 줄어 bias/factor 학습에 주는 영향이 작아진다.
+    # 경과일은 가장 최근 리뷰 기준이므로 한동안 리뷰가 없어도 최신 평점은 감쇠되지 않는다.
+    def collect_ratings(self, partitions, half_life_days=None):
+        customers = customer_encoder()
+        goods = goods_encoder()
+        customer_chunks, goods_chunks, score_chunks, time_chunks = [], [], [], []
+
+        for rows in partitions:
+            count = len(rows)
+            customer_chunks.append(customers.encode(row[0] for row in rows))
+            goods_chunks.append(goods.encode(row[1] for row in rows))
+            score_chunks.append(np.fromiter((row[2] for row in rows), dtype=np.float32, count=count))
+            if half_life_days:
+                time_chunks.append(np.fromiter((row[3].timestamp() for row in rows), dtype=np.float64, count=count))
+
+        customer_idx = np.concatenate(customer_chunks) if customer_chunks else np.empty(0, dtype=np.int32)
+        goods_idx = np.concatenate(goods_chunks) if goods_chunks else np.empty(0, dtype=np.int32)
+        scores = np.concatenate(score_chunks) if score_chunks else np.empty(0, dtype=np.float32)
+
+        if half_life_days and time_chunks:
+            times = np.concatenate(time_chunks)
+            weights = np.power(0.5, (times.max() - times) / (half_life_days * 86400))
+        else:
+            weights = np.ones(len(scores))
+
+        n_goods = max(len(goods), 1)
+        pair_keys, inverse = np.unique(customer_idx.astype(np.int64) * n_goods + goods_idx, return_inverse=True)
+        weight_sum = np.bincount(inverse, weights=weights)
+        pair_scores = np.bincount(inverse, weights=weights * scores) / np.where(weight_sum > 0, weight_sum, 1)
+        pair_weights = np.minimum(weight_sum, 1.0)
+        if half_life_days and len(scores):
+            mean = np.dot(weights, scores) / weights.sum()  # 가장 최근 리뷰의 가중치가 1 이므로 0 이 아니다
+            pair_scores = mean + pair_weights * (pair_scores - mean)
+
+        return {
+            'customer_idx': (pair_keys // n_goods).astype(np.int32),
+            'goods_idx': (pair_keys % n_goods).astype(np.int32),
+            'review_score': pair_scores.astype(np.float32),
+            'weight': pair_weights.astype(np.float32),
+            'n_reviews': len(scores),
+        }
+
+    # DB - (고객, 상품)별 순 구매 수량을 고객 x 상품 희소 행렬로 조회 (implicit ALS 학습용)
+    # customer_codes / goods_codes 를 주면 해당 고객 또는 상품의 이력만 조회한다.
+    def load_purchase_matrix(self, chunk_size=REVIEW_CHUNK_SIZE, customer_codes=None, goods_codes=None):
+        customers = customer_encoder()
+        goods = goods_encoder()
+        customer_chunks, goods_chunks, count_chunks = [], [], []
+
+        for rows in OrderRepository().stream_net_purchase_counts(chunk_size, customer_codes, goods_codes):
+            customer_chunks.append(customers.encode(row[0] for row in rows))
+            goods_chunks.append(goods.encode(row[1] for row in rows))
+            count_chunks.append(np.fromiter((row[2] for row in rows), dtype=np.float32, count=len(rows)))
+
+        counts = np.concatenate(count_chunks) if count_chunks else np.empty(0, dtype=np.float32)
+        positive = counts > 0
+        purchases = sparse.csr_matrix(
+            (counts[positive],
+             (np.concatenate(customer_chunks)[positive] if customer_chunks else [],
+              np.concatenate(goods_chunks)[positive] if goods_chunks else [])),
+            shape=(len(customers), len(goods))
+        )
+
+        print("\n=== 구매 데이터 로딩 결과 ===")
+        print(f"(고객, 상품) 구매 쌍 수: {purchases.nnz}")
+        return purchases
+
+    # 학습 배열을 Surprise 에 넘길 DataFrame 으로 변환 (raw id 는 IdEncoder 인덱스)
+    def to_ratings_df(self, training):
+        return pd.DataFrame({
+            'customer_idx': training['customer_idx'],
+            'goods_idx': training['goods_idx'],
+            'review_score': training['review_score']
+        })
+
     # SVD에 넣기 위해 데이터 가공    
     def process_training_data(self, result):
 
@@ -279,53 +608,62 @@ class CollaboFilterService:
         return input_training
     
     # 추천 실행
-    def runningRecommend(self):
-        # 리뷰 데이터 조회
-        reviews = self.load_review_data()
+    def runningRecommend(self, model_kind=RECOMMEND_MODEL):
+        # 모델 학습, 리뷰 통계 데이터 조회 (상품 인덱스 기준 배열) 후 모델 저장
+        goods_idx, statis = self.retrain(model_kind)
 
         # 고객 데이터 조회
         customers = self.load_customer_data()
 
-        # 리뷰 통계 데이터 조회
-        statis = self.load_statis_data()
-
-        # 데이터 가공 
-        processData = self.process_training_data(reviews)
-
-        # DataFrame 으로 전환
-        recommend_df = pd.DataFrame(processData)
-
-        goods_ids = recommend_df['goods_code'].tolist()
-        review_scores = recommend_df['review_score'].tolist()
-
-        loaded_data = self.load_data(recommend_df)
-
-        self.model = self.train_model(loaded_data)
-
-        all_recommends = []
-
-        for customer in customers :
-            customer_code = customer['customer_code']
-            customer_age = customer['customer_age']
-            customer_skintype = customer['customer_skintype']
-
-            recommendations = self.get_recommendations(customer_code, customer_age, customer_skintype, goods_ids, review_scores, statis)
-
-            all_recommends.append({
-                'customer_code' : customer_code,
-                'recommendations' : recommendations
-            })
+        # 피부 타입도 인덱스로 변환
+        customer_codes = [customer['customer_code'] for customer in customers]
+        skintypes = get_encoder('skintype').encode(customer['customer_skintype'] for customer in customers)
+        ages = np.array([customer['customer_age'] for customer in customers])
+        return self.score_customers(customer_codes, ages, skintypes, goods_idx, statis)
+
+    # 고객 목록의 추천 계산 (customer_codes 순서대로 [{customer_code, recommendations}])
+    # skintypes 는 피부 타입 인덱스 배열. 오프라인 배치에서는 고객 shard 단위로 호출한다.
+    def score_customers(self, customer_codes, ages, skintypes, goods_idx, statis):
+        customer_idx = customer_encoder().encode(customer_codes)
+        young = np.array([is_young(age) for age in ages], dtype=bool)
+        trained = np.array([self.factors.is_trained_customer(idx) for idx in customer_idx], dtype=bool)
+
+        all_recommends = [None] * len(customer_codes)
+
+        # 상호작용 이력이 없는 고객은 전체 점수 계산 없이 구간별 목록 사용
+        for position in np.flatnonzero(~trained):
+            all_recommends[position] = {
+                'customer_code' : customer_codes[position],
+                'recommendations' : self.get_cold_start_recommendations(statis, skintypes[position], ages[position])
+            }
+
+        # 나머지 고객은 (피부 타입, 40세 미만 여부) 구간별로 묶어 블록 단위로 점수 계산
+        segment_keys = skintypes.astype(np.int64) * 2 + young
+        for segment in np.unique(segment_keys[trained]):
+            positions = np.flatnonzero(trained & (segment_keys == segment))
+            for start in range(0, len(positions), SCORING_BLOCK_SIZE):
+                block = positions[start:start + SCORING_BLOCK_SIZE]
+                top_goods, top_scores = self.rank_segment(customer_idx[block], ages[block[0]], skintypes[block[0]],
+                                                          goods_idx, statis)
+                goods_codes = goods_encoder().decode(top_goods)
+                for position, codes, scores in zip(block, goods_codes, top_scores):
+                    all_recommends[position] = {
+                        'customer_code' : customer_codes[position],
+                        'recommendations' : [(code, float(score)) for code, score in zip(codes, scores)]
+                    }
 
         # 고객 개인별 Id, 나이, 피부타입, 등급, 상품 목록, 리뷰 점수, 리뷰데이터에 대한 통계 데이터
         return all_recommends
     
-    def create_analysis(self, analysis_kind, analysis_title, analysis_description):
+    # completed=False 이면 저장 중 상태로 만든다 (나눠 저장한 뒤 AnalysisRepository.mark_completed 로 완료)
+    def create_analysis(self, analysis_kind, analysis_title, analysis_description, completed=True):
         try:
             new_analysis = Analysis(
                 analysis_kind = analysis_kind,
                 analysis_title = analysis_title,
                 analysis_description = analysis_description,
-                created_date = func.now()
+                created_date = func.now(),
+                completed_date = func.now() if completed else None
             )
 
             db.session.add(new_analysis)
@@ -336,6 +674,15 @@ class CollaboFilterService:
             print(f"An error occurred while creating analysis: {e}")
         return None
     
+    # after_analysis_id 이후 다른 worker 가 만든 같은 제목의 개인별 추천 분석 ID (없으면 None)
+    def find_recent_analysis(self, analysis_title, after_analysis_id):
+        return db.session.query(func.max(Analysis.analysis_id)).filter(
+            Analysis.analysis_id > after_analysis_id,
+            Analysis.completed_date.isnot(None),
+            Analysis.analysis_kind == 'PERSONALIZED',
+            Analysis.analysis_title == analysis_title
+        ).scalar()
+
     def delete_analysis(self, analysis_id):
         try:
             analysis = Analysis.query.get(analysis_id)
@@ -348,7 +695,35 @@ class CollaboFilterService:
             print(f"An error occurred while creating analysis: {e}")
             return False
         
+    # 분석 행과 추천 행을 한 트랜잭션으로 저장하고 분석 ID 를 반환한다.
+    # 분석 행이 결과와 함께 커밋되므로, 저장 도중 기다리기 시작한 다른 worker 가 본
+    # 최대 analysis_id 보다 항상 크다 (single-flight recheck 가 이 분석을 찾는다)
+    def save_analysis(self, analysis_kind, analysis_title, analysis_description, all_recommends):
+        try:
+            analysis = Analysis(
+                analysis_kind = analysis_kind,
+                analysis_title = analysis_title,
+                analysis_description = analysis_description,
+                created_date = func.now(),
+                completed_date = func.now()
+            )
+            db.session.add(analysis)
+            db.session.flush()
+            analysis_id = analysis.analysis_id
+            db.session.bulk_save_objects(self.build_recommendations(all_recommends, analysis_id))
+            db.session.commit()
+            return analysis_id
+        except Exception as e:
+            print(f"An error occurred while saving analysis: {e}")
+            db.session.rollback()
+            raise
+
     def save_recommendation(self, all_recommends, analysis_id): 
+        db.session.bulk_save_objects(self.build_recommendations(all_recommends, analysis_id))
+        db.session.commit()
+
+    # 고객별 1순위 추천 -> PersonalizedRecommendation 행 목록
+    def build_recommendations(self, all_recommends, analysis_id):
         personalized_recommendations = []
         # 리스트의 각 요소(딕셔너리)에 접근
         for recommendation in all_recommends:
@@ -361,6 +736,4 @@ class CollaboFilterService:
                 recommendation_score = score
             )
             personalized_recommendations.append(personalized)
-        
-        db.session.bulk_save_objects(personalized_recommendations)
-        db.session.commit()
+        return personalized_recommendations
@@ -0,0 +1,104 @@
+import csv
+import gzip
+import os
+
+from model.enums import AnalysisKind
+from repository.recommendation_repository import RecommendationRepository
+from service import json_stream
+from config import EXPORT_CHUNK_SIZE
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow 가 없으면 parquet 대신 csv.gz 로 내보낸다
+    pa = None
+    pq = None
+
+# 분석 종류별 내보내기 컬럼 (이름, parquet 타입)
+EXPORT_COLUMNS = {
+    AnalysisKind.PERSONALIZED: (('customerCode', 'string'), ('goodsCode', 'string'), ('score', 'float64')),
+    AnalysisKind.ASSOCIATION: (('goodsCode', 'string'), ('associatedGoodsCode', 'string'), ('support', 'float64'),
+                               ('confidence', 'float64'), ('lift', 'float64')),
+}
+
+FORMATS = ('ndjson', 'csv.gz', 'parquet')
+
+
+def default_format():
+    return 'parquet' if pa is not None else 'csv.gz'
+
+
+# 분석 결과 전체 내보내기. 서버 사이드 커서로 chunk 단위로 읽어 바로 쓰므로 전체 결과를 메모리에 올리지 않는다.
+class ExportService:
+    def __init__(self, chunk_size=EXPORT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.repository = RecommendationRepository()
+
+    # 분석 종류 (없는 분석이면 None)
+    def analysis_kind(self, analysis_id):
+        return self.repository.analysis_kind(analysis_id)
+
+    def _partitions(self, analysis_id, kind):
+        return self.repository.stream_analysis_rows(analysis_id, kind, self.chunk_size)
+
+    # 행을 컬럼 이름 dict 로 하나씩 생성한다
+    def iter_records(self, analysis_id, kind):
+        names = [name for name, _ in EXPORT_COLUMNS[kind]]
+        for partition in self._partitions(analysis_id, kind):
+            for row in partition:
+                yield dict(zip(names, row))
+
+    # NDJSON 을 chunk 단위 bytes 로 생성한다 (HTTP chunked 응답용)
+    def iter_ndjson(self, analysis_id, kind):
+        return json_stream.iter_ndjson(self.iter_records(analysis_id, kind))
+
+    # {"analysisId", "kind", "items": [...]} JSON 을 chunk 단위 bytes 로 생성한다
+    def iter_json(self, analysis_id, kind):
+        return json_stream.iter_json_array(self.iter_records(analysis_id, kind),
+                               head={'analysisId': analysis_id, 'kind': kind.name})
+
+    # 파일로 내보낸다. 임시 파일에 쓴 뒤 교체한다. 반환값: 내보낸 행 수
+    def write_file(self, analysis_id, kind, path, fmt=None):
+        fmt = fmt or default_format()
+        if fmt not in FORMATS:
+            raise ValueError(f"format must be one of {FORMATS}")
+        if fmt == 'parquet' and pa is None:
+            raise RuntimeError("parquet export requires pyarrow")
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        writer = {'ndjson': self._write_ndjson, 'csv.gz': self._write_csv_gz, 'parquet': self._write_parquet}[fmt]
+        rows = writer(analysis_id, kind, tmp_path)
+        os.replace(tmp_path, path)
+        return rows
+
+    def _write_ndjson(self, analysis_id, kind, path):
+        rows = 0
+        with open(path, 'wb') as file:
+            for chunk in self.iter_ndjson(analysis_id, kind):
+                file.write(chunk)
+                rows += chunk.count(b'\n')
+        return rows
+
+    def _write_csv_gz(self, analysis_id, kind, path):
+        rows = 0
+        with gzip.open(path, 'wt', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow([name for name, _ in EXPORT_COLUMNS[kind]])
+            for partition in self._partitions(analysis_id, kind):
+                writer.writerows(partition)
+                rows += len(partition)
+        return rows
+
+    # chunk 마다 row group 하나씩 쓴다
+    def _write_parquet(self, analysis_id, kind, path):
+        columns = EXPORT_COLUMNS[kind]
+        schema = pa.schema([(name, getattr(pa, type_name)()) for name, type_name in columns])
+        rows = 0
+        with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+            for partition in self._partitions(analysis_id, kind):
+                arrays = list(zip(*partition))
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(values, type=field.type) for values, field in zip(arrays, schema)], schema=schema))
+                rows += len(partition)
+        return rows
@@ -0,0 +1,135 @@
+import numpy as np
+
+
+# 학습된 행렬 분해 모델을 고객/상품 인덱스(IdEncoder) 기준의 연속 배열로 보관한다.
+# 학습에 없던 고객/상품은 bias, factor 가 0 이므로 Surprise SVD 의 예측 규칙과 같다.
+#   est = clip(global_mean + bu[u] + bi[i] + qi[i] . pu[u])
+# kind : 'svd' (리뷰 평점) 또는 'als' (구매 이력)
+# trained_goods / trained_customers : 학습(또는 fold-in)에 이력이 반영된 상품 / 고객 여부
+# ids : 모델 파일에 함께 저장된 고객/상품 ID 맵 스냅샷 ({'customer': MappedIds, 'goods': MappedIds}, 없으면 {})
+class FactorModel:
+    ARRAYS = ('bu', 'bi', 'pu', 'qi', 'trained_goods', 'trained_customers')
+
+    def __init__(self, global_mean, bu, bi, pu, qi, rating_scale=(1, 5), kind='svd', trained_goods=None,
+                 trained_customers=None, meta=None, ids=None):
+        self.global_mean = float(global_mean)
+        self.bu = bu
+        self.bi = bi
+        self.pu = pu
+        self.qi = qi
+        self.rating_scale = tuple(rating_scale)
+        self.kind = kind
+        self.trained_goods = trained_goods if trained_goods is not None else np.zeros(len(bi), dtype=bool)
+        self.trained_customers = trained_customers if trained_customers is not None else np.zeros(len(bu), dtype=bool)
+        self.meta = meta or {}
+        self.ids = ids or {}
+
+    @property
+    def n_customers(self):
+        return len(self.bu)
+
+    @property
+    def n_goods(self):
+        return len(self.bi)
+
+    # 추천 후보 상품 인덱스
+    @property
+    def candidates(self):
+        return np.flatnonzero(self.trained_goods)
+
+    # 상호작용 이력이 반영된 고객인지 (아니면 예측 평점이 global_mean + bi 로 고객과 무관하다)
+    def is_trained_customer(self, customer_idx):
+        return 0 <= customer_idx < self.n_customers and bool(self.trained_customers[customer_idx])
+
+    # Surprise SVD 모델의 내부 인덱스를 IdEncoder 인덱스로 재배치한다.
+    # 학습 데이터의 raw id 는 IdEncoder 인덱스(int)여야 한다.
+    @classmethod
+    def from_surprise(cls, model, n_customers, n_goods):
+        trainset = model.trainset
+        n_factors = model.pu.shape[1]
+
+        user_rows = np.fromiter((trainset.to_raw_uid(inner) for inner in trainset.all_users()),
+                                dtype=np.int64, count=trainset.n_users)
+        item_rows = np.fromiter((trainset.to_raw_iid(inner) for inner in trainset.all_items()),
+                                dtype=np.int64, count=trainset.n_items)
+
+        bu = np.zeros(n_customers, dtype=np.float32)
+        bi = np.zeros(n_goods, dtype=np.float32)
+        pu = np.zeros((n_customers, n_factors), dtype=np.float32)
+        qi = np.zeros((n_goods, n_factors), dtype=np.float32)
+        trained_goods = np.zeros(n_goods, dtype=bool)
+        trained_customers = np.zeros(n_customers, dtype=bool)
+
+        bu[user_rows] = model.bu
+        bi[item_rows] = model.bi
+        pu[user_rows] = model.pu
+        qi[item_rows] = model.qi
+        trained_goods[item_rows] = True
+        trained_customers[user_rows] = True
+
+        return cls(trainset.global_mean, bu, bi, pu, qi, trainset.rating_scale, 'svd', trained_goods, trained_customers)
+
+    # 인코더에 새 고객/상품이 추가되었으면 0 으로 채운 행을 덧붙인다
+    def grow(self, n_customers, n_goods):
+        if n_customers > self.n_customers:
+            extra = n_customers - self.n_customers
+            self.bu = np.concatenate([self.bu, np.zeros(extra, dtype=self.bu.dtype)])
+            self.pu = np.vstack([self.pu, np.zeros((extra, self.pu.shape[1]), dtype=self.pu.dtype)])
+            self.trained_customers = np.concatenate([self.trained_customers, np.zeros(extra, dtype=bool)])
+        if n_goods > self.n_goods:
+            extra = n_goods - self.n_goods
+            self.bi = np.concatenate([self.bi, np.zeros(extra, dtype=self.bi.dtype)])
+            self.qi = np.vstack([self.qi, np.zeros((extra, self.qi.shape[1]), dtype=self.qi.dtype)])
+            self.trained_goods = np.concatenate([self.trained_goods, np.zeros(extra, dtype=bool)])
+
+    # 반대편(상품 또는 고객) bias/factor 를 고정하고 대상의 bias/factor 를 ridge 최소제곱으로 푼다.
+    # Surprise SVD 와 같이 평점 하나당 정규화 항이 붙으므로 정규화 계수에 평점 수를 곱한다.
+    def _solve_explicit(self, targets, others, ratings, fixed_bias, fixed_factors, regularization):
+        order = np.argsort(targets, kind='stable')
+        targets, others, ratings = targets[order], others[order], ratings[order]
+        unique_targets, starts, counts = np.unique(targets, return_index=True, return_counts=True)
+
+        Z = np.hstack([np.ones((len(others), 1)), fixed_factors[others].astype(np.float64)])
+        y = ratings - self.global_mean - fixed_bias[others]
+        n_params = Z.shape[1]
+
+        A = np.empty((len(unique_targets), n_params, n_params))
+        b = np.empty((len(unique_targets), n_params))
+        for n, (start, count) in enumerate(zip(starts, counts)):
+            Zt = Z[start:start + count]
+            A[n] = Zt.T @ Zt + regularization * count * np.eye(n_params)
+            b[n] = Zt.T @ y[start:start + count]
+
+        theta = np.linalg.solve(A, b[..., np.newaxis])[..., 0]
+        return unique_targets, theta[:, 0], theta[:, 1:]
+
+    # 상품 factor 를 고정하고 고객의 bias/factor 를 다시 푼다 (SVD 모델)
+    def fold_in_customers(self, customer_idx, goods_idx, ratings, regularization):
+        rows, bias, factors = self._solve_explicit(customer_idx, goods_idx, ratings, self.bi, self.qi, regularization)
+        self.bu[rows] = bias
+        self.pu[rows] = factors
+        self.trained_customers[rows] = True
+        return rows
+
+    # 고객 factor 를 고정하고 상품의 bias/factor 를 다시 푼다 (SVD 모델)
+    def fold_in_goods(self, customer_idx, goods_idx, ratings, regularization):
+        rows, bias, factors = self._solve_explicit(goods_idx, customer_idx, ratings, self.bu, self.pu, regularization)
+        self.bi[rows] = bias
+        self.qi[rows] = factors
+        self.trained_goods[rows] = True
+        return rows
+
+    # 여러 고객 x 후보 상품의 예측 평점 행렬 (한 번의 행렬 곱)
+    def predict_users(self, customer_idx, goods_idx):
+        customer_idx = np.asarray(customer_idx)
+        est = np.full((len(customer_idx), len(goods_idx)), self.global_mean, dtype=np.float32)
+        est += self.bi[goods_idx]
+
+        known = (customer_idx >= 0) & (customer_idx < self.n_customers)
+        rows = customer_idx[known]
+        est[known] += self.bu[rows][:, np.newaxis] + self.pu[rows] @ self.qi[goods_idx].T
+        return np.clip(est, *self.rating_scale)
+
+    # 한 고객에 대한 후보 상품들의 예측 평점 (벡터 연산)
+    def predict_user(self, customer_idx, goods_idx):
+        return self.predict_users([customer_idx], goods_idx)[0]
@@ -0,0 +1,120 @@
+import fcntl
+import json
+import os
+import threading
+
+import numpy as np
+
+from config import ARTIFACT_DIR
+
+ID_MAP_DIR = os.path.join(ARTIFACT_DIR, 'id_maps')
+
+
+# 고객/상품 코드 <-> 연속된 int32 인덱스 변환기
+# 인덱스는 한 번 부여되면 바뀌지 않고 새 코드는 뒤에 추가만 된다(append-only).
+# name 을 지정하면 디스크에 저장되어 프로세스 간에 같은 인덱스를 공유한다.
+class IdEncoder:
+    def __init__(self, name=None):
+        self.name = name
+        self.codes = []
+        self.index = {}
+        self._code_array = None
+        self._lock = threading.Lock()
+        if name:
+            self._reload()
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def path(self):
+        return os.path.join(ID_MAP_DIR, f'{self.name}.json')
+
+    def _reload(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                codes = json.load(f)
+        except (OSError, ValueError):
+            return
+        # 디스크의 목록은 항상 메모리 목록을 앞부분으로 포함한다 (append-only)
+        self._add(codes[len(self.codes):])
+
+    def _add(self, new_codes):
+        for code in new_codes:
+            if code not in self.index:
+                self.index[code] = len(self.codes)
+                self.codes.append(code)
+        self._code_array = None
+
+    # 새 코드를 추가한다. 다른 프로세스가 먼저 추가한 코드가 있으면 파일 잠금 안에서 다시 읽고 이어 붙인다.
+    def _append(self, new_codes):
+        if not self.name:
+            self._add(new_codes)
+            return
+
+        os.makedirs(ID_MAP_DIR, exist_ok=True)
+        with open(f'{self.path}.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self._reload()
+            self._add(new_codes)
+
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.codes, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+    # 다른 프로세스가 추가한 코드를 반영한다
+    def refresh(self):
+        if self.name:
+            with self._lock:
+                self._reload()
+
+    # 코드 하나를 인덱스로 변환 (add=False 이고 없는 코드면 -1)
+    def encode_one(self, code, add=True):
+        idx = self.index.get(code)
+        if idx is None:
+            if not add:
+                return -1
+            with self._lock:
+                if code not in self.index:
+                    self._append([code])
+            idx = self.index[code]
+        return idx
+
+    # 코드 목록을 int32 배열로 변환 (add=False 이면 없는 코드는 -1)
+    def encode(self, codes, add=True):
+        codes = list(codes)
+        if add:
+            new_codes = [code for code in dict.fromkeys(codes) if code not in self.index]
+            if new_codes:
+                with self._lock:
+                    self._append(new_codes)
+        index = self.index
+        return np.fromiter((index.get(code, -1) for code in codes), dtype=np.int32, count=len(codes))
+
+    # 인덱스 배열을 코드 배열로 되돌린다
+    def decode(self, indices):
+        if self._code_array is None or len(self._code_array) != len(self.codes):
+            self._code_array = np.array(self.codes, dtype=object)
+        return self._code_array[np.asarray(indices, dtype=np.int64)]
+
+
+_encoders = {}
+_encoders_lock = threading.Lock()
+
+
+# 프로세스 내에서 이름별로 하나의 인코더를 공유한다
+def get_encoder(name):
+    with _encoders_lock:
+        if name not in _encoders:
+            _encoders[name] = IdEncoder(name)
+        encoder = _encoders[name]
+    return encoder
+
+
+def customer_encoder():
+    return get_encoder('customer')
+
+
+def goods_encoder():
+    return get_encoder('goods')
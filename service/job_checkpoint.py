@@ -0,0 +1,92 @@
+import json
+import os
+import shutil
+from datetime import datetime
+
+import numpy as np
+
+from config import ARTIFACT_DIR
+
+JOB_DIR = os.path.join(ARTIFACT_DIR, 'jobs')
+
+
+# 오프라인 배치 작업의 단계별 체크포인트 (artifacts/jobs/<name>/)
+# state.json 에 완료된 단계(또는 shard)와 그 결과 정보를 기록하고, 단계 산출물은 같은 디렉터리에 둔다.
+# 모든 파일은 임시 파일에 쓴 뒤 교체하므로 중단되어도 완료로 기록된 단계의 파일은 항상 온전하다.
+class JobCheckpoint:
+    def __init__(self, name, params, directory=JOB_DIR):
+        self.name = name
+        self.params = params
+        self.directory = os.path.join(directory, name)
+        self.state = None
+
+    @property
+    def state_path(self):
+        return self.path('state.json')
+
+    def path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def read_state(self):
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    # 끝나지 않은 이전 실행이 있으면 이어서 하고, 없으면(또는 restart) 새로 시작한다.
+    # 반환값: 이어서 하는지 여부
+    def start(self, restart=False):
+        state = self.read_state()
+        if state and not state.get('finished_at') and not restart:
+            if state['params'] != self.params:
+                raise ValueError(f"'{self.name}' 작업이 다른 파라미터 {state['params']} 로 진행 중입니다. "
+                                 f"처음부터 다시 하려면 --restart 를 사용하세요.")
+            self.state = state
+            return True
+
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
+        self.state = {'params': self.params, 'started_at': datetime.utcnow().isoformat(), 'stages': {}}
+        self._write_state()
+        return False
+
+    def done(self, stage):
+        return stage in self.state['stages']
+
+    def info(self, stage):
+        return self.state['stages'].get(stage)
+
+    # 단계 완료 기록 (산출물을 다 쓴 뒤에 호출한다)
+    def complete(self, stage, **info):
+        self.state['stages'][stage] = {**info, 'completed_at': datetime.utcnow().isoformat()}
+        self._write_state()
+
+    def finish(self, **result):
+        self.state.update(result=result, finished_at=datetime.utcnow().isoformat())
+        self._write_state()
+
+    def _write_state(self):
+        self._atomic_write(self.state_path, lambda f: f.write(json.dumps(self.state, ensure_ascii=False,
+                                                                          indent=2).encode('utf-8')))
+
+    def save_arrays(self, filename, **arrays):
+        self._atomic_write(self.path(filename), lambda f: np.savez(f, **arrays))
+
+    def load_arrays(self, filename):
+        with np.load(self.path(filename), allow_pickle=False) as data:
+            return {name: data[name] for name in data.files}
+
+    def save_json(self, filename, value):
+        self._atomic_write(self.path(filename),
+                           lambda f: f.write(json.dumps(value, ensure_ascii=False).encode('utf-8')))
+
+    def load_json(self, filename):
+        with open(self.path(filename), encoding='utf-8') as f:
+            return json.load(f)
+
+    def _atomic_write(self, path, write):
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,79 @@
+import json
+import zlib
+from datetime import date, datetime
+from enum import Enum
+
+from config import STREAM_CHUNK_BYTES
+
+try:
+    import orjson
+except ImportError:  # orjson 이 없으면 표준 json 으로 직렬화한다
+    orjson = None
+
+
+# 기본 직렬화가 안 되는 값 (Enum 은 값, 날짜는 ISO 문자열, numpy 스칼라는 Python 값)
+def _default(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+# 값 하나를 UTF-8 JSON bytes 로 직렬화한다
+def dumps(value):
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=_default).encode('utf-8')
+
+
+def _iter_joined(items, opening, separator, closing, chunk_bytes, terminator=b''):
+    buffer, size = [opening], len(opening)
+    first = True
+    try:
+        for item in items:
+            if not first:
+                buffer.append(separator)
+            first = False
+            encoded = dumps(item) + terminator
+            buffer.append(encoded)
+            size += len(encoded) + 1
+            if size >= chunk_bytes:
+                yield b''.join(buffer)
+                buffer, size = [], 0
+    finally:
+        # 전송 중 연결이 끊기면 원본 generator(DB 커서)도 닫는다
+        if hasattr(items, 'close'):
+            items.close()
+    buffer.append(closing)
+    yield b''.join(buffer)
+
+
+# 항목들을 JSON 배열로 직렬화하며 chunk_bytes 정도 크기의 bytes 를 차례로 생성한다.
+# head 를 주면 {...head, key: [...]} 객체로 감싼다. 전체 결과를 메모리에 올리지 않는다.
+def iter_json_array(items, head=None, key='items', chunk_bytes=STREAM_CHUNK_BYTES):
+    if head is None:
+        return _iter_joined(items, b'[', b',', b']', chunk_bytes)
+    opening = dumps(head)[:-1] + (b',' if head else b'') + dumps(key) + b':['
+    return _iter_joined(items, opening, b',', b']}', chunk_bytes)
+
+
+# 한 줄에 항목 하나 (NDJSON)
+def iter_ndjson(items, chunk_bytes=STREAM_CHUNK_BYTES):
+    return _iter_joined(items, b'', b'', b'', chunk_bytes, terminator=b'\n')
+
+
+# bytes chunk 들을 gzip 으로 압축한다. chunk 마다 sync flush 하므로 받는 쪽에서 바로 풀 수 있다.
+def gzip_chunks(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    try:
+        for chunk in chunks:
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+    yield compressor.flush()
@@ -0,0 +1,188 @@
+import json
+import os
+import struct
+from datetime import datetime
+
+import numpy as np
+
+from config import ARTIFACT_DIR
+from service.factor_model import FactorModel
+from service.id_encoder import customer_encoder, goods_encoder
+
+MODEL_FILE = os.path.join(ARTIFACT_DIR, 'recommend_model.bin')
+# 이전 형식 (np.savez). .bin 이 아직 없을 때만 읽는다
+LEGACY_MODEL_FILE = os.path.join(ARTIFACT_DIR, 'recommend_model.npz')
+
+MAGIC = b'RECMODL1'
+ALIGNMENT = 64
+_PREFIX = struct.Struct('<8sQ')
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+# 코드 목록 <-> 인덱스 조회용 배열 (인덱스 순 코드, 정렬된 코드, 정렬된 코드의 인덱스)
+def _id_arrays(name, codes):
+    encoded = np.array([code.encode('utf-8') for code in codes], dtype=bytes) if codes else np.empty(0, dtype='S1')
+    order = np.argsort(encoded, kind='stable').astype(np.int32)
+    return {
+        f'ids_{name}_codes': encoded,
+        f'ids_{name}_sorted': encoded[order],
+        f'ids_{name}_order': order,
+    }
+
+
+# 모델 파일에 저장된 IdEncoder 스냅샷. 메모리 맵 배열에서 이진 탐색하므로 worker 마다 dict 를 만들지 않는다.
+# 인코더는 append-only 이므로 저장 시점 이후 추가된 코드만 없다 (-1).
+class MappedIds:
+    def __init__(self, codes, sorted_codes, order):
+        self.codes = codes
+        self.sorted_codes = sorted_codes
+        self.order = order
+
+    def __len__(self):
+        return len(self.codes)
+
+    # 코드 하나를 인덱스로 변환 (없으면 -1). 스냅샷은 읽기 전용이므로 코드를 추가하지 않는다.
+    def encode_one(self, code, add=False):
+        key = code.encode('utf-8')
+        position = int(np.searchsorted(self.sorted_codes, key))
+        if position < len(self.sorted_codes) and self.sorted_codes[position] == key:
+            return int(self.order[position])
+        return -1
+
+    # 인덱스 배열을 코드 배열로 되돌린다
+    def decode(self, indices):
+        return np.array([code.decode('utf-8') for code in self.codes[np.asarray(indices, dtype=np.int64)]],
+                        dtype=object)
+
+
+# 학습된 FactorModel, 상품 통계 배열, 고객/상품 ID 맵을 하나의 평면 바이너리 파일로 저장한다.
+#   [MAGIC 8B][헤더 길이 8B][헤더 JSON][배열들 (각 64B 정렬)]
+# 헤더에는 배열별 (offset, dtype, shape)가 있으므로 읽는 쪽은 파일 전체를 numpy.memmap 으로 열고 view 만 만든다.
+# 임시 파일에 쓴 뒤 os.replace 로 교체하므로 읽는 쪽은 항상 완전한 파일만 보고,
+# 이미 열어 둔 이전 버전 매핑은 교체 후에도 그대로 유효하다.
+def save_model(factors, statis, path=MODEL_FILE):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    arrays = {name: np.ascontiguousarray(getattr(factors, name)) for name in FactorModel.ARRAYS}
+    arrays.update({f'statis_{name}': np.ascontiguousarray(values) for name, values in statis.items()})
+    arrays.update(_id_arrays('customer', customer_encoder().codes))
+    arrays.update(_id_arrays('goods', goods_encoder().codes))
+
+    layout, offset = {}, 0
+    for name, values in arrays.items():
+        layout[name] = {'offset': offset, 'dtype': values.dtype.str, 'shape': list(values.shape)}
+        offset = _align(offset + values.nbytes)
+    header = json.dumps({
+        'global_mean': factors.global_mean,
+        'rating_scale': list(factors.rating_scale),
+        'kind': factors.kind,
+        'meta': factors.meta,
+        'saved_at': datetime.utcnow().isoformat(),
+        'arrays': layout,
+    }, ensure_ascii=False).encode('utf-8')
+    data_start = _align(_PREFIX.size + len(header))
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREFIX.pack(MAGIC, len(header)))
+        f.write(header)
+        for name, values in arrays.items():
+            f.seek(data_start + layout[name]['offset'])
+            f.write(values.tobytes())
+        f.truncate(data_start + offset)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return path
+
+
+# 파일을 메모리 맵으로 연다.
+# mode='r' : 읽기 전용, 같은 호스트의 모든 프로세스가 page cache 를 공유한다 (서빙용)
+# mode='c' : copy-on-write, 배열을 수정해도 파일은 바뀌지 않는다 (fold-in 처럼 모델을 고쳐 다시 저장할 때)
+def open_model(path=MODEL_FILE, mode='r'):
+    with open(path, 'rb') as f:
+        magic, header_length = _PREFIX.unpack(f.read(_PREFIX.size))
+        if magic != MAGIC:
+            raise ValueError(f'{path} 는 모델 파일 형식이 아닙니다')
+        header = json.loads(f.read(header_length).decode('utf-8'))
+
+    data_start = _align(_PREFIX.size + header_length)
+    buffer = np.memmap(path, dtype=np.uint8, mode=mode)
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'], dtype=np.int64))
+        start = data_start + spec['offset']
+        arrays[name] = buffer[start:start + count * dtype.itemsize].view(dtype).reshape(spec['shape'])
+
+    ids = {name: MappedIds(arrays[f'ids_{name}_codes'], arrays[f'ids_{name}_sorted'], arrays[f'ids_{name}_order'])
+           for name in ('customer', 'goods') if f'ids_{name}_codes' in arrays}
+    factors = FactorModel(
+        header['global_mean'],
+        *(arrays[name] for name in FactorModel.ARRAYS[:4]),
+        rating_scale=header['rating_scale'],
+        kind=header['kind'],
+        trained_goods=arrays['trained_goods'],
+        trained_customers=arrays['trained_customers'],
+        meta=header['meta'],
+        ids=ids
+    )
+    statis = {name[len('statis_'):]: values for name, values in arrays.items() if name.startswith('statis_')}
+    return factors, statis
+
+
+def _load_legacy(path):
+    with np.load(path, allow_pickle=False) as data:
+        header = json.loads(str(data['header']))
+        factors = FactorModel(
+            header['global_mean'],
+            *(data[name] for name in FactorModel.ARRAYS[:4]),
+            rating_scale=header['rating_scale'],
+            kind=header['kind'],
+            trained_goods=data['trained_goods'],
+            trained_customers=data['trained_customers'],
+            meta=header['meta']
+        )
+        statis = {name[len('statis_'):]: data[name] for name in data.files if name.startswith('statis_')}
+    return factors, statis
+
+
+# 서비스 모델 파일이 아직 없으면 이전 형식(npz) 파일을 대신 읽는다. 다음 저장부터 새 형식으로 바뀐다.
+def _resolve(path):
+    if path == MODEL_FILE and not os.path.exists(path) and os.path.exists(LEGACY_MODEL_FILE):
+        return LEGACY_MODEL_FILE
+    return path
+
+
+def _open(path, mode):
+    if path.endswith('.npz'):
+        return _load_legacy(path)
+    return open_model(path, mode)
+
+
+# 저장된 모델을 수정 가능한 상태(copy-on-write)로 읽는다. 없으면 (None, None)
+def load_model(path=MODEL_FILE):
+    path = _resolve(path)
+    if not os.path.exists(path):
+        return None, None
+    return _open(path, 'c')
+
+
+_cache = {'key': None, 'model': (None, None)}
+
+
+# 프로세스 내 캐시 (읽기 전용 메모리 맵). 파일이 교체(inode, mtime 변경)되었을 때만 다시 연다.
+# 다시 여는 비용은 헤더 파싱뿐이고 배열 데이터는 접근할 때 page cache 에서 읽는다.
+def get_model(path=MODEL_FILE):
+    path = _resolve(path)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None, None
+    key = (path, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    if _cache['key'] != key:
+        _cache['model'] = _open(path, 'r')
+        _cache['key'] = key
+    return _cache['model']
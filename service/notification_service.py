@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+
+from model.enums import AnalysisKind
+from repository.notification_repository import NotificationRepository
+from config import NOTIFICATION
+
+# 발송 항목 필드명 (NOTIFICATION_TABLES 의 컬럼 순서)
+ITEM_FIELDS = {
+    AnalysisKind.PERSONALIZED: ('customerCode', 'goodsCode', 'score'),
+    AnalysisKind.ASSOCIATION: ('goodsCode', 'associatedGoodsCode', 'lift'),
+}
+
+
+# 추천 알림 발송 대상 배분.
+# claim 한 번에 대상 행을 잠그고 last_noti_sent_date 를 한 번의 UPDATE 로 기록하므로
+# 여러 발송 worker 가 동시에 호출해도 같은 추천을 cooldown 안에 두 번 가져가지 않는다.
+class NotificationService:
+    def __init__(self, batch_size=NOTIFICATION['batch_size'], cooldown_hours=NOTIFICATION['cooldown_hours']):
+        self.batch_size = batch_size
+        self.cooldown = timedelta(hours=cooldown_hours)
+        self.repository = NotificationRepository()
+
+    # 발송 대상 추천 batch 를 가져간다 (기본: 해당 종류의 최근 분석)
+    def claim(self, kind, analysis_id=None):
+        analysis_id = analysis_id or self.repository.latest_analysis_id(kind)
+        if analysis_id is None:
+            return {'analysisId': None, 'claimedAt': None, 'items': []}
+
+        # DATETIME 컬럼 정밀도(초)에 맞춰야 release 에서 같은 값으로 비교할 수 있다
+        now = datetime.utcnow().replace(microsecond=0)
+        rows = self.repository.claim(kind, analysis_id, now - self.cooldown, self.batch_size, now)
+        fields = ITEM_FIELDS[kind]
+        return {
+            'analysisId': analysis_id,
+            'claimedAt': now.isoformat(),
+            'items': [{'id': row[0], **dict(zip(fields, row[1:]))} for row in rows]
+        }
+
+    # 발송 실패한 항목을 다시 발송 대상으로 돌린다. 반환값: 돌려놓은 행 수
+    def release(self, kind, ids, claimed_at):
+        if not ids:
+            return 0
+        return self.repository.release(kind, ids, datetime.fromisoformat(claimed_at))
@@ -0,0 +1,210 @@
+import os
+import threading
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from scipy import sparse
+
+from config import ARTIFACT_DIR, ORDER_PARTITION_OPEN_DAYS
+from repository.apriori_repository import AprioriRepository
+from repository.order_repository import OrderRepository
+from service.id_encoder import goods_encoder
+
+PARTITION_DIR = os.path.join(ARTIFACT_DIR, 'order_partitions')
+
+
+# 하루 동안의 구매를 (고객, 일자) 장바구니 단위로 집계한다.
+# 장바구니 단위가 하루이므로 기간 집계는 일자별 값을 더하기만 하면 된다.
+#   items : 상품별 장바구니 수, pairs : 상품 쌍(상삼각)별 장바구니 수,
+#   top : 상위 카테고리별 (해당 카테고리 상품이 하나라도 있는) 장바구니 수
+def aggregate_day(customer_codes, goods_idx, top_of_goods, n_goods):
+    customers, rows = np.unique(np.asarray(customer_codes), return_inverse=True)
+    baskets = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.int32), (rows, goods_idx)),
+        shape=(len(customers), n_goods)
+    )
+    # 하루에 같은 상품을 여러 번 구매해도 한 번으로 센다
+    baskets.data[:] = 1
+
+    item_counts = baskets.getnnz(axis=0)
+    items = np.flatnonzero(item_counts)
+    pairs = sparse.triu(baskets.T @ baskets, k=1).tocoo()
+
+    top_codes, top_idx = np.unique(top_of_goods[goods_idx], return_inverse=True)
+    basket_tops = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.int32), (rows, top_idx)),
+        shape=(len(customers), len(top_codes))
+    )
+    return {
+        'item_idx': items.astype(np.int32),
+        'item_counts': item_counts[items].astype(np.int32),
+        'pair_rows': pairs.row.astype(np.int32),
+        'pair_cols': pairs.col.astype(np.int32),
+        'pair_counts': pairs.data.astype(np.int32),
+        'top_codes': top_codes.astype(str),
+        'top_counts': basket_tops.getnnz(axis=0).astype(np.int32),
+    }
+
+
+def empty_partition():
+    return {
+        'item_idx': np.empty(0, dtype=np.int32),
+        'item_counts': np.empty(0, dtype=np.int32),
+        'pair_rows': np.empty(0, dtype=np.int32),
+        'pair_cols': np.empty(0, dtype=np.int32),
+        'pair_counts': np.empty(0, dtype=np.int32),
+        'top_codes': np.empty(0, dtype=str),
+        'top_counts': np.empty(0, dtype=np.int32),
+    }
+
+
+# 일자별 구매 집계 파티션 (artifacts/order_partitions/YYYY-MM-DD.npz)
+# 주문일 + ORDER_PARTITION_OPEN_DAYS 가 지나기 전에 만든 파티션은 아직 열려 있는 것으로 보고 다시 만든다
+# (당일 추가 주문, 직후의 환불/취소 반영). 그 이후 파티션은 다시 집계하지 않는다.
+class OrderPartitionStore:
+    def __init__(self, directory=PARTITION_DIR):
+        self.directory = directory
+        self.order_repository = OrderRepository()
+        self.apriori_repository = AprioriRepository()
+
+    def path(self, day):
+        return os.path.join(self.directory, f'{day.isoformat()}.npz')
+
+    def built_at(self, day):
+        try:
+            return datetime.fromtimestamp(os.stat(self.path(day)).st_mtime)
+        except OSError:
+            return None
+
+    def is_final(self, day):
+        built_at = self.built_at(day)
+        return built_at is not None and built_at >= datetime.combine(day, datetime.min.time()) + \
+            timedelta(days=1 + ORDER_PARTITION_OPEN_DAYS)
+
+    def save(self, day, partition):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f'{self.path(day)}.tmp.npz'
+        np.savez(tmp_path, **partition)
+        os.replace(tmp_path, self.path(day))
+
+    def load(self, day):
+        with np.load(self.path(day), allow_pickle=False) as data:
+            return {name: data[name] for name in data.files}
+
+    # 주어진 일자들 중 파티션이 없거나 열려 있는 일자를 원본 주문에서 다시 집계한다.
+    # 연속 구간을 한 번의 스트리밍 조회로 읽는다. 반환값: 새로 만든 일자 목록
+    def refresh(self, days):
+        today = date.today()
+        stale = sorted(day for day in days if day <= today and not self.is_final(day))
+        if not stale:
+            return []
+
+        top_by_code = self.apriori_repository.goods_top_categories()
+        encoder = goods_encoder()
+        encoder.encode(list(top_by_code))
+        top_of_goods = np.full(len(encoder), '', dtype=object)
+        top_of_goods[encoder.encode(list(top_by_code), add=False)] = list(top_by_code.values())
+
+        wanted = set(stale)
+        collected = {day: ([], []) for day in stale}
+        start = datetime.combine(stale[0], datetime.min.time())
+        end = datetime.combine(stale[-1] + timedelta(days=1), datetime.min.time())
+        for partition in self.order_repository.stream_purchases_between(start, end):
+            for row in partition:
+                day = row.created_date.date()
+                if day in wanted:
+                    collected[day][0].append(row.customer_code)
+                    collected[day][1].append(row.goods_code)
+
+        for day in stale:
+            customer_codes, goods_codes = collected.pop(day)
+            if customer_codes:
+                goods_idx = encoder.encode(goods_codes)
+                if len(encoder) > len(top_of_goods):
+                    top_of_goods = np.concatenate([top_of_goods,
+                                                   np.full(len(encoder) - len(top_of_goods), '', dtype=object)])
+                partition = aggregate_day(customer_codes, goods_idx, top_of_goods, len(encoder))
+            else:
+                partition = empty_partition()
+            self.save(day, partition)
+        print(f"Order partitions rebuilt: {len(stale)} days ({stale[0]} ~ {stale[-1]})")
+        return stale
+
+
+# 기간 내 일자 파티션 합계. 기간이 바뀌면 빠지는 일자는 빼고 새로 들어오는 일자만 더한다.
+# 다시 만들어진(파일이 바뀐) 일자는 이전 값을 빼고 새 값을 더한다.
+class OrderWindow:
+    def __init__(self, store=None):
+        self.store = store or OrderPartitionStore()
+        self.days = {}
+        self.item_counts = np.zeros(0, dtype=np.int64)
+        self.pair_counts = sparse.csr_matrix((0, 0), dtype=np.int64)
+        self.top_counts = Counter()
+        self._lock = threading.Lock()
+
+    def _resize(self, n_goods):
+        if n_goods > len(self.item_counts):
+            self.item_counts = np.concatenate([self.item_counts,
+                                               np.zeros(n_goods - len(self.item_counts), dtype=np.int64)])
+            self.pair_counts.resize((n_goods, n_goods))
+
+    def _apply(self, partition, sign):
+        n_goods = max([len(self.item_counts)] + [int(partition[name].max()) + 1
+                                                 for name in ('item_idx', 'pair_rows', 'pair_cols')
+                                                 if len(partition[name])])
+        self._resize(n_goods)
+
+        self.item_counts[partition['item_idx']] += sign * partition['item_counts'].astype(np.int64)
+        upper = sparse.csr_matrix(
+            (sign * partition['pair_counts'].astype(np.int64), (partition['pair_rows'], partition['pair_cols'])),
+            shape=self.pair_counts.shape
+        )
+        self.pair_counts = self.pair_counts + upper + upper.T
+        self.pair_counts.eliminate_zeros()
+
+        for code, count in zip(partition['top_codes'], partition['top_counts']):
+            self.top_counts[str(code)] += sign * int(count)
+
+    # [start, end] 기간으로 이동한다. 반환값: (더한 일자 수, 뺀 일자 수). _lock 안에서 호출한다.
+    def _slide(self, start, end):
+        wanted = [start + timedelta(days=n) for n in range((end - start).days + 1)]
+        self.store.refresh(wanted)
+        removed = [day for day in self.days if not start <= day <= end]
+        for day in removed:
+            self._apply(self.days.pop(day)[1], -1)
+
+        added = 0
+        for day in wanted:
+            built_at = self.store.built_at(day)
+            if built_at is None:
+                continue
+            current = self.days.get(day)
+            if current and current[0] == built_at:
+                continue
+            if current:
+                self._apply(current[1], -1)
+            partition = self.store.load(day)
+            self._apply(partition, 1)
+            self.days[day] = (built_at, partition)
+            added += 1
+        return added, len(removed)
+
+    def slide(self, start, end):
+        with self._lock:
+            return self._slide(start, end)
+
+    # [start, end] 기간으로 이동한 뒤 집계 결과 사본을 반환한다.
+    # 이동과 조회를 한 번의 잠금 안에서 하므로 동시에 다른 기간을 요청해도 섞이지 않는다.
+    # 반환값: (더한 일자 수, 뺀 일자 수, 상품별 장바구니 수, 대상 상품과의 동시 구매 장바구니 수, 상위 카테고리 장바구니 수)
+    def counts_for_window(self, start, end, target_idx, top_category_code, n_goods):
+        with self._lock:
+            added, dropped = self._slide(start, end)
+            self._resize(n_goods)
+            item_counts = self.item_counts[:n_goods].copy()
+            co_occurrences = np.asarray(self.pair_counts[target_idx].todense()).ravel()[:n_goods]
+            return added, dropped, item_counts, co_occurrences, self.top_counts.get(top_category_code, 0)
+
+
+# 프로세스 내 공유 윈도우 (연속된 기간 조회는 경계 일자만 더하고 뺀다)
+order_window = OrderWindow()
@@ -0,0 +1,90 @@
+import hashlib
+
+from sqlalchemy import event
+
+from model.analysis import Analysis
+from model.enums import AnalysisKind
+from repository.recommendation_repository import RecommendationRepository
+from service.analysis_cache import LRUCache
+from config import READ_CACHE_SIZE
+
+# 조회 결과 캐시: (조회 종류, 인자, 데이터 버전) -> 결과
+read_cache = LRUCache(READ_CACHE_SIZE)
+
+
+# 이 프로세스에서 분석이 추가/삭제되면 캐시를 비운다.
+# 다른 worker 의 쓰기는 캐시 키의 데이터 버전(최대 PK)이 바뀌어 반영된다.
+@event.listens_for(Analysis, 'after_insert')
+@event.listens_for(Analysis, 'after_delete')
+def _invalidate_read_cache(mapper, connection, target):
+    read_cache.clear()
+
+
+# 저장된 추천 결과 조회 (keyset 페이지 + 캐시)
+class RecommendationReadService:
+    def __init__(self):
+        self.repository = RecommendationRepository()
+
+    def version(self):
+        return self.repository.version()
+
+    # 같은 요청 + 같은 데이터 버전이면 같은 ETag
+    def etag(self, version, *key):
+        return hashlib.sha1(repr((version,) + key).encode('utf-8')).hexdigest()
+
+    def _cached(self, key, version, loader):
+        cache_key = key + (version,)
+        result = read_cache.get(cache_key)
+        if result is None:
+            result = loader()
+            read_cache.put(cache_key, result)
+        return result
+
+    def latest_analyses(self, version, kind=None):
+        kinds = [kind] if kind else [member.name for member in AnalysisKind]
+
+        def load():
+            return {
+                (row.analysis_kind.name if isinstance(row.analysis_kind, AnalysisKind) else row.analysis_kind): {
+                    'analysisId': row.analysis_id,
+                    'analysisTitle': row.analysis_title,
+                    'analysisDescription': row.analysis_description,
+                    'createdDate': row.created_date.isoformat() if row.created_date else None
+                } for row in self.repository.latest_analyses(kinds)
+            }
+        return self._cached(('analyses', tuple(kinds)), version, load)
+
+    @staticmethod
+    def _page(analysis_id, rows, limit, to_item):
+        return {
+            'analysisId': analysis_id,
+            'items': [to_item(row) for row in rows[:limit]],
+            # 다음 페이지 cursor (마지막 항목의 PK). 없으면 None
+            'nextCursor': rows[limit - 1][0] if len(rows) > limit else None
+        }
+
+    def customer_recommendations(self, version, customer_code, analysis_id=None, after=0, limit=50):
+        def load():
+            target_id = analysis_id or self.repository.latest_analysis_id(AnalysisKind.PERSONALIZED)
+            if target_id is None:
+                return self._page(None, [], limit, None)
+            rows = self.repository.personalized_page(customer_code, target_id, after, limit)
+            return self._page(target_id, rows, limit, lambda row: {
+                'goodsCode': row.goods_code,
+                'score': row.recommendation_score
+            })
+        return self._cached(('customer', customer_code, analysis_id, after, limit), version, load)
+
+    def goods_associations(self, version, goods_code, analysis_id=None, after=0, limit=50):
+        def load():
+            target_id = analysis_id or self.repository.latest_association_analysis_id(goods_code)
+            if target_id is None:
+                return self._page(None, [], limit, None)
+            rows = self.repository.association_page(goods_code, target_id, after, limit)
+            return self._page(target_id, rows, limit, lambda row: {
+                'associatedGoodsCode': row.associated_goods_code,
+                'support': row.support,
+                'confidence': row.confidence,
+                'lift': row.lift
+            })
+        return self._cached(('goods', goods_code, analysis_id, after, limit), version, load)
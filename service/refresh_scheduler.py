@@ -0,0 +1,185 @@
+import heapq
+import json
+import threading
+from bisect import bisect_right
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from time import thread_time, time
+
+from repository.apriori_repository import AprioriRepository
+from repository.order_repository import OrderRepository
+from repository.recommendation_repository import RecommendationRepository
+from service.apriori_service import RecommendationService, analysis_flight_key
+from service.single_flight import analysis_flight
+from config import REFRESH_SCHEDULER
+
+
+def _minute(value):
+    return value.replace(second=0, microsecond=0)
+
+
+# 상위 카테고리별 분 단위 주문 수.
+# 처음에는 lookback 기간의 주문을 읽고, 이후에는 마지막으로 본 주문 ID 이후의 주문만 읽어 더한다.
+class OrderChangeTracker:
+    def __init__(self):
+        self.order_repository = OrderRepository()
+        self.buckets = defaultdict(Counter)
+        self.cursor = None
+        self._suffix = {}
+
+    def update(self, since, top_of_goods):
+        if self.cursor is None:
+            self.cursor = self.order_repository.max_order_id()
+            partitions = self.order_repository.stream_order_times(until_order_id=self.cursor, since=since)
+        else:
+            partitions = self.order_repository.stream_order_times(after_order_id=self.cursor)
+
+        for partition in partitions:
+            for order_id, goods_code, created_date in partition:
+                top_category_code = top_of_goods.get(goods_code)
+                if top_category_code is not None:
+                    self.buckets[top_category_code][_minute(created_date)] += 1
+                self.cursor = max(self.cursor, order_id)
+
+        # 더 이상 필요 없는 오래된 구간을 버리고 카테고리별 누적 합(뒤에서부터)을 다시 만든다
+        self._suffix = {}
+        for top_category_code, counter in self.buckets.items():
+            for minute in [minute for minute in counter if minute < _minute(since)]:
+                del counter[minute]
+            minutes = sorted(counter)
+            totals = [0] * (len(minutes) + 1)
+            for position in range(len(minutes) - 1, -1, -1):
+                totals[position] = totals[position + 1] + counter[minutes[position]]
+            self._suffix[top_category_code] = (minutes, totals)
+
+    # 상위 카테고리의 after 이후 주문 수 (after 가 속한 분은 제외: 분석 직후 주문으로 바로 다시 분석하지 않는다)
+    def count_since(self, top_category_code, after):
+        minutes, totals = self._suffix.get(top_category_code, ([], [0]))
+        return totals[bisect_right(minutes, _minute(after))]
+
+
+# 다시 분석할 조건 (분석 행에 기록된 조건). 기록이 없거나 고정 기간이면 None (새 주문이 결과를 바꾸지 않는다)
+def refresh_params(analysis):
+    if not analysis.analysis_params:
+        return None
+    params = json.loads(analysis.analysis_params)
+    return None if params.get('end_date') else params
+
+
+# 상품별 연관 분석 자동 갱신.
+# 각 상품의 마지막 연관 분석 이후 같은 상위 카테고리에 들어온 주문 수를 우선순위로 힙에 넣고,
+# 주문이 많이 바뀐 상품부터 interval 마다 cpu_budget_seconds (이 스레드의 CPU 시간) 안에서 다시 분석한다.
+# 같은 상품은 힙에 한 번만 들어가고, HTTP 요청과 같은 single-flight 키로 실행하므로 진행 중인 분석과 합쳐진다.
+# 마지막 분석과 같은 조건(기준값, 이동 기간)으로 다시 분석한다. 조건이 기록되지 않았거나 기간이 고정된 분석은 건너뛴다.
+class RefreshScheduler:
+    def __init__(self, run=None, busy_errors=(), interval_seconds=REFRESH_SCHEDULER['interval_seconds'],
+                 cpu_budget_seconds=REFRESH_SCHEDULER['cpu_budget_seconds'],
+                 min_new_orders=REFRESH_SCHEDULER['min_new_orders'],
+                 lookback_days=REFRESH_SCHEDULER['lookback_days']):
+        # run(fn, *args) : 분석 실행 (기본: 바로 호출). busy_errors : 서버가 바쁠 때 run 이 던지는 예외
+        self.run = run or (lambda fn, *args: fn(*args))
+        self.busy_errors = busy_errors
+        self.interval_seconds = interval_seconds
+        self.cpu_budget_seconds = cpu_budget_seconds
+        self.min_new_orders = min_new_orders
+        self.lookback = timedelta(days=lookback_days)
+        self.tracker = OrderChangeTracker()
+        self.repository = RecommendationRepository()
+        # 결과 없이 끝난 분석은 분석 행이 남지 않으므로 시도 시각을 따로 기억한다
+        self.attempted_at = {}
+        self._stats = {'ticks': 0, 'refreshed': 0, 'failed': 0, 'lastTickAt': None, 'lastCpuSeconds': 0.0,
+                       'lastQueued': 0, 'top': []}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # 갱신 대상 힙 [(-신규 주문 수, 상품 코드, 마지막 분석)]
+    def build_queue(self):
+        top_of_goods = AprioriRepository().goods_top_categories()
+        analyses = self.repository.last_association_analyses()
+        now = datetime.utcnow()
+        if analyses:
+            oldest = min(analysis.created_date for analysis in analyses)
+            self.tracker.update(max(oldest, now - self.lookback), top_of_goods)
+
+        queue = []
+        for analysis in analyses:
+            if refresh_params(analysis) is None:
+                continue
+            after = max(analysis.created_date, self.attempted_at.get(analysis.goods_code, analysis.created_date))
+            new_orders = self.tracker.count_since(top_of_goods.get(analysis.goods_code), after)
+            if new_orders >= self.min_new_orders:
+                queue.append((-new_orders, analysis.goods_code, analysis))
+        heapq.heapify(queue)
+        return queue
+
+    def refresh(self, analysis):
+        service = RecommendationService()
+        kind = analysis.analysis_kind.name
+        params = refresh_params(analysis)
+        return analysis_flight.do(
+            analysis_flight_key(analysis.goods_code, kind, analysis.analysis_title, params),
+            lambda: self.run(service.recommend_with_cache, analysis.goods_code, kind, analysis.analysis_title,
+                             analysis.analysis_description, params),
+            lambda after_analysis_id: service.find_recent_analysis(analysis.goods_code, kind,
+                                                                   analysis.analysis_title, after_analysis_id, params)
+        )
+
+    # 한 번의 갱신 주기. 반환값: 다시 분석한 상품 수
+    def tick(self):
+        cpu_start = thread_time()
+        queue = self.build_queue()
+        queued = len(queue)
+        top = [{'goodsCode': goods_code, 'newOrders': -priority} for priority, goods_code, _ in heapq.nsmallest(10, queue)]
+        refreshed = failed = 0
+        # 대기열 계산에 예산을 다 써도 가장 많이 바뀐 상품 하나는 분석한다
+        while queue and (refreshed + failed == 0 or thread_time() - cpu_start < self.cpu_budget_seconds):
+            priority, goods_code, analysis = heapq.heappop(queue)
+            self.attempted_at[goods_code] = datetime.utcnow()
+            try:
+                self.refresh(analysis)
+                refreshed += 1
+                print(f"[refresh] {goods_code}: 신규 주문 {-priority}건 반영")
+            except self.busy_errors:
+                print("[refresh] 서버가 바빠 이번 주기를 중단합니다")
+                self.attempted_at.pop(goods_code, None)
+                break
+            except Exception as e:
+                failed += 1
+                print(f"[refresh] {goods_code} 분석 실패: {e}")
+
+        with self._lock:
+            self._stats['ticks'] += 1
+            self._stats['refreshed'] += refreshed
+            self._stats['failed'] += failed
+            self._stats.update(lastTickAt=datetime.utcnow().isoformat(), lastCpuSeconds=thread_time() - cpu_start,
+                               lastQueued=queued, top=top)
+        return refreshed
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, 'running': self._thread is not None and self._thread.is_alive(),
+                    'intervalSeconds': self.interval_seconds, 'cpuBudgetSeconds': self.cpu_budget_seconds,
+                    'minNewOrders': self.min_new_orders}
+
+    # 백그라운드 스레드에서 interval 마다 tick 을 실행한다
+    def start(self, app):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.wait(self.interval_seconds):
+                start_time = time()
+                with app.app_context():
+                    try:
+                        refreshed = self.tick()
+                        print(f"[refresh] {refreshed}개 상품 갱신: {time() - start_time:.2f}초 소요")
+                    except Exception as e:
+                        print(f"[refresh] 갱신 주기 오류: {e}")
+
+        self._thread = threading.Thread(target=loop, name='apriori-refresh', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
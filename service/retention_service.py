@@ -0,0 +1,65 @@
+from time import sleep, time
+
+from repository.analysis_repository import AnalysisRepository, CHILD_TABLES
+from service.recommendation_read_service import read_cache
+from config import RETENTION
+
+
+# 오래된 분석 정리 작업.
+# 분석 종류별로 최근 keep 개 (연관 분석은 상품별 최근 keep 개)만 남기고, 나머지 분석의 추천 행을 analysis_id 인덱스로 batch_size 개씩 지운다.
+# batch 마다 커밋하고 pause_seconds 쉬므로 긴 잠금이나 큰 undo 로그 없이 테이블 크기를 일정하게 유지한다.
+class RetentionService:
+    def __init__(self, keep=None, batch_size=RETENTION['batch_size'], pause_seconds=RETENTION['pause_seconds']):
+        self.keep = {**RETENTION['keep'], **(keep or {})}
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+        self.repository = AnalysisRepository()
+
+    # 삭제 대상 분석 ID {종류: [analysis_id, ...]}
+    def plan(self):
+        protected = {self.repository.latest_rule_analysis_id()}
+        return {
+            kind: [analysis_id for analysis_id in self.expired_analysis_ids(kind, keep)
+                   if analysis_id not in protected]
+            for kind, keep in self.keep.items()
+        }
+
+    # 연관 분석은 상품마다 따로 만들어지므로 전체가 아니라 상품별로 최근 분석을 남긴다
+    # (요청이 적은 상품의 마지막 분석이 지워지면 상품 추천 조회와 자동 갱신 대상에서 빠진다)
+    def expired_analysis_ids(self, kind, keep):
+        if kind == 'ASSOCIATION':
+            return self.repository.expired_association_analysis_ids(keep)
+        return self.repository.expired_analysis_ids(kind, keep)
+
+    # 한 분석의 하위 행을 batch 단위로 지운 뒤 분석 행을 지운다. 반환값: 삭제한 하위 행 수
+    def purge_analysis(self, analysis_id):
+        deleted = 0
+        for model, pk_column in CHILD_TABLES:
+            while True:
+                count = self.repository.delete_child_batch(model, pk_column, analysis_id, self.batch_size)
+                deleted += count
+                if count < self.batch_size:
+                    break
+                sleep(self.pause_seconds)
+        self.repository.delete_analysis_row(analysis_id)
+        return deleted
+
+    def run(self, dry_run=False):
+        start_time = time()
+        plan = self.plan()
+        result = {'analyses': 0, 'rows': 0, 'plan': {kind: len(ids) for kind, ids in plan.items()}}
+        for kind, analysis_ids in plan.items():
+            print(f"[retention] {kind}: {'상품별 ' if kind == 'ASSOCIATION' else ''}최근 {self.keep[kind]}개 보관, {len(analysis_ids)}개 삭제 대상")
+            if dry_run:
+                continue
+            for analysis_id in analysis_ids:
+                rows = self.purge_analysis(analysis_id)
+                result['analyses'] += 1
+                result['rows'] += rows
+                print(f"[retention] analysis_id {analysis_id} 삭제 (추천 행 {rows}건)")
+                sleep(self.pause_seconds)
+
+        if result['analyses']:
+            read_cache.clear()
+        result['elapsed'] = time() - start_time
+        return result
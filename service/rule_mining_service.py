@@ -0,0 +1,177 @@
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from mlxtend.frequent_patterns import fpgrowth, association_rules
+
+from model.analysis import AssociationRule, Goods
+from repository.apriori_repository import AprioriRepository
+from repository.order_repository import OrderRepository
+from service.apriori_service import RecommendationService
+from service.id_encoder import customer_encoder, goods_encoder
+from config import RULE_MINING_PARAMS
+
+ANTECEDENT_SEPARATOR = ','
+
+# antecedent_key 컬럼에 들어가는 최대 규칙 길이. 조건 상품 (max_len - 1)개의 코드와 구분자가 컬럼 길이를 넘으면 안 된다.
+_KEY_ITEM_LENGTH = Goods.goods_code.type.length + len(ANTECEDENT_SEPARATOR)
+MAX_RULE_LEN = (AssociationRule.antecedent_key.type.length + len(ANTECEDENT_SEPARATOR)) // _KEY_ITEM_LENGTH + 1
+
+ANALYSIS_TITLE = 'Catalog Association Rule Mining'
+ANALYSIS_DESCRIPTION = 'FP-Growth multi-item association rules over all customer baskets.'
+
+
+# 조건 상품 코드 집합 -> 규칙 조회 키 (정렬 후 연결)
+def antecedent_key(goods_codes):
+    return ANTECEDENT_SEPARATOR.join(sorted(goods_codes))
+
+
+# 전체 카탈로그 고객 장바구니에 대한 FP-Growth 연관 규칙 마이닝
+# "A, B 를 구매한 고객 -> C 추천" 처럼 조건 상품이 여러 개인 규칙을 만든다.
+class RuleMiningService:
+    def __init__(self, params=None):
+        self.params = {**RULE_MINING_PARAMS, **(params or {})}
+        if not 2 <= self.params['max_len'] <= MAX_RULE_LEN:
+            raise ValueError(f"max_len must be between 2 and {MAX_RULE_LEN}.")
+        self.order_repository = OrderRepository()
+        self.apriori_repository = AprioriRepository()
+
+    # 순 구매 수량이 양수인 (고객, 상품)을 chunk 단위로 인코딩해 고객 x 상품 구매 여부 희소 행렬을 만든다.
+    # 문자열 코드 목록을 한꺼번에 메모리에 올리지 않는다.
+    def load_baskets(self, chunk_size=10000):
+        customer_parts, goods_parts = [], []
+        for partition in self.order_repository.stream_net_purchase_counts(chunk_size):
+            purchased = [row for row in partition if row.net_count > 0]
+            if not purchased:
+                continue
+            customer_parts.append(customer_encoder().encode([row.customer_code for row in purchased]))
+            goods_parts.append(goods_encoder().encode([row.goods_code for row in purchased]))
+
+        if not customer_parts:
+            return np.empty(0, dtype=np.int32), sparse.csr_matrix((0, len(goods_encoder())), dtype=np.int8)
+
+        customers, rows = np.unique(np.concatenate(customer_parts), return_inverse=True)
+        goods_idx = np.concatenate(goods_parts)
+        baskets = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int8), (rows, goods_idx)),
+            shape=(len(customers), len(goods_encoder()))
+        )
+        return customers, baskets
+
+    # FP-Growth 로 빈발 항목 집합을 구하고 추천 상품이 1개인 규칙만 남긴다.
+    # 반환값: (antecedents, consequents, support, confidence, lift) 열을 가진 DataFrame (상품 인덱스 기준)
+    def mine(self, baskets):
+        n_baskets = baskets.shape[0]
+        min_support = self.params['min_support']
+        min_count = max(1, int(np.ceil(min_support * n_baskets)))
+
+        # 최소 지지도 미만 상품은 어떤 빈발 집합에도 들어갈 수 없으므로 열을 먼저 제거하고,
+        # 남은 상품이 하나도 없는 장바구니도 제거한다.
+        item_counts = baskets.getnnz(axis=0)
+        kept_goods = np.flatnonzero(item_counts >= min_count)
+        pruned = baskets[:, kept_goods]
+        pruned = pruned[pruned.getnnz(axis=1) > 0]
+        n_kept = pruned.shape[0]
+        print(f"장바구니 {n_baskets}개 중 {n_kept}개, 상품 {baskets.shape[1]}개 중 {len(kept_goods)}개 사용 "
+              f"(최소 고객 수 {min_count})")
+
+        if n_kept == 0 or len(kept_goods) < 2:
+            return pd.DataFrame(columns=['antecedents', 'consequents', 'support', 'confidence', 'lift'])
+
+        # 희소 bool DataFrame (열 = 상품 인덱스). 밀집 행렬로 펼치지 않는다.
+        frame = pd.DataFrame.sparse.from_spmatrix(pruned.tocsc(), columns=kept_goods) \
+            .astype(pd.SparseDtype(bool, False))
+        # 제거한 장바구니 수만큼 지지도 기준을 보정한다 (0.5 는 ceil 계산의 부동소수 오차 방지)
+        itemsets = fpgrowth(frame, min_support=(min_count - 0.5) / n_kept, use_colnames=True,
+                            max_len=self.params['max_len'])
+        # 지지도를 전체 장바구니 기준으로 되돌려야 lift 가 올바르다
+        itemsets['support'] *= n_kept / n_baskets
+        print(f"빈발 항목 집합 {len(itemsets)}개")
+
+        if not (itemsets['itemsets'].map(len) > 1).any():
+            return pd.DataFrame(columns=['antecedents', 'consequents', 'support', 'confidence', 'lift'])
+
+        rules = association_rules(itemsets, num_itemsets=n_baskets, metric='confidence',
+                                  min_threshold=self.params['min_confidence'],
+                                  return_metrics=['support', 'confidence', 'lift'])
+        rules = rules[(rules['lift'] >= self.params['min_lift']) & (rules['consequents'].map(len) == 1)]
+        return rules[['antecedents', 'consequents', 'support', 'confidence', 'lift']].reset_index(drop=True)
+
+    # 규칙 DataFrame 을 저장용 dict 로 변환한다 (상품 인덱스 -> 상품 코드)
+    def to_rows(self, rules, analysis_id):
+        encoder = goods_encoder()
+        for antecedents, consequents, support, confidence, lift in rules.itertuples(index=False):
+            antecedent_codes = encoder.decode(np.fromiter(antecedents, dtype=np.int64))
+            yield {
+                'analysis_id': analysis_id,
+                'antecedent_key': antecedent_key(antecedent_codes),
+                'antecedent_size': len(antecedent_codes),
+                'consequent_goods_code': encoder.decode([next(iter(consequents))])[0],
+                'support': float(support),
+                'confidence': float(confidence),
+                'lift': float(lift),
+            }
+
+    # 규칙 마이닝 실행 후 분석 ID 와 규칙 수를 반환한다
+    def run(self, analysis_title=ANALYSIS_TITLE, analysis_description=ANALYSIS_DESCRIPTION):
+        print("\nStep 1: Loading customer baskets")
+        customers, baskets = self.load_baskets()
+        print(f"Total baskets: {len(customers)}, nonzeros: {baskets.nnz}")
+
+        print("\nStep 2: Mining frequent itemsets (FP-Growth)")
+        rules = self.mine(baskets)
+        print(f"Rules found: {len(rules)}")
+        if rules.empty:
+            return None, 0
+
+        print("\nStep 3: Saving rules")
+        analysis_service = RecommendationService()
+        analysis_id = analysis_service.create_analysis('ASSOCIATION', analysis_title, analysis_description)
+        if analysis_id is None:
+            return None, 0
+
+        try:
+            self.apriori_repository.ensure_rule_table()
+            self.apriori_repository.save_rules(self.to_rows(rules, analysis_id))
+        except Exception as e:
+            print(f"Error saving rules: {str(e)}")
+            self.apriori_repository.db.session.rollback()
+            analysis_service.delete_analysis(analysis_id)
+            raise
+
+        print(f"Successfully saved {len(rules)} rules (analysis_id: {analysis_id})")
+        return analysis_id, len(rules)
+
+    # 구매한 상품 목록으로 추천 상품 조회.
+    # 구매 상품의 부분 집합(조건 상품 최대 max_len - 1 개)마다 키를 만들어 인덱스로 조회하고,
+    # 같은 추천 상품은 조건 상품 수가 많은 규칙 -> lift -> confidence 순으로 가장 좋은 규칙만 남긴다.
+    def lookup(self, goods_codes, n=10, analysis_id=None):
+        goods_codes = sorted(set(goods_codes))
+        analysis_id = analysis_id or self.apriori_repository.latest_rule_analysis_id()
+        if analysis_id is None or not goods_codes:
+            return analysis_id, []
+
+        max_antecedent = self.params['max_len'] - 1
+        keys = [antecedent_key(subset)
+                for size in range(1, min(max_antecedent, len(goods_codes)) + 1)
+                for subset in combinations(goods_codes, size)]
+
+        best = {}
+        owned = set(goods_codes)
+        for rule in self.apriori_repository.find_rules(analysis_id, keys):
+            if rule.consequent_goods_code in owned:
+                continue
+            rank = (rule.antecedent_size, rule.lift, rule.confidence)
+            current = best.get(rule.consequent_goods_code)
+            if current is None or rank > current[0]:
+                best[rule.consequent_goods_code] = (rank, rule)
+
+        ranked = sorted(best.values(), key=lambda item: item[0], reverse=True)[:n]
+        return analysis_id, [{
+            'goodsCodes': rule.antecedent_key.split(ANTECEDENT_SEPARATOR),
+            'associatedGoodsCode': rule.consequent_goods_code,
+            'support': rule.support,
+            'confidence': rule.confidence,
+            'lift': rule.lift
+        } for _, rule in ranked]
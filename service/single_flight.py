@@ -0,0 +1,87 @@
+import hashlib
+import threading
+
+from sqlalchemy import select, func, text
+
+from config import SINGLE_FLIGHT_BACKEND, SINGLE_FLIGHT_LOCK_TIMEOUT
+from model.analysis import Analysis
+from model.db import db
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+# 같은 키의 동시 요청을 하나의 실행으로 합친다 (single-flight).
+# 먼저 들어온 요청(leader)만 fn 을 실행하고, 실행 중에 들어온 같은 키의 요청은 기다렸다가 같은 결과를 받는다.
+# backend='mysql' 이면 leader 가 DB 이름 잠금(GET_LOCK)도 잡아 여러 gunicorn worker 사이에서도 합친다.
+# 다른 worker 의 실행을 기다린 경우에는 그동안 생성된 분석을 recheck(이전 최대 analysis_id)로 찾아 돌려준다.
+class SingleFlight:
+    def __init__(self, backend=SINGLE_FLIGHT_BACKEND, lock_timeout=SINGLE_FLIGHT_LOCK_TIMEOUT):
+        self.backend = backend
+        self.lock_timeout = lock_timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    # 반환값: (결과, 다른 요청의 결과를 공유받았는지 여부)
+    def do(self, key, fn, recheck=None):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            print(f"Waiting for in-flight request: {key}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result[0], True
+
+        try:
+            call.result = self._run(key, fn, recheck)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _run(self, key, fn, recheck):
+        if self.backend != 'mysql':
+            return fn(), False
+        return self._run_with_db_lock(key, fn, recheck)
+
+    # 잠금 연결은 세션과 별도로 실행이 끝날 때까지 유지한다 (이름 잠금은 연결 단위)
+    def _run_with_db_lock(self, key, fn, recheck):
+        name = 'single_flight:' + hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        with db.engine.connect() as connection:
+            acquired = connection.execute(text('SELECT GET_LOCK(:name, 0)'), {'name': name}).scalar() == 1
+            waited_after = None
+            if not acquired:
+                waited_after = db.session.execute(select(func.max(Analysis.analysis_id))).scalar() or 0
+                db.session.commit()
+                print(f"Waiting for another worker: {key}")
+                acquired = connection.execute(text('SELECT GET_LOCK(:name, :timeout)'),
+                                              {'name': name, 'timeout': self.lock_timeout}).scalar() == 1
+            try:
+                if waited_after is not None and acquired and recheck is not None:
+                    result = recheck(waited_after)
+                    if result is not None:
+                        return result, True
+                if not acquired:
+                    print(f"Lock wait timed out after {self.lock_timeout}s, running without coalescing: {key}")
+                return fn(), False
+            finally:
+                if acquired:
+                    connection.execute(text('SELECT RELEASE_LOCK(:name)'), {'name': name})
+
+
+# 분석 요청 공용 인스턴스
+analysis_flight = SingleFlight()
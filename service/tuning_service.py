@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+from time import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.model_selection import KFold, ParameterGrid, ParameterSampler
+from surprise import Dataset, Reader, SVD
+
+from config import ARTIFACT_DIR, SVD_DEFAULT_PARAMS, SVD_PARAM_GRID
+
+BEST_PARAMS_FILE = 'svd_best_params.json'
+
+
+# 저장된 최적 파라미터를 읽는다. 튜닝 결과가 없으면 기본값을 사용한다.
+def load_best_params():
+    path = os.path.join(ARTIFACT_DIR, BEST_PARAMS_FILE)
+    try:
+        with open(path, encoding='utf-8') as f:
+            return {**SVD_DEFAULT_PARAMS, **json.load(f)['params']}
+    except (OSError, ValueError, KeyError):
+        return dict(SVD_DEFAULT_PARAMS)
+
+
+# 하나의 (파라미터, fold) 조합을 학습/평가한다. joblib 워커에서 실행된다.
+def _evaluate_fold(params, ratings_df, train_idx, test_idx, random_state):
+    reader = Reader(rating_scale=(1, 5))
+    trainset = Dataset.load_from_df(ratings_df.iloc[train_idx], reader).build_full_trainset()
+
+    model = SVD(random_state=random_state, **params)
+    model.fit(trainset)
+
+    testset = ratings_df.iloc[test_idx].itertuples(index=False, name=None)
+    errors = np.array([model.predict(uid, iid).est - r_ui for uid, iid, r_ui in testset])
+    return float(np.sqrt(np.mean(errors ** 2))), float(np.mean(np.abs(errors)))
+
+
+class SVDTuningService:
+    def __init__(self, n_splits=5, random_state=42):
+        self.n_splits = n_splits
+        self.random_state = random_state
+
+    # SVD 학습에 필요한 (고객, 상품, 평점) 데이터 조회
+    def load_ratings(self):
+        from service.collaboFilter_service import CollaboFilterService
+
+        service = CollaboFilterService()
+        return service.to_ratings_df(service.load_training_arrays())
+
+    # fold 분할은 데이터가 바뀌지 않는 한 디스크에 캐시해 재사용한다.
+    def get_folds(self, ratings_df):
+        digest = hashlib.sha1(pd.util.hash_pandas_object(ratings_df, index=False).values.tobytes())
+        digest.update(f'{self.n_splits}:{self.random_state}'.encode())
+        path = os.path.join(ARTIFACT_DIR, 'cv_folds', f'{digest.hexdigest()}.joblib')
+
+        if os.path.exists(path):
+            return joblib.load(path)
+
+        kfold = KFold(n_splits=self.n_splits, shuffle=True, random_state=self.random_state)
+        folds = [(train_idx.astype(np.int32), test_idx.astype(np.int32))
+                 for train_idx, test_idx in kfold.split(ratings_df)]
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        joblib.dump(folds, path)
+        return folds
+
+    # 탐색할 파라미터 후보 생성 (grid: 전체 조합, random: n_iter개 무작위 추출)
+    def build_candidates(self, search='grid', n_iter=10, param_grid=None):
+        param_grid = param_grid or SVD_PARAM_GRID
+        if search == 'random':
+            return list(ParameterSampler(param_grid, n_iter=n_iter, random_state=self.random_state))
+        return list(ParameterGrid(param_grid))
+
+    # 후보 x fold 조합을 코어 수만큼 병렬로 교차검증한다.
+    def search(self, ratings_df, search='grid', n_iter=10, n_jobs=-1, param_grid=None):
+        candidates = self.build_candidates(search, n_iter, param_grid)
+        folds = self.get_folds(ratings_df)
+
+        start_time = time()
+        scores = Parallel(n_jobs=n_jobs)(
+            delayed(_evaluate_fold)(params, ratings_df, train_idx, test_idx, self.random_state)
+            for params in candidates
+            for train_idx, test_idx in folds
+        )
+        elapsed = time() - start_time
+
+        results = []
+        for i, params in enumerate(candidates):
+            fold_scores = np.array(scores[i * len(folds):(i + 1) * len(folds)])
+            results.append({
+                'params': params,
+                'rmse': float(fold_scores[:, 0].mean()),
+                'rmse_std': float(fold_scores[:, 0].std()),
+                'mae': float(fold_scores[:, 1].mean()),
+            })
+        results.sort(key=lambda x: x['rmse'])
+
+        return {
+            'best': results[0],
+            'results': results,
+            'n_candidates': len(candidates),
+            'n_splits': len(folds),
+            'n_jobs': n_jobs,
+            'elapsed': elapsed,
+        }
+
+    # train_model 에서 사용할 수 있도록 최적 파라미터 저장
+    def save_best_params(self, best, n_ratings):
+        os.makedirs(ARTIFACT_DIR, exist_ok=True)
+        path = os.path.join(ARTIFACT_DIR, BEST_PARAMS_FILE)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'params': best['params'],
+                'rmse': best['rmse'],
+                'mae': best['mae'],
+                'n_ratings': n_ratings,
+                'tuned_at': datetime.utcnow().isoformat(),
+            }, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        return path
+
+    # 워커 수에 따른 실행 시간 측정 (첫 번째 워커 수 대비 속도 향상률)
+    def measure_scaling(self, ratings_df, worker_counts=(1, 2, 4), **search_kwargs):
+        report = []
+        for n_jobs in worker_counts:
+            elapsed = self.search(ratings_df, n_jobs=n_jobs, **search_kwargs)['elapsed']
+            report.append({'n_jobs': n_jobs, 'elapsed': elapsed})
+
+        baseline = report[0]['elapsed']
+        for row in report:
+            # 측정 시간이 0 이면 (타이머 해상도 미만) 속도 향상률을 계산하지 않는다
+            row['speedup'] = baseline / row['elapsed'] if baseline > 0 and row['elapsed'] > 0 else None
+        return report
+
+    # 튜닝 실행: 데이터 로드 -> 교차검증 탐색 -> 최적 파라미터 저장
+    def run(self, search='grid', n_iter=10, n_jobs=-1, worker_counts=None):
+        ratings_df = self.load_ratings()
+        print(f"튜닝 데이터: {len(ratings_df)}건, {self.n_splits}-fold 교차검증, 탐색 방식: {search}")
+
+        result = self.search(ratings_df, search=search, n_iter=n_iter, n_jobs=n_jobs)
+        best = result['best']
+        print(f"후보 {result['n_candidates']}개 탐색 완료: {result['elapsed']:.2f}초 소요")
+        print(f"최적 파라미터: {best['params']} (RMSE {best['rmse']:.4f}, MAE {best['mae']:.4f})")
+
+        result['saved_to'] = self.save_best_params(best, len(ratings_df))
+
+        if worker_counts:
+            result['scaling'] = self.measure_scaling(ratings_df, worker_counts, search=search, n_iter=n_iter)
+            for row in result['scaling']:
+                speedup = f"x{row['speedup']:.2f}" if row['speedup'] is not None else '측정 불가'
+                print(f"워커 {row['n_jobs']}개: {row['elapsed']:.2f}초 ({speedup})")
+
+        return result
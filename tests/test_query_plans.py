@@ -0,0 +1,67 @@
+import pytest
+from flask import Flask
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateTable
+
+from model.db import db, init_app
+from model.analysis import AssociationRule
+from migration.runner import upgrade, check_plans, pending_migrations
+from migration.versions import MIGRATIONS
+
+# 상품 테이블이 참조하는 brand 테이블은 모델에 없으므로 FK 대상 컬럼만 선언한다
+if 'brand' not in db.metadata.tables:
+    db.Table('brand', db.Column('brand_code', db.String(20), primary_key=True))
+
+
+# 로컬 대체 DB (임시 sqlite 파일)
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'plans.db'}")
+    app = Flask(__name__)
+    init_app(app)
+    with app.app_context():
+        yield app
+        db.engine.dispose()
+
+
+# 마이그레이션 이전부터 있던 테이블을 인덱스 없이 만든다 (인덱스와 association_rule 은 마이그레이션이 만든다)
+def create_base_tables():
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if table is not AssociationRule.__table__:
+                connection.execute(CreateTable(table))
+
+
+def test_migrations_create_indexes_for_hot_queries(app):
+    create_base_tables()
+    upgrade()
+    assert pending_migrations() == []
+
+    missing = [(name, plan) for name, status, plan in check_plans() if status == 'missing']
+    assert missing == []
+
+
+# 테이블별 (컬럼, 인덱스) 목록
+def schema_snapshot():
+    inspector = inspect(db.engine)
+    return {
+        table: (sorted(column['name'] for column in inspector.get_columns(table)),
+                sorted((index['name'], tuple(index['column_names'])) for index in inspector.get_indexes(table)))
+        for table in inspector.get_table_names()
+    }
+
+
+def test_upgrade_is_idempotent(app):
+    create_base_tables()
+    assert len(upgrade()) == len(MIGRATIONS)
+    migrated = schema_snapshot()
+
+    # 두 번째 실행은 적용할 것이 없다
+    assert upgrade() == []
+    assert pending_migrations() == []
+
+    # 기록이 빠져 마이그레이션을 다시 적용해도 오류 없이 같은 스키마가 된다
+    for _, _, migrate in MIGRATIONS:
+        with db.engine.begin() as connection:
+            migrate(connection)
+    assert schema_snapshot() == migrated